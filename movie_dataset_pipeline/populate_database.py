@@ -14,11 +14,21 @@ from selenium.webdriver.support import expected_conditions as EC
 import undetected_chromedriver as uc
 from concurrent.futures import ThreadPoolExecutor
 import urllib
+import numpy as np
 import pandas as pd
 
 NCE_PATH = 'nce.pkl'
 CE_PATH = 'ce.pkl'
 
+# 'array' writes embeddings as float8[] lists; 'bytea' writes float32 blobs to the *_f32 columns,
+# a quarter of the size on disk and parsed by the server with a single np.frombuffer. Must match
+# the server's EMBEDDING_STORAGE.
+EMBEDDING_STORAGE = os.getenv('EMBEDDING_STORAGE', 'array')
+EMBEDDING_COLUMNS = ['overview_emb', 'genres_emb', 'keywords_emb', 'atmosphere_emb', 'narrative_emb', 'themes_emb', 'classified_emb_combined']
+# Network byte order, the layout of Postgres' float4send, so the migration can run in SQL.
+EMBEDDING_BLOB_DTYPE = np.dtype('>f4')
+MIGRATION_BATCH_SIZE = 500
+
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 HEADERS = {
     'Authorization': f'Bearer {TMDB_API_KEY}',
@@ -599,6 +609,64 @@ def commit_all():
     if connect:
         connect.close()
 
+def embedding_column(column):
+    return f"{column}_f32" if EMBEDDING_STORAGE == 'bytea' else column
+
+def embedding_value(embedding):
+    if EMBEDDING_STORAGE == 'bytea':
+        return psycopg2.Binary(np.asarray(embedding, dtype=EMBEDDING_BLOB_DTYPE).tobytes())
+    return np.asarray(embedding).tolist()
+
+def add_blob_columns(connect, cursor):
+    for column in EMBEDDING_COLUMNS:
+        cursor.execute(f"ALTER TABLE movie ADD COLUMN IF NOT EXISTS {column}_f32 bytea")
+    connect.commit()
+
+def migrate_embeddings_to_bytea(connect, cursor, batch_size=MIGRATION_BATCH_SIZE):
+    # Converts existing float8[] embeddings in place on the server, in id-ordered batches so
+    # each transaction stays small; rows already converted are skipped, so it can be re-run.
+    add_blob_columns(connect, cursor)
+
+    conversions = ',\n'.join(
+        f"{column}_f32 = (SELECT string_agg(float4send(x::float4), ''::bytea ORDER BY i) "
+        f"FROM unnest({column}) WITH ORDINALITY AS e(x, i))"
+        for column in EMBEDDING_COLUMNS
+    )
+    pending = ' OR '.join(f"({column} IS NOT NULL AND {column}_f32 IS NULL)" for column in EMBEDDING_COLUMNS)
+
+    cursor.execute(f"SELECT id FROM movie WHERE {pending} ORDER BY id")
+    movie_ids = [row[0] for row in cursor.fetchall()]
+    print(f"Converting embeddings of {len(movie_ids)} movies to bytea...")
+
+    for start in range(0, len(movie_ids), batch_size):
+        batch = movie_ids[start:start + batch_size]
+        cursor.execute(f"UPDATE movie SET {conversions} WHERE id = ANY(%s)", (batch,))
+        connect.commit()
+        print(f'Converted {start + len(batch)} movies...')
+
+    verify_blob_embeddings(cursor)
+    print('Embedding migration complete.')
+
+def verify_blob_embeddings(cursor, sample_size=20):
+    cursor.execute(
+        f"SELECT {', '.join(EMBEDDING_COLUMNS)}, {', '.join(column + '_f32' for column in EMBEDDING_COLUMNS)} "
+        f"FROM movie WHERE classified_emb_combined IS NOT NULL ORDER BY random() LIMIT %s",
+        (sample_size,)
+    )
+    for row in cursor.fetchall():
+        for array, blob in zip(row[:len(EMBEDDING_COLUMNS)], row[len(EMBEDDING_COLUMNS):]):
+            if array is None:
+                continue
+            expected = np.asarray(array, dtype=np.float32)
+            if blob is None or not np.array_equal(np.frombuffer(blob, dtype=EMBEDDING_BLOB_DTYPE), expected):
+                raise ValueError("Converted embedding does not match its float8[] source.")
+
+def drop_array_embeddings(connect, cursor):
+    # Only once every reader runs with EMBEDDING_STORAGE=bytea; frees ~4x the blob size.
+    for column in EMBEDDING_COLUMNS:
+        cursor.execute(f"ALTER TABLE movie DROP COLUMN IF EXISTS {column}")
+    connect.commit()
+
 def populate_nce(connect, cursor):
     cursor.execute("SELECT id FROM movie")
     movie_ids = [row[0] for row in cursor.fetchall()]
@@ -608,21 +676,23 @@ def populate_nce(connect, cursor):
     print(df.head())
 
     print(f"Adding NCEs for {len(movie_ids)} movies...")
+    if EMBEDDING_STORAGE == 'bytea':
+        add_blob_columns(connect, cursor)
 
     for i, row in df.iterrows():
         movie_id = row['id']
-        overview_emb = row['overview_emb'].tolist()
-        genres_emb = row['genres_emb'].tolist()
-        keywords_emb = row['keywords_emb'].tolist()
+        overview_emb = embedding_value(row['overview_emb'])
+        genres_emb = embedding_value(row['genres_emb'])
+        keywords_emb = embedding_value(row['keywords_emb'])
         vote_scaled = row['vote_average_scaled']
 
         cursor.execute(
-            """
+            f"""
             UPDATE movie
             SET
-                overview_emb = %s,
-                genres_emb = %s,
-                keywords_emb = %s,
+                {embedding_column('overview_emb')} = %s,
+                {embedding_column('genres_emb')} = %s,
+                {embedding_column('keywords_emb')} = %s,
                 vote_average_scaled = %s
             WHERE id = %s
             """,
@@ -645,28 +715,30 @@ def populate_ce(connect, cursor):
     print(df.head())
 
     print(f"Adding CEs for {len(movie_ids)} movies...")
+    if EMBEDDING_STORAGE == 'bytea':
+        add_blob_columns(connect, cursor)
 
     for i, row in df.iterrows():
         movie_id = row['id']
         atmosphere = row['atmosphere']
         narrative = row['narrative_structure']
         themes = row['themes']
-        atmosphere_emb = row['atmosphere_emb'].tolist()
-        narrative_emb = row['narrative_emb'].tolist()
-        themes_emb = row['themes_emb'].tolist()
-        combined_emb = row['combined_emb'].tolist()
+        atmosphere_emb = embedding_value(row['atmosphere_emb'])
+        narrative_emb = embedding_value(row['narrative_emb'])
+        themes_emb = embedding_value(row['themes_emb'])
+        combined_emb = embedding_value(row['combined_emb'])
 
         cursor.execute(
-            """
+            f"""
             UPDATE movie
             SET
                 atmosphere = %s,
                 narrative = %s,
                 themes = %s,
-                atmosphere_emb = %s,
-                narrative_emb = %s,
-                themes_emb = %s,
-                classified_emb_combined = %s
+                {embedding_column('atmosphere_emb')} = %s,
+                {embedding_column('narrative_emb')} = %s,
+                {embedding_column('themes_emb')} = %s,
+                {embedding_column('classified_emb_combined')} = %s
             WHERE id = %s
             """,
             (atmosphere, narrative, themes, atmosphere_emb, narrative_emb, themes_emb, combined_emb, movie_id)
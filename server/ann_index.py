@@ -0,0 +1,171 @@
+import os
+import json
+import math
+import faiss
+from dataclasses import dataclass, asdict, fields
+
+INDEX_TYPES = ('flat', 'fp16', 'sq8', 'hnsw', 'ivf_flat', 'ivf_pq')
+
+# Parameters that change the stored structure; everything else is a search-time knob.
+BUILD_PARAMS = ('index_type', 'hnsw_m', 'ef_construction', 'nlist', 'pq_m', 'pq_nbits')
+
+@dataclass
+class IndexConfig:
+    index_type: str = 'flat'
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 128
+    nlist: int = 0
+    nprobe: int = 16
+    pq_m: int = 64
+    pq_nbits: int = 8
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{self.index_type}'. Expected one of {INDEX_TYPES}.")
+
+    def build_key(self):
+        return {name: getattr(self, name) for name in BUILD_PARAMS}
+
+    def describe(self):
+        if self.index_type == 'hnsw':
+            return f"hnsw(M={self.hnsw_m}, efSearch={self.ef_search})"
+        if self.index_type == 'ivf_flat':
+            return f"ivf_flat(nlist={self.nlist or 'auto'}, nprobe={self.nprobe})"
+        if self.index_type == 'ivf_pq':
+            return f"ivf_pq(nlist={self.nlist or 'auto'}, m={self.pq_m}x{self.pq_nbits}, nprobe={self.nprobe})"
+        return self.index_type
+
+def index_config_from_env():
+    config = IndexConfig(index_type=os.environ.get('FAISS_INDEX_TYPE', 'flat').lower())
+
+    env_params = {
+        'hnsw_m': 'FAISS_HNSW_M',
+        'ef_construction': 'FAISS_EF_CONSTRUCTION',
+        'ef_search': 'FAISS_EF_SEARCH',
+        'nlist': 'FAISS_NLIST',
+        'nprobe': 'FAISS_NPROBE',
+        'pq_m': 'FAISS_PQ_M',
+        'pq_nbits': 'FAISS_PQ_NBITS',
+    }
+    for name, env_name in env_params.items():
+        value = os.environ.get(env_name)
+        if value:
+            setattr(config, name, int(value))
+
+    return config
+
+def save_index_config(config, path):
+    with open(path, 'w') as f:
+        json.dump(asdict(config), f, indent=2)
+
+def load_index_config(path):
+    if not os.path.exists(path):
+        return IndexConfig()
+
+    with open(path) as f:
+        stored = json.load(f)
+
+    known = {field.name for field in fields(IndexConfig)}
+    return IndexConfig(**{name: value for name, value in stored.items() if name in known})
+
+def default_nlist(n):
+    # ~4*sqrt(n) lists, but never fewer than 39 training points per list.
+    nlist = int(4 * math.sqrt(n))
+    return max(1, min(nlist, n // 39))
+
+def empty_index(d, n, config=None):
+    # n is the number of vectors the index will hold; IVF sizes its lists from it.
+    config = config or IndexConfig()
+
+    if config.index_type == 'flat':
+        index = faiss.IndexFlatIP(d)
+
+    elif config.index_type in ('fp16', 'sq8'):
+        # Exhaustive like flat, with 2 or 1 bytes per dimension instead of 4.
+        qtype = faiss.ScalarQuantizer.QT_fp16 if config.index_type == 'fp16' else faiss.ScalarQuantizer.QT_8bit
+        index = faiss.IndexScalarQuantizer(d, qtype, faiss.METRIC_INNER_PRODUCT)
+
+    elif config.index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(d, config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = config.ef_construction
+
+    elif config.index_type == 'ivf_flat':
+        nlist = config.nlist or default_nlist(n)
+        index = faiss.index_factory(d, f"IVF{nlist},Flat", faiss.METRIC_INNER_PRODUCT)
+
+    else:
+        nlist = config.nlist or default_nlist(n)
+        if n < 2 ** config.pq_nbits:
+            raise ValueError(f"ivf_pq with {config.pq_nbits}-bit codes needs at least {2 ** config.pq_nbits} vectors, got {n}.")
+
+        # PQ needs the dimension to be a multiple of the sub-quantizer count, so zero-pad.
+        padded_d = config.pq_m * math.ceil(d / config.pq_m)
+        inner = faiss.index_factory(padded_d, f"IVF{nlist},PQ{config.pq_m}x{config.pq_nbits}", faiss.METRIC_INNER_PRODUCT)
+        if padded_d != d:
+            index = faiss.IndexPreTransform(faiss.RemapDimensionsTransform(d, padded_d, True), inner)
+        else:
+            index = inner
+
+    return index
+
+def create_index(composite_vectors, config=None):
+    config = config or IndexConfig()
+    n, d = composite_vectors.shape
+    index = empty_index(d, n, config)
+
+    if not index.is_trained:
+        index.train(composite_vectors)
+    index.add(composite_vectors)
+
+    apply_search_params(index, config)
+    return index
+
+def apply_search_params(index, config):
+    params = faiss.ParameterSpace()
+
+    if config.index_type == 'hnsw':
+        params.set_index_parameter(index, 'efSearch', config.ef_search)
+    elif config.index_type in ('ivf_flat', 'ivf_pq'):
+        params.set_index_parameter(index, 'nprobe', config.nprobe)
+
+    return index
+
+def selector_params(index, selector):
+    # Passing SearchParameters replaces the index's own efSearch/nprobe, so carry them over.
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexPreTransform) else index
+
+    if isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    if isinstance(inner, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=inner.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+def can_reconstruct(index):
+    # IVF indexes can only map a label back to its vector after make_direct_map, which a
+    # mapped index cannot build; the rest decode stored vectors directly.
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexPreTransform) else index
+    return not isinstance(inner, faiss.IndexIVF)
+
+def search_subset(index, queries, k, bitmap, n):
+    # bitmap is a packed little-endian bit per label; it must outlive the search, so the
+    # selector and its parameters are only ever created here.
+    selector = faiss.IDSelectorBitmap(n, faiss.swig_ptr(bitmap))
+    return index.search(queries, k, params=selector_params(index, selector))
+
+def read_index_mapped(path):
+    # Vectors stay in the file and are paged in on demand, so loading is near-instant and
+    # workers on one host share the pages. Mapped indexes are read-only.
+    return faiss.read_index(path, getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP))
+
+def writable_copy(index):
+    # Adding to a mapped index aborts the process, and clone_index keeps the mapping, so
+    # round-trip through a serialised buffer to get an index that owns its storage.
+    return faiss.deserialize_index(faiss.serialize_index(index))
+
+def write_index(index, path):
+    # Serving processes may have the old file mapped; replacing it keeps their inode intact,
+    # where writing over it in place would pull pages out from under them.
+    staging_path = f"{path}.tmp"
+    faiss.write_index(index, staging_path)
+    os.replace(staging_path, path)
@@ -4,13 +4,18 @@ from typing import Dict, List
 import psycopg2
 from dotenv import load_dotenv
 from llm import init_llm
-from movie_similarity_search import cloud_load_or_build, load_or_build_index
+from movie_similarity_search import cloud_load_or_build, load_or_build_index, load_snapshot_catalog, SNAPSHOT_ROOT
+from asset_snapshots import current_version, manifest_mtime, set_current_version, snapshot_dir
+from search_backend import search_backend_from_env
 from dataclasses import dataclass, field
 from llm import MovieSearchTool
 from sentence_transformers import SentenceTransformer
 import sys
+import gc
 import uuid
 import time
+import threading
+from typing import Optional
 from google.cloud import storage
 import bcrypt
 from cryptography.fernet import Fernet
@@ -34,6 +39,11 @@ if (APP_ENV == 'debug'):
 else:
     DATABASE_URL  = os.environ.get('DATABASE_URL')
 
+EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE', 1024))
+EMBEDDING_CACHE_TTL = float(os.environ['EMBEDDING_CACHE_TTL']) if os.environ.get('EMBEDDING_CACHE_TTL') else None
+# Seconds between checks for a newly published asset snapshot; 0 leaves reloads to the admin endpoint.
+SNAPSHOT_POLL_INTERVAL = float(os.environ.get('SNAPSHOT_POLL_INTERVAL', 60))
+
 BUCKET_NAME = 'movies-db-bucket'
 MODEL_GCS_PREFIX = 'sbert_model/'
 LOCAL_MODEL_PATH = './sbert_model'
@@ -44,10 +54,19 @@ async def lifespan(app: FastAPI):
         print("FATAL: System initialization failed. Exiting.")
         sys.exit(1)
     print("System initialized successfully.")
+
+    watcher = None
+    if SNAPSHOT_POLL_INTERVAL > 0 and app_state.movie_search_tool.backend.local_vectors:
+        watcher = SnapshotWatcher(SNAPSHOT_POLL_INTERVAL)
+        watcher.start()
     
     yield
     
     print("Server is shutting down. Performing cleanup...")
+    if app_state.movie_search_tool is not None:
+        app_state.movie_search_tool.backend.close()
+    if watcher is not None:
+        watcher.stop()
 
 app = FastAPI(lifespan=lifespan, debug=True, title="MovieFinder", summary="Made with love from ModelIntellect", version="0.0.1")
 user_router = APIRouter(prefix="/api/users", tags=["users"])
@@ -124,6 +143,9 @@ class GetStartSessionResponse(BaseModel):
     session_id: str
     result: bool = True
 
+class ReloadAssetsRequest(BaseModel):
+    version: Optional[str] = None
+
 FERNET_KEY = os.environ.get('FERNET_KEY')
 
 if not FERNET_KEY:
@@ -151,18 +173,20 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
 
 @dataclass
 class AppState:
-    movie_df: object = field(default=None)
-    faiss_index: object = field(default=None)
+    catalog: object = field(default=None)
+    movie_search_tool: object = field(default=None)
     agent: object = field(default=None)
     graph: object = field(default=None)
     model: object = field(default=None)
+    asset_version: str = None
     is_initialized: bool = False
 
     def __post_init__(self):
-        if self.faiss_index is not None and self.movie_df is not None and self.agent is not None and self.graph is not None:
+        if self.catalog is not None and self.agent is not None and self.graph is not None:
             self.is_initialized = True
 
 app_state = AppState()
+reload_lock = threading.Lock()
 
 def load_model_from_gcs():
     if os.path.exists(LOCAL_MODEL_PATH):
@@ -271,17 +295,40 @@ def initialize_system():
     print("Connecting to database...")
     conn = get_db_connection()
     cursor = conn.cursor()
-    print("Loading index and movie dataframe...")
-
-    if (APP_ENV == 'debug'):
-        movie_df, faiss_index = load_or_build_index(conn, cursor)
+    search_backend = search_backend_from_env(DATABASE_URL)
+    print(f"Using the {search_backend.name} search backend")
+
+    asset_version = None
+    catalog = None
+    if not search_backend.local_vectors:
+        # The vectors are searched in the database; only the metadata is needed here.
+        print("Loading movie metadata...")
+        catalog = search_backend.load_catalog()
     else:
-        movie_df, faiss_index = cloud_load_or_build(conn, cursor)
+        print("Loading index and movie dataframe...")
+        asset_version = current_version(SNAPSHOT_ROOT)
+        if asset_version is not None:
+            try:
+                catalog = load_snapshot_catalog(snapshot_dir(SNAPSHOT_ROOT, asset_version))
+            except Exception as e:
+                print(f"Could not load snapshot {asset_version}, building from scratch: {e}")
+                asset_version = None
+
+    if catalog is None and (APP_ENV == 'debug'):
+        catalog = load_or_build_index(conn, cursor)
+    elif catalog is None:
+        catalog = cloud_load_or_build(conn, cursor)
 
     print("Loading model...")
     sbert_model = load_model_from_gcs()
     print("Initializing movie search tool...")
-    movie_search_tool = MovieSearchTool(faiss_index=faiss_index, movie_df=movie_df, model=sbert_model)
+    movie_search_tool = MovieSearchTool(
+        catalog=catalog,
+        model=sbert_model,
+        embedding_cache_size=EMBEDDING_CACHE_SIZE,
+        embedding_cache_ttl=EMBEDDING_CACHE_TTL,
+        backend=search_backend
+    )
     print("Initializing LLM...")
     agent, graph = init_llm(movie_search_tool)
     print("Everything initialized!")
@@ -291,15 +338,74 @@ def initialize_system():
 
     global app_state
     app_state = AppState(
-        movie_df=movie_df,
-        faiss_index=faiss_index,
+        catalog=catalog,
+        movie_search_tool=movie_search_tool,
         agent=agent,
         graph=graph,
-        model=sbert_model
+        model=sbert_model,
+        asset_version=asset_version
     )
 
     return app_state.is_initialized
 
+def reload_assets(version=None):
+    # The new snapshot is loaded while the old one keeps serving, then swapped in with a single
+    # reference assignment. Requests holding the old catalog finish on it; once they are done
+    # nothing references it and its arrays and mapped files are released.
+    with reload_lock:
+        if not app_state.movie_search_tool.backend.local_vectors:
+            raise ValueError(f"Snapshots are not used by the {app_state.movie_search_tool.backend.name} search backend.")
+        pinned = version is not None
+        version = version or current_version(SNAPSHOT_ROOT)
+        if version is None:
+            raise ValueError(f"No snapshot has been published to {SNAPSHOT_ROOT}.")
+        if version == app_state.asset_version:
+            return False
+
+        print(f"Loading asset snapshot {version}...")
+        start = time.perf_counter()
+        catalog = load_snapshot_catalog(snapshot_dir(SNAPSHOT_ROOT, version))
+        if pinned:
+            # Rolling back or forward by hand moves CURRENT too, or the watcher would undo it.
+            set_current_version(SNAPSHOT_ROOT, version)
+
+        previous = app_state.movie_search_tool.swap_catalog(catalog)
+        app_state.catalog = catalog
+        app_state.asset_version = version
+        del previous
+        gc.collect()
+
+        print(f"Switched to asset snapshot {version} in {time.perf_counter() - start:.1f}s")
+        return True
+
+class SnapshotWatcher(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(name='snapshot-watcher', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        # (version, manifest mtime) of the last snapshot that failed to load. Verifying hashes
+        # every file, so it is not retried until CURRENT moves or the snapshot is republished.
+        self.failed = None
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            version = current_version(SNAPSHOT_ROOT)
+            if version is None or version == app_state.asset_version:
+                continue
+            attempt = (version, manifest_mtime(SNAPSHOT_ROOT, version))
+            if attempt == self.failed:
+                continue
+            try:
+                reload_assets(version)
+                self.failed = None
+            except Exception as e:
+                # A broken snapshot must not take the server down; the live catalog keeps serving.
+                self.failed = attempt
+                print(f"Failed to load asset snapshot {version}, skipping it until it changes: {e}")
+
+    def stop(self):
+        self.stopped.set()
+
 @user_router.get('/start-session', response_model=GetStartSessionResponse, status_code=status.HTTP_200_OK)
 async def start_session(current_user = Depends(get_current_user)):
     user_id: str = current_user.get('sub')
@@ -471,6 +577,35 @@ async def auth_status(current_user = Depends(get_current_user)):
         "email_verified": current_user.get("email_verified"),
     }
 
+@app.get('/api/admin/search-stats')
+async def search_stats(current_user = Depends(get_current_user)):
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    return {
+        "result": True,
+        "asset_version": app_state.asset_version,
+        "embedding_cache": app_state.movie_search_tool.embedding_cache_stats(),
+    }
+
+@app.post('/api/admin/reload-assets')
+def reload_search_assets(data: ReloadAssetsRequest, current_user = Depends(get_current_user)):
+    # A plain def, so FastAPI runs the load in its threadpool and other requests keep being served.
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    try:
+        reloaded = reload_assets(data.version)
+    except Exception as e:
+        print(f"Failed to reload search assets: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        "result": True,
+        "reloaded": reloaded,
+        "asset_version": app_state.asset_version,
+    }
+
 @app.post('/api/user/log-out')
 async def user_logout(token: str = Depends(oauth2_scheme)):
     return {"message": "Logout successful", "result": True}
@@ -0,0 +1,126 @@
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime, timezone
+
+SNAPSHOT_MANIFEST = 'snapshot.json'
+CURRENT_FILE = 'CURRENT'
+CHECKSUM_CHUNK_SIZE = 1 << 20
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHECKSUM_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def snapshot_files(path):
+    files = []
+    for directory, _, names in os.walk(path):
+        for name in names:
+            relative = os.path.relpath(os.path.join(directory, name), path)
+            if relative != SNAPSHOT_MANIFEST:
+                files.append(relative)
+    return sorted(files)
+
+def copy_asset(source, target):
+    # Copied next to the target and renamed over it, so a process mapping the old file keeps it.
+    staging_path = f"{target}.tmp"
+    if os.path.isdir(source):
+        shutil.rmtree(staging_path, ignore_errors=True)
+        shutil.copytree(source, staging_path)
+        shutil.rmtree(target, ignore_errors=True)
+    else:
+        shutil.copy2(source, staging_path)
+    os.replace(staging_path, target)
+
+def copy_assets(paths, target_dir):
+    os.makedirs(target_dir, exist_ok=True)
+    for source in paths:
+        copy_asset(source, os.path.join(target_dir, os.path.basename(source)))
+
+def snapshot_dir(root, version):
+    return os.path.join(root, version)
+
+def manifest_mtime(root, version):
+    # None while the snapshot has no manifest, e.g. before it has been published.
+    try:
+        return os.stat(os.path.join(snapshot_dir(root, version), SNAPSHOT_MANIFEST)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def current_version(root):
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def set_current_version(root, version):
+    # Readers poll this file, so it is replaced in one step and never seen half written.
+    staging_path = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(staging_path, 'w') as f:
+        f.write(version)
+    os.replace(staging_path, os.path.join(root, CURRENT_FILE))
+
+def publish_snapshot(root, paths, version=None):
+    # Files are copied rather than linked: several assets are rewritten in place by the
+    # next build, which would silently change a published snapshot under its checksums.
+    version = version or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    path = snapshot_dir(root, version)
+    if os.path.exists(path):
+        raise ValueError(f"Snapshot {version} already exists in {root}.")
+
+    staging_path = f"{path}.tmp"
+    shutil.rmtree(staging_path, ignore_errors=True)
+    os.makedirs(staging_path)
+
+    copy_assets(paths, staging_path)
+
+    files = {}
+    for relative in snapshot_files(staging_path):
+        file_path = os.path.join(staging_path, relative)
+        files[relative] = {'sha256': file_sha256(file_path), 'bytes': os.path.getsize(file_path)}
+
+    manifest = {
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'files': files,
+    }
+    with open(os.path.join(staging_path, SNAPSHOT_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    os.replace(staging_path, path)
+    set_current_version(root, version)
+
+    return version
+
+def verify_snapshot(path):
+    manifest_path = os.path.join(path, SNAPSHOT_MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"No snapshot manifest in {path}.")
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    for relative, expected in manifest['files'].items():
+        file_path = os.path.join(path, relative)
+        if not os.path.exists(file_path):
+            raise ValueError(f"Snapshot {manifest['version']} is missing {relative}.")
+        if os.path.getsize(file_path) != expected['bytes'] or file_sha256(file_path) != expected['sha256']:
+            raise ValueError(f"Snapshot {manifest['version']} has a corrupt {relative}.")
+
+    return manifest
+
+def prune_snapshots(root, keep):
+    # Oldest first by name, which is creation order for the default timestamp versions.
+    current = current_version(root)
+    versions = sorted(
+        name for name in os.listdir(root)
+        if os.path.exists(os.path.join(root, name, SNAPSHOT_MANIFEST))
+    )
+    removed = [version for version in versions[:max(len(versions) - keep, 0)] if version != current]
+    for version in removed:
+        shutil.rmtree(snapshot_dir(root, version))
+    return removed
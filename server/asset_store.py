@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+import shutil
+import numpy as np
+import pandas as pd
+from facet_store import FacetStore
+
+# Bump when the layout changes; stores written by another version are rebuilt, not read.
+# Version 2 added int8 scale files, so version 1 stores are still readable as they are.
+ASSET_FORMAT_VERSION = 2
+READABLE_FORMAT_VERSIONS = (1, 2)
+
+MANIFEST_FILE = 'manifest.json'
+METADATA_FILE = 'metadata.pkl'
+SQ_NORMS_FILE = 'sq_norms.npy'
+CHECKSUM_CHUNK_ROWS = 4096
+
+def has_asset_store(path):
+    return os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+def content_checksum(movie_df, facet_store):
+    # Identifies the vectors behind everything derived from them (the neighbour table), so a
+    # rebuild from changed data is never served with artefacts of the previous one.
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(movie_df['id'].to_numpy(), dtype='int64').tobytes())
+    for name in facet_store.names:
+        matrix = facet_store.facets[name]
+        digest.update(f"{name}:{matrix.dtype}:{matrix.shape}".encode())
+        for start in range(0, len(matrix), CHECKSUM_CHUNK_ROWS):
+            digest.update(np.ascontiguousarray(matrix[start:start + CHECKSUM_CHUNK_ROWS]).tobytes())
+        if name in facet_store.scales:
+            digest.update(facet_store.scales[name].tobytes())
+    return digest.hexdigest()
+
+def asset_store_checksum(path):
+    # None for stores written before checksums were recorded.
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f).get('checksum')
+
+def write_asset_store(path, movie_df, facet_store):
+    # Written next to the target and swapped in whole, so a reader never sees half a store.
+    staging_path = f"{path}.tmp"
+    shutil.rmtree(staging_path, ignore_errors=True)
+    os.makedirs(staging_path)
+
+    facets = {}
+    for name in facet_store.names:
+        matrix = np.ascontiguousarray(facet_store.facets[name])
+        np.save(os.path.join(staging_path, f"{name}.npy"), matrix)
+        facets[name] = {'file': f"{name}.npy", 'shape': list(matrix.shape), 'dtype': str(matrix.dtype)}
+
+        if name in facet_store.scales:
+            np.save(os.path.join(staging_path, f"{name}_scale.npy"), facet_store.scales[name])
+            facets[name]['scale'] = f"{name}_scale.npy"
+
+    np.save(os.path.join(staging_path, SQ_NORMS_FILE), facet_store.sq_norms)
+    movie_df.to_pickle(os.path.join(staging_path, METADATA_FILE))
+
+    manifest = {
+        'format_version': ASSET_FORMAT_VERSION,
+        'rows': len(movie_df),
+        'precision': facet_store.precision,
+        'facets': facets,
+        'sq_norms': SQ_NORMS_FILE,
+        'metadata': METADATA_FILE,
+        'checksum': content_checksum(movie_df, facet_store),
+    }
+    with open(os.path.join(staging_path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging_path, path)
+
+    return manifest['checksum']
+
+def open_asset_store(path, mmap_mode='r'):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') not in READABLE_FORMAT_VERSIONS:
+        raise ValueError(f"Asset store at {path} has format {manifest.get('format_version')}, expected one of {READABLE_FORMAT_VERSIONS}.")
+
+    # Facets are mapped rather than read: pages load on first touch and are shared by every
+    # process on the host that maps the same files.
+    facets = {}
+    scales = {}
+    for name, spec in manifest['facets'].items():
+        matrix = np.load(os.path.join(path, spec['file']), mmap_mode=mmap_mode)
+        if list(matrix.shape) != spec['shape'] or matrix.shape[0] != manifest['rows']:
+            raise ValueError(f"Facet '{name}' in {path} has shape {matrix.shape}, expected {spec['shape']}.")
+        facets[name] = matrix
+
+        if 'scale' in spec:
+            scales[name] = np.load(os.path.join(path, spec['scale']))
+
+    sq_norms = np.load(os.path.join(path, manifest['sq_norms']))
+    movie_df = pd.read_pickle(os.path.join(path, manifest['metadata']))
+
+    if len(movie_df) != manifest['rows']:
+        raise ValueError(f"Metadata in {path} has {len(movie_df)} rows, expected {manifest['rows']}.")
+
+    return movie_df, FacetStore(facets, sq_norms, scales)
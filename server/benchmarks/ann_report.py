@@ -0,0 +1,101 @@
+import argparse
+import json
+import time
+from dataclasses import replace
+import faiss
+import numpy as np
+import pandas as pd
+from ann_index import IndexConfig, create_index, apply_search_params
+from movie_similarity_search import build_composite_from_store, build_facet_store, composite_dim
+from benchmarks.synthetic import make_clustered_vectors
+
+# (build config, search-time values to sweep) for every index type we ship.
+DEFAULT_GRID = [
+    (IndexConfig(index_type='flat'), [None]),
+    (IndexConfig(index_type='fp16'), [None]),
+    (IndexConfig(index_type='sq8'), [None]),
+    (IndexConfig(index_type='hnsw', hnsw_m=32), [16, 32, 64, 128, 256]),
+    (IndexConfig(index_type='ivf_flat'), [1, 4, 16, 64]),
+    (IndexConfig(index_type='ivf_pq', pq_m=64), [4, 16, 64]),
+]
+
+def load_vectors(args):
+    if args.df:
+        return build_composite_from_store(build_facet_store(pd.read_pickle(args.df)))
+    if args.index:
+        index = faiss.read_index(args.index)
+        return index.reconstruct_n(0, index.ntotal)
+    return make_clustered_vectors(args.rows, composite_dim())
+
+def with_search_param(config, value):
+    if value is None:
+        return config
+    if config.index_type == 'hnsw':
+        return replace(config, ef_search=value)
+    return replace(config, nprobe=value)
+
+def measure(index, queries, k, ground_truth):
+    latencies = np.empty(len(queries))
+    found = np.empty((len(queries), k), dtype='int64')
+
+    # One query per call, like find_similar_movies does when serving a request.
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, indices = index.search(query.reshape(1, -1), k)
+        latencies[i] = time.perf_counter() - start
+        found[i] = indices[0]
+
+    hits = sum(len(np.intersect1d(found[i], ground_truth[i])) for i in range(len(queries)))
+    return {
+        'recall': hits / ground_truth.size,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k and query latency of each FAISS index type against the flat index.")
+    parser.add_argument('--df', help="Build composite vectors from a pickled movie DataFrame.")
+    parser.add_argument('--index', help="Reconstruct composite vectors from a flat FAISS index file.")
+    parser.add_argument('--rows', type=int, default=20_000, help="Synthetic catalogue size when no asset is given.")
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--json', help="Also write the report to this file.")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+
+    flat = create_index(vectors, IndexConfig(index_type='flat'))
+    _, ground_truth = flat.search(queries, args.k)
+
+    print(f"{len(vectors)} vectors of dimension {vectors.shape[1]}, {len(queries)} queries, recall@{args.k} vs flat\n")
+    print(f"{'configuration':<42} {'build (s)':>10} {'size (MB)':>10} {'recall':>8} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+
+    report = []
+    for build_config, sweep in DEFAULT_GRID:
+        start = time.perf_counter()
+        try:
+            index = create_index(vectors, build_config)
+        except (ValueError, RuntimeError) as e:
+            print(f"{build_config.index_type:<42} skipped: {e}")
+            continue
+        build_time = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+
+        for value in sweep:
+            config = with_search_param(build_config, value)
+            apply_search_params(index, config)
+            result = measure(index, queries, args.k, ground_truth)
+            result.update({'configuration': config.describe(), 'build_s': build_time, 'size_mb': size_mb})
+            report.append(result)
+
+            print(f"{result['configuration']:<42} {build_time:>10.2f} {size_mb:>10.1f} {result['recall']:>8.3f} "
+                  f"{result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import psycopg2
+from search_backend import SEARCH_BACKENDS, FaissBackend, PgVectorBackend
+
+WORKLOADS = ('similar', 'similar_filtered', 'description_dense', 'description_hybrid')
+FILTERS = {'min_rating': 7}
+
+class StoredEmbeddingModel:
+    # Stands in for the SentenceTransformer: each query text is a movie overview whose stored
+    # embedding is returned, so both backends search with identical vectors and no model is loaded.
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def encode(self, texts):
+        return np.array([self.embeddings[text] for text in texts], dtype='float32')
+
+def prepare_queries(dsn, n, seed=0):
+    conn = psycopg2.connect(dsn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT movie_id FROM movie_vector WHERE overview IS NOT NULL ORDER BY movie_id")
+        movie_ids = [row[0] for row in cursor.fetchall()]
+        movie_ids = sorted(np.random.default_rng(seed).choice(movie_ids, size=min(n, len(movie_ids)), replace=False).tolist())
+
+        cursor.execute(
+            "SELECT m.id, m.overview, v.overview::text FROM movie m JOIN movie_vector v ON v.movie_id = m.id WHERE m.id = ANY(%s)",
+            (movie_ids,)
+        )
+        texts = {row[0]: (row[1], json.loads(row[2])) for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {
+        'movie_ids': movie_ids,
+        'descriptions': [texts[movie_id][0] for movie_id in movie_ids],
+        'embeddings': {texts[movie_id][0]: texts[movie_id][1] for movie_id in movie_ids},
+    }
+
+def run_workloads(backend, catalog, queries, k):
+    model = StoredEmbeddingModel(queries['embeddings'])
+    latencies = {name: [] for name in WORKLOADS}
+    results = {'similar': {}}
+
+    for movie_id, description in zip(queries['movie_ids'], queries['descriptions']):
+        calls = {
+            'similar': lambda: backend.find_similar_movies(catalog, movie_id, k=k),
+            'similar_filtered': lambda: backend.find_similar_movies(catalog, movie_id, k=k, filters=FILTERS),
+            'description_dense': lambda: backend.find_movies_by_description(catalog, description, k=k, model=model, mode='dense'),
+            'description_hybrid': lambda: backend.find_movies_by_description(catalog, description, k=k, model=model),
+        }
+        for name, call in calls.items():
+            start = time.perf_counter()
+            found, _ = call()
+            latencies[name].append(time.perf_counter() - start)
+            if name == 'similar':
+                results['similar'][movie_id] = [movie.id for movie in found]
+
+    return latencies, results
+
+def child(backend_name, dsn, queries_path, out_path, k):
+    with open(queries_path) as f:
+        queries = json.load(f)
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if backend_name == 'faiss':
+        from movie_similarity_search import load_or_build_index
+        catalog = load_or_build_index(None, None)
+        backend = FaissBackend()
+    else:
+        # Nothing of the catalogue is loaded: these searches only need the database.
+        catalog = None
+        backend = PgVectorBackend(dsn)
+    load_time = time.perf_counter() - start
+
+    latencies, results = run_workloads(backend, catalog, queries, k)
+    backend.close()
+
+    report = {
+        'load_s': load_time,
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'rss_increase_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1024,
+        'latency_ms': {
+            name: {'p50': float(np.percentile(values, 50) * 1000), 'p95': float(np.percentile(values, 95) * 1000)}
+            for name, values in latencies.items()
+        },
+        'similar': {str(movie_id): ids for movie_id, ids in results['similar'].items()},
+    }
+    with open(out_path, 'w') as f:
+        json.dump(report, f)
+
+def recall(reference, candidate, k):
+    hits = [len(set(reference[movie_id][:k]) & set(candidate.get(movie_id, [])[:k])) / max(len(reference[movie_id][:k]), 1)
+            for movie_id in reference]
+    return float(np.mean(hits))
+
+def main():
+    parser = argparse.ArgumentParser(description=(
+        "Latency and memory of the FAISS and pgvector search backends. Needs a database with the "
+        "movie tables, e.g. a local `docker run -p 5432:5432 pgvector/pgvector:pg16` loaded by the "
+        "pipeline, and the server's assets in the working directory."
+    ))
+    parser.add_argument('--dsn', default=os.environ.get('PGVECTOR_DSN') or os.environ.get('DATABASE_URL'))
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--sync', action='store_true', help="Rebuild the movie_vector table from the saved catalogue first.")
+    parser.add_argument('--json', help="Also write the report to this file.")
+    parser.add_argument('--child', choices=SEARCH_BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument('--queries-file', help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.dsn, args.queries_file, args.out, args.k)
+        return
+
+    if args.sync:
+        from movie_similarity_search import load_or_build_index
+        backend = PgVectorBackend(args.dsn)
+        backend.sync(load_or_build_index(None, None))
+        backend.close()
+
+    reports = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        queries_path = os.path.join(scratch, 'queries.json')
+        with open(queries_path, 'w') as f:
+            json.dump(prepare_queries(args.dsn, args.queries), f)
+
+        # One process per backend, so each one's peak RSS is its own.
+        for name in SEARCH_BACKENDS:
+            out_path = os.path.join(scratch, f"{name}.json")
+            subprocess.run([
+                sys.executable, '-m', 'benchmarks.backend_report', '--child', name, '--dsn', args.dsn,
+                '--queries-file', queries_path, '--out', out_path, '--k', str(args.k)
+            ], check=True, stdout=subprocess.DEVNULL)
+            with open(out_path) as f:
+                reports[name] = json.load(f)
+
+    print(f"{args.queries} queries, k={args.k}\n")
+    print(f"{'backend':<9} {'load (s)':>9} {'peak RSS (MB)':>14} {'RSS added (MB)':>15} {'recall vs faiss':>16}")
+    for name, report in reports.items():
+        report['recall_vs_faiss'] = recall(reports['faiss']['similar'], report['similar'], args.k)
+        print(f"{name:<9} {report['load_s']:>9.2f} {report['rss_mb']:>14.0f} {report['rss_increase_mb']:>15.0f} {report['recall_vs_faiss']:>16.3f}")
+
+    print(f"\n{'workload':<20} " + ' '.join(f"{name + ' p50/p95 (ms)':>24}" for name in reports))
+    for workload in WORKLOADS:
+        cells = [f"{report['latency_ms'][workload]['p50']:>11.2f} / {report['latency_ms'][workload]['p95']:<10.2f}" for report in reports.values()]
+        print(f"{workload:<20} " + ' '.join(f"{cell:>24}" for cell in cells))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({name: {key: value for key, value in report.items() if key != 'similar'} for name, report in reports.items()}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from movie_similarity_search import (
+    COMPOSITE_FACETS, EMBEDDING_DIM, build_composite_from_store, build_facet_store, create_composite_vector
+)
+
+# Rows reference a pool of distinct embedding lists so that a 1M row frame does not
+# need ~100GB of Python floats; the builders still convert every row.
+POOL_SIZE = 2000
+
+def make_movie_df(n, seed=0, missing_rate=0.02):
+    rng = np.random.default_rng(seed)
+    data = {'id': np.arange(1, n + 1), 'title': [f"Movie {i}" for i in range(n)]}
+
+    columns = [column for _, column, _ in COMPOSITE_FACETS] + ['classified_emb_combined']
+    for column in columns:
+        if column == 'vote_average_scaled':
+            data[column] = rng.random(n)
+            continue
+        pool = rng.standard_normal((POOL_SIZE, EMBEDDING_DIM))
+        pool /= np.linalg.norm(pool, axis=1, keepdims=True)
+        # Model outputs are float32, which the facet store keeps losslessly.
+        pool = pool.astype(np.float32).astype(np.float64)
+        pool = [row.tolist() for row in pool]
+        picks = rng.integers(0, POOL_SIZE, n)
+        values = [pool[p] for p in picks]
+        for i in np.flatnonzero(rng.random(n) < missing_rate):
+            values[i] = None
+        data[column] = values
+
+    return pd.DataFrame(data)
+
+def build_per_row(df):
+    composite_vectors = []
+    for _, movie in df.iterrows():
+        composite_vectors.append(create_composite_vector(movie.to_dict())[0])
+    return np.array(composite_vectors).astype('float32')
+
+def build_vectorized(df):
+    # The index build path for a pickled frame: facet store first, then chunked composites.
+    return build_composite_from_store(build_facet_store(df))
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-row vs vectorized composite matrix build.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--baseline-rows', type=int, default=5_000,
+                        help="The per-row path is timed on at most this many rows and extrapolated.")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'per-row (s)':>14} {'vectorized (s)':>16} {'speedup':>9} {'identical':>10}")
+
+    for n in args.sizes:
+        df = make_movie_df(n)
+
+        start = time.perf_counter()
+        vectorized = build_vectorized(df)
+        vectorized_time = time.perf_counter() - start
+
+        sample = min(n, args.baseline_rows)
+        start = time.perf_counter()
+        per_row = build_per_row(df.iloc[:sample])
+        per_row_time = (time.perf_counter() - start) * n / sample
+
+        identical = np.array_equal(per_row.view(np.uint32), vectorized[:sample].view(np.uint32))
+        extrapolated = '*' if sample < n else ' '
+
+        print(f"{n:>10} {per_row_time:>13.2f}{extrapolated} {vectorized_time:>16.2f} "
+              f"{per_row_time / vectorized_time:>8.1f}x {str(identical):>10}")
+
+        del df, vectorized, per_row
+
+    print("* per-row time extrapolated from --baseline-rows")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from ann_index import IndexConfig, create_index
+from movie_similarity_search import (
+    MovieCatalog, build_composite_from_store, build_lookup_maps, candidate_vectors,
+    compute_neighbour_table, find_similar_movies, mmr_order, mmr_pool_size, result_columns
+)
+from benchmarks.facet_precision_report import make_facet_store
+
+def make_catalog(n, seed=0):
+    facet_store = make_facet_store(n, seed)
+    movie_df = pd.DataFrame({
+        'id': np.arange(1, n + 1), 'title': [f"Movie {i}" for i in range(1, n + 1)], 'overview': '',
+        'vote_average': 7.0, 'atmosphere': '', 'narrative': '', 'themes': '',
+    })
+    id_to_row, title_to_rows = build_lookup_maps(movie_df)
+    catalog = MovieCatalog(
+        movie_df=movie_df, faiss_index=create_index(build_composite_from_store(facet_store), IndexConfig()),
+        id_to_row=id_to_row, title_to_rows=title_to_rows, facet_store=facet_store, columns=result_columns(movie_df)
+    )
+    catalog.neighbours = compute_neighbour_table(catalog)
+    return catalog
+
+def milliseconds(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+def intra_list_similarity(vectors):
+    # Mean composite cosine between every pair of results: lower is more varied.
+    similarity = vectors @ vectors.T
+    n = len(vectors)
+    return float((similarity.sum() - np.trace(similarity)) / (n * (n - 1)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and effect of MMR diversity re-ranking on similar-movie searches.")
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--k', type=int, nargs='+', default=[5, 10, 20, 50])
+    parser.add_argument('--diversity', type=float, default=0.3)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.rows)
+    sketch = catalog.neighbours.sketch
+    rng = np.random.default_rng(1)
+    query_rows = rng.choice(args.rows, args.queries, replace=False)
+    movie_ids = catalog.movie_df['id'].to_numpy()[query_rows].tolist()
+    composites = catalog.faiss_index.reconstruct_n(0, catalog.faiss_index.ntotal)
+
+    print(f"{args.rows} movies, {args.queries} queries, diversity={args.diversity}, candidate pool up to {catalog.neighbours.k}\n")
+    print(f"{'k':>4} {'MMR sketch (ms)':>16} {'MMR exact (ms)':>15} {'search (ms)':>12} {'diverse (ms)':>13} "
+          f"{'relevance':>10} {'diverse':>8} {'ILS':>6} {'diverse':>8}")
+
+    for k in args.k:
+        pool_k = mmr_pool_size(k, catalog.neighbours.k)
+        scores, candidates = catalog.faiss_index.search(composites[query_rows], pool_k)
+
+        # The re-ranking stage alone, from candidate rows and scores to the final order.
+        sketch_ms = np.median([
+            milliseconds(lambda: mmr_order(scores[i], candidate_vectors(catalog, candidates[i]), k, args.diversity), 5)
+            for i in range(args.queries)
+        ])
+        catalog.neighbours.sketch = None
+        exact_ms = np.median([
+            milliseconds(lambda: mmr_order(scores[i], candidate_vectors(catalog, candidates[i]), k, args.diversity), 5)
+            for i in range(args.queries)
+        ])
+        catalog.neighbours.sketch = sketch
+
+        plain_ms = np.median([milliseconds(lambda: find_similar_movies(movie_id, k=k, catalog=catalog), 3) for movie_id in movie_ids])
+        diverse_ms = np.median([
+            milliseconds(lambda: find_similar_movies(movie_id, k=k, catalog=catalog, diversity=args.diversity), 3)
+            for movie_id in movie_ids
+        ])
+
+        quality = {'plain': ([], []), 'diverse': ([], [])}
+        for movie_id in movie_ids:
+            for name, diversity in (('plain', None), ('diverse', args.diversity)):
+                results, _ = find_similar_movies(movie_id, k=k, catalog=catalog, diversity=diversity)
+                rows = np.array([catalog.row_for_id(movie.id) for movie in results])
+                quality[name][0].append(np.mean([movie.similarity_score for movie in results]))
+                quality[name][1].append(intra_list_similarity(composites[rows]))
+
+        print(f"{k:>4} {sketch_ms:>16.3f} {exact_ms:>15.3f} {plain_ms:>12.2f} {diverse_ms:>13.2f} "
+              f"{np.mean(quality['plain'][0]):>10.3f} {np.mean(quality['diverse'][0]):>8.3f} "
+              f"{np.mean(quality['plain'][1]):>6.3f} {np.mean(quality['diverse'][1]):>8.3f}")
+
+if __name__ == '__main__':
+    main()
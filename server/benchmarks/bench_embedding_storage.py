@@ -0,0 +1,86 @@
+import argparse
+import time
+import numpy as np
+import psycopg2
+from psycopg2.extensions import FLOATARRAY
+from movie_similarity_search import (
+    EMBEDDING_BLOB_DTYPE, EMBEDDING_COLUMNS, EMBEDDING_DIM, EMBEDDING_STORAGES,
+    fetch_movie_rows, frame_facet, movie_query, stack_embedding_column
+)
+
+def wire_values(n, storage, seed=0):
+    # Column values as Postgres sends them in the text protocol psycopg2 uses: float8[] literals
+    # of float32 model outputs, or hex-escaped bytea.
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((n, EMBEDDING_DIM)).astype(np.float32)
+    if storage == 'array':
+        return ['{' + ','.join(repr(value) for value in row.astype(np.float64).tolist()) + '}' for row in embeddings]
+    return ['\\x' + row.astype(EMBEDDING_BLOB_DTYPE).tobytes().hex() for row in embeddings]
+
+def decode_column(values, storage):
+    typecast = FLOATARRAY if storage == 'array' else psycopg2.BINARY
+    return [typecast(value, None) for value in values]
+
+def simulate(n, columns):
+    print(f"{n} movies x {columns} embedding columns, decoded with psycopg2's typecasters\n")
+    print(f"{'storage':<8} {'wire (MB)':>10} {'typecast (s)':>13} {'stack (s)':>10} {'total (s)':>10}")
+
+    matrices = []
+    for storage in EMBEDDING_STORAGES:
+        values = wire_values(n, storage)
+        wire_bytes = sum(len(value) for value in values) * columns
+
+        start = time.perf_counter()
+        for _ in range(columns):
+            decoded = decode_column(values, storage)
+        typecast_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(columns):
+            stacked = stack_embedding_column(decoded, dtype=np.float32)
+        stack_time = time.perf_counter() - start
+        matrices.append(stacked)
+
+        print(f"{storage:<8} {wire_bytes / 1e6:>10.1f} {typecast_time:>13.2f} {stack_time:>10.2f} {typecast_time + stack_time:>10.2f}")
+
+    if not np.array_equal(matrices[0], matrices[1]):
+        raise ValueError("Array and bytea storage decoded to different matrices.")
+
+def measure_database(dsn):
+    conn = psycopg2.connect(dsn)
+    cursor = conn.cursor()
+    try:
+        print(f"{'storage':<8} {'stored (MB)':>12} {'wire (MB)':>10} {'load (s)':>9}")
+        for storage in EMBEDDING_STORAGES:
+            sources = [movie_query('{' + column + '}', storage) for column in EMBEDDING_COLUMNS]
+            cursor.execute(
+                f"SELECT sum({' + '.join(f'coalesce(pg_column_size({source}), 0)' for source in sources)}), "
+                f"sum({' + '.join(f'coalesce(octet_length({source}::text), 0)' for source in sources)}) "
+                f"FROM movie WHERE {sources[-1]} IS NOT NULL"
+            )
+            stored_bytes, wire_bytes = cursor.fetchone()
+
+            start = time.perf_counter()
+            movie_df = fetch_movie_rows(cursor, storage=storage)
+            for column in EMBEDDING_COLUMNS:
+                frame_facet(movie_df, column, np.float32)
+            load_time = time.perf_counter() - start
+
+            print(f"{storage:<8} {(stored_bytes or 0) / 1e6:>12.1f} {(wire_bytes or 0) / 1e6:>10.1f} {load_time:>9.2f}")
+    finally:
+        cursor.close()
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes on the wire and decode time of float8[] vs float32 bytea embeddings.")
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--dsn', help="Also measure a database migrated with migrate_embeddings_to_bytea.")
+    args = parser.parse_args()
+
+    simulate(args.rows, len(EMBEDDING_COLUMNS))
+    if args.dsn:
+        print()
+        measure_database(args.dsn)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from ann_index import IndexConfig
+from movie_similarity_search import (
+    EMBEDDING_DIM, MOVIE_COLUMNS, build_composite_from_store, build_facet_store, build_faiss_index,
+    fetch_movie_rows, load_all_movies_and_build_index, metadata_frame
+)
+
+def make_row(movie_id, rng):
+    # Fresh lists per row, as psycopg2 returns them; sharing lists would hide the cost being measured.
+    row = {column: None for column in MOVIE_COLUMNS}
+    row.update({
+        'id': movie_id, 'title': f"Movie {movie_id}", 'overview': f"overview {movie_id}",
+        'vote_average': 7.0, 'vote_average_scaled': float(rng.random()), 'release_date': None,
+        'keywords': 'space heist', 'genres': ['Drama'],
+    })
+    for column in MOVIE_COLUMNS:
+        if column.endswith('_emb') or column == 'classified_emb_combined':
+            row[column] = rng.standard_normal(EMBEDDING_DIM).tolist()
+    return tuple(row[column] for column in MOVIE_COLUMNS)
+
+class FakeCursor:
+    # Enough of a psycopg2 cursor for the loaders: rows are generated only when fetched.
+    def __init__(self, n, seed=0):
+        self.n = n
+        self.position = 0
+        self.rng = np.random.default_rng(seed)
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchone(self):
+        return (self.n,)
+
+    def fetchmany(self, size):
+        end = min(self.position + size, self.n)
+        rows = [make_row(movie_id + 1, self.rng) for movie_id in range(self.position, end)]
+        self.position = end
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(self.n - self.position)
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, n):
+        self.n = n
+
+    def cursor(self, name=None):
+        return FakeCursor(self.n)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def load_with_fetchall(connect, cursor, index_config):
+    # The loader as it was: every row materialised as Python floats before any vector is built.
+    df = fetch_movie_rows(cursor)
+    facet_store = build_facet_store(df)
+    index = build_faiss_index(build_composite_from_store(facet_store), index_config)
+    return metadata_frame(df), facet_store, index
+
+def measure(loader, n, index_config):
+    connect = FakeConnection(n)
+    tracemalloc.start()
+    start = time.perf_counter()
+    movie_df, facet_store, index = loader(connect, connect.cursor(), index_config)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, facet_store.nbytes
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak Python/numpy memory of the fetchall loader vs the streaming loader.")
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--index-type', default='flat')
+    args = parser.parse_args()
+
+    index_config = IndexConfig(index_type=args.index_type)
+    print(f"{args.rows} movies, {index_config.describe()} index (FAISS's own allocations are not traced)\n")
+    print(f"{'loader':<10} {'time (s)':>9} {'peak (MB)':>10} {'facets (MB)':>12}")
+
+    for name, loader in (('fetchall', load_with_fetchall), ('streaming', load_all_movies_and_build_index)):
+        elapsed, peak, facet_bytes = measure(loader, args.rows, index_config)
+        print(f"{name:<10} {elapsed:>9.2f} {peak / 1e6:>10.1f} {facet_bytes / 1e6:>12.1f}")
+
+if __name__ == '__main__':
+    main()
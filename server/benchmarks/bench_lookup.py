@@ -0,0 +1,49 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from movie_similarity_search import MovieCatalog, build_lookup_maps, find_movies_by_id, result_columns
+
+def make_metadata_df(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = rng.permutation(np.arange(1, 3 * n))[:n]
+    return pd.DataFrame({
+        'id': ids, 'title': [f"Movie {i}" for i in ids], 'overview': '', 'vote_average': 7.0,
+        'atmosphere': '', 'narrative': '', 'themes': '',
+    })
+
+def time_per_call(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Movie id/title lookup cost: boolean-mask scan vs prebuilt catalog maps.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'id mask (us)':>14} {'id map (us)':>13} {'title mask (us)':>17} {'title map (us)':>16}")
+
+    for n in args.sizes:
+        movie_df = make_metadata_df(n)
+        id_to_row, title_to_rows = build_lookup_maps(movie_df)
+        catalog = MovieCatalog(
+            movie_df=movie_df, faiss_index=None, id_to_row=id_to_row, title_to_rows=title_to_rows, columns=result_columns(movie_df)
+        )
+
+        rng = np.random.default_rng(1)
+        rows = rng.integers(0, n, args.queries)
+        ids = movie_df['id'].to_numpy()[rows].tolist()
+        titles = movie_df['title'].to_numpy()[rows].tolist()
+
+        id_mask = time_per_call(lambda movie_id: movie_df[movie_df['id'] == movie_id], ids)
+        id_map = time_per_call(lambda movie_id: find_movies_by_id(movie_id, catalog), ids)
+        title_mask = time_per_call(lambda title: movie_df[movie_df['title'] == title].index[0], titles)
+        title_map = time_per_call(lambda title: catalog.title_to_rows[title][0], titles)
+
+        print(f"{n:>10} {id_mask:>14.1f} {id_map:>13.1f} {title_mask:>17.1f} {title_map:>16.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from movie_similarity_search import FACET_NAMES, composite_rows, facet_scores, find_similar_movies, similar_movie_results
+from search_results import format_similar_movies
+from benchmarks.bench_diversity import make_catalog
+
+FRAME_COLUMNS = ['id', 'title', 'overview', 'vote_average', 'atmosphere', 'narrative', 'themes', 'similarity_score']
+FACET_SCORE_COLUMNS = [f"{name}_score" for name in FACET_NAMES]
+
+def frame_results(catalog, rows, similarities, query_row):
+    # The DataFrame path as it was: copy the hit rows, add and sort by the score, project, then
+    # look the rows up again by id to attach the facet breakdown.
+    similar_movies_df = catalog.movie_df.iloc[rows].copy()
+    similar_movies_df['similarity_score'] = similarities.astype('float32')
+    similar_movies_df = similar_movies_df.sort_values(by='similarity_score', ascending=False).reset_index(drop=True)
+    result_df = similar_movies_df[FRAME_COLUMNS]
+
+    result_rows = np.array([catalog.row_for_id(movie_id) for movie_id in result_df['id'].tolist()], dtype='int64')
+    scores = pd.DataFrame(facet_scores(catalog, [query_row], result_rows).astype('float32'), columns=FACET_SCORE_COLUMNS, index=result_df.index)
+    return pd.concat([result_df, scores], axis=1)
+
+def format_frame(result_df):
+    output = ""
+    for idx, row in result_df.iterrows():
+        output += f"{idx+1}. {row['title']} (ID: {row['id']})\n"
+        output += f"   Rating: {row['vote_average']}/10\n"
+        output += f"   Similarity: {row['similarity_score']:.3f}\n"
+        scores = sorted(((row[column], name) for name, column in zip(FACET_NAMES, FACET_SCORE_COLUMNS)), reverse=True)
+        output += f"   Matches on: {', '.join(f'{name} {score:.3f}' for score, name in scores)}\n"
+        output += f"   Overview: {row['overview'][:100]}...\n\n"
+    return output
+
+def microseconds(fn, calls):
+    start = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - start) / len(calls) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call cost of building and formatting similar-movie results: DataFrames vs records.")
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, nargs='+', default=[5, 10, 50])
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.rows)
+    rng = np.random.default_rng(1)
+    query_rows = rng.choice(args.rows, args.queries, replace=False)
+    movie_ids = catalog.movie_df['id'].to_numpy()[query_rows].tolist()
+    queries = composite_rows(catalog.facet_store, query_rows)
+
+    print(f"{args.rows} movies, flat index, mean over {args.queries} queries\n")
+    print(f"{'k':>4} {'FAISS search (us)':>18} {'frames (us)':>12} {'+ format (us)':>14} {'records (us)':>13} {'+ format (us)':>14} {'find_similar (us)':>18}")
+
+    for k in args.k:
+        search_us = microseconds(lambda query: catalog.faiss_index.search(query[None, :], k + 1), [(query,) for query in queries])
+        similarities, hits = catalog.faiss_index.search(queries, k + 1)
+        calls = [(hits[i][hits[i] != query_rows[i]][:k], similarities[i][hits[i] != query_rows[i]][:k], query_rows[i]) for i in range(args.queries)]
+
+        frames_us = microseconds(lambda rows, scores, query_row: frame_results(catalog, rows, scores, query_row), calls)
+        frames_format_us = microseconds(lambda rows, scores, query_row: format_frame(frame_results(catalog, rows, scores, query_row)), calls)
+        records_us = microseconds(lambda rows, scores, query_row: similar_movie_results(catalog, rows, scores, [query_row]), calls)
+        records_format_us = microseconds(
+            lambda rows, scores, query_row: format_similar_movies(similar_movie_results(catalog, rows, scores, [query_row])[0]), calls
+        )
+        end_to_end_us = microseconds(lambda movie_id: find_similar_movies(movie_id, k=k, catalog=catalog), [(movie_id,) for movie_id in movie_ids])
+
+        print(f"{k:>4} {search_us:>18.0f} {frames_us:>12.0f} {frames_format_us:>14.0f} {records_us:>13.0f} {records_format_us:>14.0f} {end_to_end_us:>18.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import time
+import numpy as np
+from thefuzz import process
+from title_matcher import TitleMatcher
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ten', 'dor', 'sha', 'vel', 'qui', 'bar', 'nox', 'ul', 'fe', 'zan', 'the', 'o']
+
+def make_titles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    words = sorted({''.join(rng.choice(SYLLABLES, size=rng.integers(1, 4))) for _ in range(20_000)})
+    words = np.array(words)
+    titles = []
+    for _ in range(n):
+        title = ' '.join(words[rng.integers(0, len(words), rng.integers(1, 5))]).title()
+        if rng.random() < 0.1:
+            title += f" {rng.integers(2, 5)}"
+        titles.append(title)
+    return titles
+
+def with_typo(title, rng):
+    chars = list(title)
+    i = int(rng.integers(0, len(chars)))
+    if rng.random() < 0.5 and len(chars) > 3:
+        del chars[i]
+    else:
+        j = min(i + 1, len(chars) - 1)
+        chars[i], chars[j] = chars[j], chars[i]
+    return ''.join(chars)
+
+def latencies_ms(fn, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+def main():
+    parser = argparse.ArgumentParser(description="Trigram title matcher vs linear thefuzz extractOne.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--linear-queries', type=int, default=20,
+                        help="Queries timed against the linear scan, which takes seconds at 1M titles.")
+    args = parser.parse_args()
+
+    print(f"{'titles':>10} {'build (s)':>10} {'trigram p50/p99 (ms)':>22} {'linear p50/p99 (ms)':>21} "
+          f"{'same score':>11} {'intended (trigram/linear)':>26}")
+
+    for n in args.sizes:
+        titles = make_titles(n)
+        rng = np.random.default_rng(1)
+        targets = [titles[i] for i in rng.integers(0, n, args.queries)]
+        queries = [with_typo(title, rng) for title in targets]
+
+        start = time.perf_counter()
+        matcher = TitleMatcher(titles)
+        build_time = time.perf_counter() - start
+
+        trigram = latencies_ms(lambda query: matcher.match(query, limit=5), queries)
+        linear_queries = queries[:args.linear_queries]
+        linear = latencies_ms(lambda query: process.extractOne(query, titles), linear_queries)
+
+        # Titles can tie, so agreement compares best scores rather than rows. Misses against the
+        # exhaustive scan are mostly WRatio partial matches on very short titles ("The", "O"),
+        # so also report how often each side returns the title the typo was made from.
+        same_score = []
+        intended = []
+        for query, target in zip(linear_queries, targets):
+            row, score = matcher.match(query, limit=1)[0]
+            linear_title, linear_score = process.extractOne(query, titles)
+            same_score.append(score == linear_score)
+            intended.append((titles[row] == target, linear_title == target))
+        intended = np.mean(intended, axis=0)
+
+        print(f"{n:>10} {build_time:>10.1f} {trigram[0]:>10.2f} / {trigram[1]:<9.2f} "
+              f"{linear[0]:>9.1f} / {linear[1]:<9.1f} {np.mean(same_score):>11.0%} "
+              f"{intended[0]:>16.0%} / {intended[1]:<7.0%}")
+
+if __name__ == '__main__':
+    main()
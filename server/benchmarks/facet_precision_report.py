@@ -0,0 +1,106 @@
+import argparse
+import json
+import time
+import faiss
+import numpy as np
+from ann_index import IndexConfig, create_index
+from asset_store import open_asset_store
+from facet_store import FacetStore, FACET_PRECISIONS
+from movie_similarity_search import COMPOSITE_FACETS, DEFAULT_WEIGHTS, EMBEDDING_DIM, EXACT_FACETS, build_composite_from_store
+from benchmarks.synthetic import make_clustered_vectors
+
+COMPOSITE_INDEX_TYPES = ('flat', 'fp16', 'sq8')
+
+def make_facet_store(n, seed=0):
+    rng = np.random.default_rng(seed)
+    facets = {}
+    for i, (name, column, _) in enumerate(COMPOSITE_FACETS):
+        if column == 'vote_average_scaled':
+            facets[name] = rng.random((n, 1))
+        else:
+            facets[name] = make_clustered_vectors(n, EMBEDDING_DIM, seed=seed + i)
+    return FacetStore(facets)
+
+def exact_top_k(facet_store, query_rows, k):
+    # Brute-force weighted cosine, the same score every search path ranks by.
+    rows = np.arange(len(facet_store))
+    results = []
+    for query_row in query_rows:
+        scores = facet_store.weighted_similarity(query_row, rows, DEFAULT_WEIGHTS)
+        scores[query_row] = -np.inf
+        top = np.argpartition(-scores, k)[:k]
+        results.append((top[np.argsort(-scores[top])], scores))
+    return results
+
+def compare_rankings(reference, candidate, k):
+    recall = []
+    top1 = []
+    score_errors = []
+    for (reference_top, reference_scores), (top, scores) in zip(reference, candidate):
+        recall.append(len(np.intersect1d(reference_top, top)) / k)
+        top1.append(reference_top[0] == top[0])
+        score_errors.append(np.abs(scores[reference_top] - reference_scores[reference_top]))
+
+    score_errors = np.concatenate(score_errors)
+    return {
+        'recall': float(np.mean(recall)),
+        'top1_agreement': float(np.mean(top1)),
+        'mean_abs_score_error': float(score_errors.mean()),
+        'max_abs_score_error': float(score_errors.max()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Ranking change of float16/int8 facet storage and SQ composite indexes versus float32.")
+    parser.add_argument('--store', help="Read facets from an asset store directory instead of synthetic data.")
+    parser.add_argument('--rows', type=int, default=20_000, help="Synthetic catalogue size when no store is given.")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--json', help="Also write the report to this file.")
+    args = parser.parse_args()
+
+    if args.store:
+        _, facet_store = open_asset_store(args.store)
+        facet_store = facet_store.encoded('float32', exact=EXACT_FACETS)
+    else:
+        facet_store = make_facet_store(args.rows)
+
+    rng = np.random.default_rng(1)
+    query_rows = rng.choice(len(facet_store), size=min(args.queries, len(facet_store)), replace=False)
+    reference = exact_top_k(facet_store, query_rows, args.k)
+
+    print(f"{len(facet_store)} movies, {len(query_rows)} queries, recall@{args.k} vs float32\n")
+    print(f"{'facet store':<14} {'size (MB)':>10} {'recall':>8} {'top-1':>8} {'mean |err|':>11} {'max |err|':>10}")
+
+    report = {'facet_store': [], 'composite_index': []}
+    for precision in FACET_PRECISIONS:
+        encoded = facet_store.encoded(precision, exact=EXACT_FACETS)
+        result = compare_rankings(reference, exact_top_k(encoded, query_rows, args.k), args.k)
+        result.update({'precision': precision, 'size_mb': encoded.nbytes / 1e6})
+        report['facet_store'].append(result)
+
+        print(f"{precision:<14} {result['size_mb']:>10.1f} {result['recall']:>8.3f} {result['top1_agreement']:>8.3f} "
+              f"{result['mean_abs_score_error']:>11.2e} {result['max_abs_score_error']:>10.2e}")
+
+    composite_vectors = build_composite_from_store(facet_store)
+    queries = composite_vectors[query_rows]
+    _, ground_truth = create_index(composite_vectors, IndexConfig(index_type='flat')).search(queries, args.k)
+
+    print(f"\n{'composite index':<14} {'size (MB)':>10} {'recall':>8} {'build (s)':>10}")
+    for index_type in COMPOSITE_INDEX_TYPES:
+        start = time.perf_counter()
+        index = create_index(composite_vectors, IndexConfig(index_type=index_type))
+        build_time = time.perf_counter() - start
+
+        _, found = index.search(queries, args.k)
+        recall = sum(len(np.intersect1d(found[i], ground_truth[i])) for i in range(len(queries))) / ground_truth.size
+        result = {'index_type': index_type, 'size_mb': faiss.serialize_index(index).nbytes / 1e6, 'recall': recall, 'build_s': build_time}
+        report['composite_index'].append(result)
+
+        print(f"{index_type:<14} {result['size_mb']:>10.1f} {recall:>8.3f} {build_time:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+import argparse
+import json
+import sys
+import time
+from dataclasses import fields
+import numpy as np
+from ann_index import IndexConfig, apply_search_params
+from facet_store import FACET_PRECISIONS
+from movie_similarity_search import (
+    DEFAULT_WEIGHTS, DESCRIPTION_MODES, WEIGHT_PROFILES, build_catalog, compute_neighbour_table, find_movies_by_description,
+    find_similar_movies, load_movie_assets, resolve_diversity, resolve_weights
+)
+from benchmarks.synthetic import StubEncoder, build_synthetic_index, synthetic_facets, synthetic_metadata
+
+# Retrieval quality and latency of search configurations against a labelled query set:
+#
+#   {"similar": [{"movie_id": 603, "relevant": [604, 605]}, ...],
+#    "description": [{"query": "a hacker learns reality is simulated", "relevant": {"603": 3, "604": 1}}, ...]}
+#
+# "relevant" is a list of movie ids, or ids mapped to graded relevance for nDCG. --make-labels
+# writes a silver set to start from: each seed's exact top-k under the default weights, and
+# known-item description queries cut from movie overviews.
+LOCAL_MODEL_PATH = './sbert_model'
+KNOWN_ITEM_WORDS = 12
+WARMUP_QUERIES = 5
+
+def parse_config(spec):
+    # "name:key=value,..." where keys are IndexConfig fields, precision, weights (a profile),
+    # any facet name (a weight), diversity, mode and neighbours, e.g.
+    # "hnsw-int8:index_type=hnsw,ef_search=64,precision=int8" or "moody:weights=mood,diversity=0.3".
+    name, _, options = spec.partition(':')
+    index_fields = {field.name for field in fields(IndexConfig)}
+    config = {'name': name, 'index': {}, 'precision': 'float32', 'diversity': None, 'mode': 'hybrid', 'neighbours': True}
+    profile = 'default'
+    overrides = {}
+
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        key, value = key.strip(), value.strip()
+        if key in index_fields:
+            config['index'][key] = value if key == 'index_type' else int(value)
+        elif key == 'weights':
+            resolve_weights(value)
+            profile = value
+        elif key in DEFAULT_WEIGHTS:
+            overrides[key] = float(value)
+        elif key == 'diversity':
+            config['diversity'] = resolve_diversity(value)
+        elif key == 'neighbours':
+            config['neighbours'] = value.lower() in ('1', 'true', 'yes')
+        elif key in ('precision', 'mode'):
+            config[key] = value
+        else:
+            raise ValueError(f"Unknown option '{key}' in config '{spec}'.")
+
+    if config['precision'] not in FACET_PRECISIONS:
+        raise ValueError(f"Unknown facet precision '{config['precision']}'. Expected one of {FACET_PRECISIONS}.")
+    if config['mode'] not in DESCRIPTION_MODES:
+        raise ValueError(f"Unknown description mode '{config['mode']}'. Expected one of {DESCRIPTION_MODES}.")
+
+    config['index'] = IndexConfig(**config['index'])
+    config['weights'] = resolve_weights({**WEIGHT_PROFILES[profile], **overrides})
+    return config
+
+def describe(config):
+    parts = [config['index'].describe(), config['precision']]
+    if config['weights']:
+        parts.append('weights ' + ','.join(f"{name}={weight:g}" for name, weight in config['weights'].items() if weight != DEFAULT_WEIGHTS[name]))
+    if config['diversity']:
+        parts.append(f"diversity {config['diversity']:g}")
+    parts.append(config['mode'])
+    if not config['neighbours']:
+        parts.append('no neighbour table')
+    return ', '.join(parts)
+
+def build_key(config):
+    # Configs differing only in search-time settings share one catalog.
+    return json.dumps([config['index'].build_key(), config['precision'], config['neighbours']])
+
+def config_catalog(movie_df, facet_store, config):
+    # The composite index is built from the full-precision store, as the pipeline does; the
+    # catalog then encodes its facets and overview index at the config's precision.
+    start = time.perf_counter()
+    index = build_synthetic_index(facet_store, config['index'])
+    catalog = build_catalog(movie_df, index, facet_store=facet_store, precision=config['precision'])
+    if config['neighbours']:
+        catalog.neighbours = compute_neighbour_table(catalog)
+    return catalog, time.perf_counter() - start
+
+def relevance(labels):
+    if isinstance(labels, dict):
+        return {int(movie_id): float(grade) for movie_id, grade in labels.items()}
+    return {int(movie_id): 1.0 for movie_id in labels}
+
+def recall_at_k(ranked, relevant, k):
+    return len(set(ranked[:k]) & set(relevant)) / min(len(relevant), k)
+
+def ndcg_at_k(ranked, relevant, k):
+    # Exponential gain, so a grade-3 movie at rank 1 matters much more than a grade-1 one.
+    gains = [2 ** relevant.get(movie_id, 0) - 1 for movie_id in ranked[:k]]
+    ideal = sorted((2 ** grade - 1 for grade in relevant.values()), reverse=True)[:k]
+    discounts = 1 / np.log2(np.arange(2, k + 2))
+    return float(np.dot(gains, discounts[:len(gains)]) / np.dot(ideal, discounts[:len(ideal)]))
+
+def reciprocal_rank(ranked, relevant, k):
+    for rank, movie_id in enumerate(ranked[:k], start=1):
+        if movie_id in relevant:
+            return 1 / rank
+    return 0.0
+
+METRICS = {'recall': recall_at_k, 'ndcg': ndcg_at_k, 'mrr': reciprocal_rank}
+
+def run_queries(calls, k):
+    # calls are (search, relevant) pairs; every query is timed and scored individually so
+    # configurations can be compared query by query.
+    for search, _ in calls[:WARMUP_QUERIES]:
+        search()
+
+    latencies = np.empty(len(calls))
+    scores = {name: np.empty(len(calls)) for name in METRICS}
+    errors = 0
+    for i, (search, relevant) in enumerate(calls):
+        start = time.perf_counter()
+        results, error = search()
+        latencies[i] = time.perf_counter() - start
+        errors += bool(error)
+        ranked = [movie.id for movie in results]
+        for name, metric in METRICS.items():
+            scores[name][i] = metric(ranked, relevant, k)
+
+    return {
+        'queries': len(calls),
+        'errors': errors,
+        'metrics': {name: float(values.mean()) for name, values in scores.items()},
+        'per_query': {name: values.tolist() for name, values in scores.items()},
+        'latency_ms': {
+            'p50': float(np.percentile(latencies, 50) * 1000),
+            'p95': float(np.percentile(latencies, 95) * 1000),
+            'p99': float(np.percentile(latencies, 99) * 1000),
+            'mean': float(latencies.mean() * 1000),
+        },
+    }
+
+def evaluate(catalog, config, labels, model, k):
+    apply_search_params(catalog.faiss_index, config['index'])
+    similar = [
+        (lambda movie_id=item['movie_id']: find_similar_movies(
+            movie_id, k=k, catalog=catalog, weights=config['weights'], diversity=config['diversity']
+        ), relevance(item['relevant']))
+        for item in labels.get('similar', []) if item['relevant']
+    ]
+    description = [
+        (lambda query=item['query']: find_movies_by_description(
+            query, k=k, model=model, catalog=catalog, mode=config['mode']
+        ), relevance(item['relevant']))
+        for item in labels.get('description', []) if item['relevant']
+    ]
+    return {task: run_queries(calls, k) for task, calls in (('similar', similar), ('description', description)) if calls}
+
+def make_labels(movie_df, facet_store, n_seeds, k, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = movie_df['id'].to_numpy()
+    rows = np.arange(len(movie_df))
+    seed_rows = rng.choice(len(movie_df), min(n_seeds, len(movie_df)), replace=False)
+
+    similar = []
+    for query_row in seed_rows.tolist():
+        scores = facet_store.weighted_similarity(query_row, rows, DEFAULT_WEIGHTS)
+        scores[query_row] = -np.inf
+        top = np.argpartition(-scores, k)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        # Graded by exact rank: the true nearest neighbour is worth k, the k-th is worth 1.
+        similar.append({'movie_id': int(ids[query_row]), 'relevant': {str(ids[row]): k - rank for rank, row in enumerate(top.tolist())}})
+
+    description = []
+    for query_row in rng.choice(len(movie_df), min(n_seeds, len(movie_df)), replace=False).tolist():
+        words = str(movie_df.at[query_row, 'overview'] or '').split()
+        if words:
+            description.append({'query': ' '.join(words[:KNOWN_ITEM_WORDS]), 'relevant': [int(ids[query_row])]})
+
+    return {'similar': similar, 'description': description}
+
+def load_model(args):
+    if args.synthetic:
+        return StubEncoder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(args.model, device='cpu')
+
+def paired_changes(base, head):
+    # Per-query differences on the queries both configs answered, so a change is not hidden by
+    # averaging wins on some queries against losses on others.
+    changes = {}
+    for name in METRICS:
+        deltas = np.array(head['per_query'][name]) - np.array(base['per_query'][name])
+        changes[name] = {
+            'delta': float(deltas.mean()),
+            'better': int((deltas > 1e-9).sum()),
+            'worse': int((deltas < -1e-9).sum()),
+        }
+    changes['latency_p50'] = head['latency_ms']['p50'] / base['latency_ms']['p50'] - 1
+    changes['latency_p95'] = head['latency_ms']['p95'] / base['latency_ms']['p95'] - 1
+    return changes
+
+def print_report(report, k):
+    print(f"k={k}\n")
+    for task in ('similar', 'description'):
+        rows = [(name, result['tasks'][task]) for name, result in report['configs'].items() if task in result['tasks']]
+        if not rows:
+            continue
+
+        print(f"{task} ({rows[0][1]['queries']} queries)")
+        print(f"{'config':<20} {f'recall@{k}':>10} {f'nDCG@{k}':>9} {'MRR':>7} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'errors':>7}")
+        for name, result in rows:
+            metrics, latency = result['metrics'], result['latency_ms']
+            print(f"{name:<20} {metrics['recall']:>10.4f} {metrics['ndcg']:>9.4f} {metrics['mrr']:>7.4f} "
+                  f"{latency['p50']:>9.3f} {latency['p95']:>9.3f} {latency['p99']:>9.3f} {result['errors']:>7}")
+        print()
+
+    baseline = next(iter(report['configs']))
+    for name, changes in report['comparisons'].items():
+        print(f"{name} vs {baseline}")
+        for task, task_changes in changes.items():
+            quality = '  '.join(
+                f"{metric} {task_changes[metric]['delta']:+.4f} ({task_changes[metric]['better']} better, {task_changes[metric]['worse']} worse)"
+                for metric in METRICS
+            )
+            print(f"  {task:<12} {quality}  p50 {task_changes['latency_p50']:+.1%}  p95 {task_changes['latency_p95']:+.1%}")
+        print()
+
+def regressions(report, max_drop):
+    found = []
+    for name, changes in report['comparisons'].items():
+        for task, task_changes in changes.items():
+            for metric in METRICS:
+                if task_changes[metric]['delta'] < -max_drop:
+                    found.append(f"{name} {task} {metric} {task_changes[metric]['delta']:+.4f}")
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=(
+        "Offline recall@k, nDCG and MRR with latency for find_similar_movies and "
+        "find_movies_by_description, comparing search configurations against the first one."
+    ))
+    parser.add_argument('--labels', help="Labelled query set (JSON).")
+    parser.add_argument('--config', action='append', default=[], help="name:key=value,... (repeatable; the first is the baseline).")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--synthetic', type=int, help="Evaluate on a synthetic catalogue of this many movies instead of the assets.")
+    parser.add_argument('--model', default=LOCAL_MODEL_PATH, help="SentenceTransformer for description queries on the real catalogue.")
+    parser.add_argument('--make-labels', metavar='PATH', help="Write silver labels for the catalogue to PATH and exit.")
+    parser.add_argument('--seeds', type=int, default=200, help="Queries per task written by --make-labels.")
+    parser.add_argument('--max-drop', type=float, help="Exit non-zero if any metric falls more than this below the baseline.")
+    parser.add_argument('--json', help="Also write the report, with per-query scores, to this file.")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        movie_df = synthetic_metadata(args.synthetic)
+        facet_store = synthetic_facets(movie_df)
+    else:
+        movie_df, facet_store = load_movie_assets()
+
+    if args.make_labels:
+        with open(args.make_labels, 'w') as f:
+            json.dump(make_labels(movie_df, facet_store, args.seeds, args.k), f)
+        print(f"Wrote silver labels for {args.seeds} seeds to {args.make_labels}")
+        return
+
+    if not args.labels:
+        parser.error("--labels is required unless --make-labels is given.")
+    with open(args.labels) as f:
+        labels = json.load(f)
+
+    configs = [parse_config(spec) for spec in args.config or ['default']]
+    if len({config['name'] for config in configs}) != len(configs):
+        parser.error("Config names must be unique.")
+    model = load_model(args)
+
+    report = {'k': args.k, 'configs': {}, 'comparisons': {}}
+    catalog, catalog_key = None, None
+    for config in configs:
+        key = build_key(config)
+        build_s = 0.0
+        if key != catalog_key:
+            catalog = None
+            catalog, build_s = config_catalog(movie_df, facet_store, config)
+            catalog_key = key
+
+        report['configs'][config['name']] = {
+            'description': describe(config),
+            'build_s': build_s,
+            'tasks': evaluate(catalog, config, labels, model, args.k),
+        }
+
+    baseline = report['configs'][configs[0]['name']]['tasks']
+    for config in configs[1:]:
+        tasks = report['configs'][config['name']]['tasks']
+        report['comparisons'][config['name']] = {task: paired_changes(baseline[task], tasks[task]) for task in tasks}
+
+    for name, result in report['configs'].items():
+        print(f"{name}: {result['description']}" + (f", built in {result['build_s']:.1f}s" if result['build_s'] else ''))
+    print()
+    print_report(report, args.k)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.max_drop is not None:
+        found = regressions(report, args.max_drop)
+        for regression in found:
+            print(f"Quality regression: {regression}")
+        if found:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
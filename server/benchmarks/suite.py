@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import faiss
+import numpy as np
+import pandas as pd
+from ann_index import INDEX_TYPES, IndexConfig
+from facet_store import FACET_PRECISIONS
+from movie_similarity_search import find_id_by_title, find_movies_by_description, find_movies_by_id, find_similar_movies
+from benchmarks.synthetic import StubEncoder, synthetic_catalog
+
+# Fully offline: a synthetic catalogue with the real schema and a stub encoder, so runs on any
+# machine and any commit are comparable. 1M rows needs --precision int8 and --index-type sq8
+# (or ivf_pq) to fit in memory; float32 facets and a flat index take about 18 GB there.
+OPERATIONS = ('similar', 'similar_diverse_k50', 'description_dense', 'description_hybrid', 'title', 'by_id')
+# The largest k the diversified search promises sub-millisecond overhead for.
+DIVERSE_K = 50
+DIVERSITY = 0.3
+BUILD_STEPS = ('generate', 'index', 'catalog', 'neighbours')
+WARMUP_QUERIES = 20
+PERCENTILES = (50, 95, 99)
+
+def operation_calls(catalog, k, n_queries, seed=1):
+    # Query movies are drawn from the catalogue: their ids, titles and overviews are the inputs.
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(catalog.movie_df), min(n_queries, len(catalog.movie_df)), replace=False)
+    ids = catalog.movie_df['id'].to_numpy()[rows].tolist()
+    titles = catalog.movie_df['title'].to_numpy()[rows].tolist()
+    overviews = catalog.movie_df['overview'].to_numpy()[rows].tolist()
+    model = StubEncoder()
+
+    return {
+        'similar': [lambda movie_id=movie_id: find_similar_movies(movie_id, k=k, catalog=catalog) for movie_id in ids],
+        'similar_diverse_k50': [
+            lambda movie_id=movie_id: find_similar_movies(movie_id, k=DIVERSE_K, catalog=catalog, diversity=DIVERSITY) for movie_id in ids
+        ],
+        'description_dense': [
+            lambda text=text: find_movies_by_description(text, k=k, model=model, catalog=catalog, mode='dense') for text in overviews
+        ],
+        'description_hybrid': [lambda text=text: find_movies_by_description(text, k=k, model=model, catalog=catalog) for text in overviews],
+        'title': [lambda title=title: find_id_by_title(title, catalog) for title in titles],
+        'by_id': [lambda movie_id=movie_id: find_movies_by_id(movie_id, catalog) for movie_id in ids],
+    }
+
+def time_calls(calls):
+    for call in calls[:WARMUP_QUERIES]:
+        call()
+
+    latencies = np.empty(len(calls))
+    for i, call in enumerate(calls):
+        start = time.perf_counter()
+        _, error = call()
+        latencies[i] = time.perf_counter() - start
+        if error:
+            raise RuntimeError(error)
+
+    report = {f"p{q}_ms": float(np.percentile(latencies, q) * 1000) for q in PERCENTILES}
+    report['mean_ms'] = float(latencies.mean() * 1000)
+    report['qps'] = float(len(latencies) / latencies.sum())
+    return report
+
+def child(n, args, out_path):
+    index_config = IndexConfig(index_type=args.index_type)
+    catalog, build = synthetic_catalog(n, index_config, args.precision, neighbours=args.neighbours, seed=args.seed)
+    build_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    calls = operation_calls(catalog, args.k, args.queries)
+    report = {
+        'build_s': build,
+        'operations': {name: time_calls(calls[name]) for name in OPERATIONS},
+        # ru_maxrss is in KB on Linux.
+        'build_rss_mb': build_rss / 1024,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'facet_store_mb': catalog.facet_store.nbytes / 1e6,
+    }
+    with open(out_path, 'w') as f:
+        json.dump(report, f)
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+def run_metadata(args):
+    commit, dirty = git_commit()
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'faiss': faiss.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'faiss_threads': faiss.omp_get_max_threads(),
+        'config': {
+            'index_type': args.index_type, 'precision': args.precision, 'neighbours': args.neighbours,
+            'k': args.k, 'queries': args.queries, 'seed': args.seed,
+        },
+    }
+
+def print_report(report):
+    meta = report['meta']
+    config = meta['config']
+    print(f"commit {meta['commit'] or 'unknown'}{' (dirty)' if meta['dirty'] else ''}, "
+          f"{config['index_type']} index, {config['precision']} facets, k={config['k']}, {config['queries']} queries\n")
+
+    print(f"{'rows':>9} " + ' '.join(f"{step + ' (s)':>15}" for step in BUILD_STEPS) + f" {'build RSS (MB)':>15} {'peak RSS (MB)':>14}")
+    for size, result in report['sizes'].items():
+        build = ' '.join(f"{result['build_s'][step]:>15.2f}" if step in result['build_s'] else f"{'-':>15}" for step in BUILD_STEPS)
+        print(f"{size:>9} {build} {result['build_rss_mb']:>15.0f} {result['peak_rss_mb']:>14.0f}")
+
+    print(f"\n{'rows':>9} {'operation':<19} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'mean (ms)':>10} {'qps':>9}")
+    for size, result in report['sizes'].items():
+        for name, stats in result['operations'].items():
+            print(f"{size:>9} {name:<19} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} "
+                  f"{stats['mean_ms']:>10.3f} {stats['qps']:>9.0f}")
+
+def compare(base_path, head_path, threshold, metric):
+    # Prints head against base for every size and operation both runs have, and returns
+    # whether any operation got slower by more than threshold (a fraction, 0.1 is 10%).
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+
+    print(f"base {base['meta']['commit'] or base_path}, head {head['meta']['commit'] or head_path}, {metric}\n")
+    if base['meta']['config'] != head['meta']['config']:
+        print(f"Warning: the runs used different settings: {base['meta']['config']} vs {head['meta']['config']}\n")
+
+    print(f"{'rows':>9} {'operation':<19} {'base (ms)':>10} {'head (ms)':>10} {'change':>8}")
+    regressed = False
+    for size in base['sizes']:
+        if size not in head['sizes']:
+            continue
+        for name, stats in base['sizes'][size]['operations'].items():
+            if name not in head['sizes'][size]['operations']:
+                continue
+            before = stats[metric]
+            after = head['sizes'][size]['operations'][name][metric]
+            change = after / before - 1
+            flag = ''
+            if change > threshold:
+                regressed = True
+                flag = '  REGRESSION'
+            print(f"{size:>9} {name:<19} {before:>10.3f} {after:>10.3f} {change:>+8.1%}{flag}")
+
+        before = base['sizes'][size]['peak_rss_mb']
+        after = head['sizes'][size]['peak_rss_mb']
+        print(f"{size:>9} {'peak RSS (MB)':<19} {before:>10.0f} {after:>10.0f} {after / before - 1:>+8.1%}")
+
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=(
+        "Search micro-benchmarks on a synthetic catalogue: build time, per-operation latency "
+        "percentiles and throughput, and peak RSS per catalogue size. Runs offline."
+    ))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--index-type', choices=INDEX_TYPES, default='flat')
+    parser.add_argument('--precision', choices=FACET_PRECISIONS, default='float32')
+    parser.add_argument('--neighbours', action='store_true', help="Precompute the neighbour table, as build_index does.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write the report to this file, for --compare.")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help="Compare two --json reports instead of running.")
+    parser.add_argument('--threshold', type=float, default=0.1, help="Slowdown counted as a regression by --compare.")
+    parser.add_argument('--metric', choices=[f"p{q}_ms" for q in PERCENTILES] + ['mean_ms'], default='p50_ms')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold, args.metric) else 0)
+
+    if args.child:
+        child(args.child, args, args.out)
+        return
+
+    report = {'meta': run_metadata(args), 'sizes': {}}
+    with tempfile.TemporaryDirectory() as scratch:
+        # One process per size, so each size's peak RSS is its own.
+        for n in args.sizes:
+            out_path = os.path.join(scratch, f"{n}.json")
+            command = [
+                sys.executable, '-m', 'benchmarks.suite', '--child', str(n), '--out', out_path, '--queries', str(args.queries),
+                '--k', str(args.k), '--index-type', args.index_type, '--precision', args.precision, '--seed', str(args.seed)
+            ]
+            if args.neighbours:
+                command.append('--neighbours')
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            with open(out_path) as f:
+                report['sizes'][str(n)] = json.load(f)
+
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import hashlib
+import time
+import faiss
+import numpy as np
+import pandas as pd
+from ann_index import IndexConfig, apply_search_params, empty_index
+from facet_store import FacetStore, encode_facet
+from movie_similarity_search import (
+    COMPOSITE_FACETS, EMBEDDING_DIM, EXACT_FACETS, build_catalog, composite_dim, compute_neighbour_table, index_from_store
+)
+
+# TMDB's genre list, so genre filters behave like they do against the real catalogue.
+GENRES = [
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family', 'Fantasy', 'History',
+    'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction', 'TV Movie', 'Thriller', 'War', 'Western',
+]
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ten', 'vor', 'shi', 'dun', 'el', 'bra', 'qui', 'zo', 'mar', 'nes', 'tal', 'gri']
+VOCABULARY_SIZE = 5000
+GENERATE_CHUNK_SIZE = 8192
+
+def make_clustered_vectors(n, d, n_clusters=200, noise=0.6, seed=0):
+    # Random unit vectors have no neighbourhood structure, so synthetic data is drawn around
+    # cluster centres to behave more like genre/theme groups in the real catalogue.
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_clusters, d)).astype('float32')
+    return clustered_chunk(centres, n, noise, rng)
+
+def clustered_chunk(centres, n, noise, rng):
+    vectors = centres[rng.integers(0, len(centres), n)] + noise * rng.standard_normal((n, centres.shape[1])).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def vocabulary(size=VOCABULARY_SIZE, seed=0):
+    # Pronounceable made-up words: real tokens for BM25 and the title matcher, no word list needed.
+    rng = np.random.default_rng(seed)
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES, rng.integers(2, 5))))
+    # Shuffled, so the common (low-rank) words are not all alphabetical neighbours.
+    return rng.permutation(sorted(words)).tolist()
+
+def sentences(rng, words, n, lengths):
+    # Zipf-distributed word choice, so a few words are common and most are rare, as in overviews.
+    ranks = (rng.zipf(1.1, (n, lengths[1])) - 1) % len(words)
+    counts = rng.integers(lengths[0], lengths[1] + 1, n)
+    return [' '.join(words[rank] for rank in row[:count]) for row, count in zip(ranks.tolist(), counts.tolist())]
+
+def synthetic_metadata(n, seed=0):
+    # The metadata_frame schema: every column of MOVIE_COLUMNS except the embeddings.
+    rng = np.random.default_rng(seed)
+    words = vocabulary(seed=seed)
+
+    # Sparse ascending ids, as TMDB ids come back ordered by id with gaps.
+    ids = np.sort(rng.choice(np.arange(1, 3 * n + 1), n, replace=False))
+    titles = [title.title() for title in sentences(rng, words, n, (1, 4))]
+    # A few remakes share a title with an earlier movie.
+    remakes = rng.random(n) < 0.02
+    for row in np.flatnonzero(remakes).tolist():
+        titles[row] = titles[rng.integers(0, n)]
+
+    vote_average = np.round(np.clip(rng.normal(6.3, 1.2, n), 0, 10), 1)
+    genre_counts = rng.integers(1, 4, n)
+    genres = [sorted(rng.choice(GENRES, count, replace=False).tolist()) for count in genre_counts.tolist()]
+    release_dates = pd.Timestamp('1920-01-01') + pd.to_timedelta(rng.integers(0, 105 * 365, n), unit='D')
+
+    return pd.DataFrame({
+        'id': ids,
+        'title': titles,
+        'overview': sentences(rng, words, n, (20, 60)),
+        'vote_average': vote_average,
+        'vote_average_scaled': vote_average / 10,
+        'release_date': release_dates.date,
+        'keywords': sentences(rng, words, n, (3, 8)),
+        'genres': genres,
+        'atmosphere': sentences(rng, words, n, (8, 20)),
+        'narrative': sentences(rng, words, n, (8, 20)),
+        'themes': sentences(rng, words, n, (8, 20)),
+    })
+
+def synthetic_facets(movie_df, precision='float32', n_clusters=200, noise=0.6, seed=0, chunk_size=GENERATE_CHUNK_SIZE):
+    # Generated and encoded chunk by chunk, so a large int8 or float16 store never exists as
+    # float32 in full. int8 scales come from the first chunk; later chunks reuse them.
+    n = len(movie_df)
+    rng = np.random.default_rng(seed)
+    facets = {}
+    scales = {}
+    for name, column, _ in COMPOSITE_FACETS:
+        if column == 'vote_average_scaled':
+            facets[name] = movie_df[column].to_numpy(dtype=np.float64).reshape(-1, 1)
+            continue
+
+        centres = rng.standard_normal((n_clusters, EMBEDDING_DIM)).astype('float32')
+        facet_precision = 'float32' if name in EXACT_FACETS else precision
+        matrix = None
+        for start in range(0, n, chunk_size):
+            chunk, scale = encode_facet(clustered_chunk(centres, min(chunk_size, n - start), noise, rng), facet_precision, scales.get(name))
+            if matrix is None:
+                matrix = np.empty((n, EMBEDDING_DIM), dtype=chunk.dtype)
+            if scale is not None:
+                scales[name] = scale
+            matrix[start:start + len(chunk)] = chunk
+        facets[name] = matrix
+
+    return FacetStore(facets, scales=scales)
+
+def build_synthetic_index(facet_store, index_config):
+    index = empty_index(composite_dim(), len(facet_store), index_config)
+    index_from_store(index, facet_store)
+    return apply_search_params(index, index_config)
+
+def synthetic_catalog(n, index_config=None, precision='float32', neighbours=False, seed=0):
+    # Returns the catalog and how long each build step took, in seconds.
+    index_config = index_config or IndexConfig()
+    timings = {}
+
+    start = time.perf_counter()
+    movie_df = synthetic_metadata(n, seed)
+    facet_store = synthetic_facets(movie_df, precision, seed=seed)
+    timings['generate'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = build_synthetic_index(facet_store, index_config)
+    timings['index'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    catalog = build_catalog(movie_df, index, facet_store=facet_store)
+    timings['catalog'] = time.perf_counter() - start
+
+    if neighbours:
+        start = time.perf_counter()
+        catalog.neighbours = compute_neighbour_table(catalog)
+        timings['neighbours'] = time.perf_counter() - start
+
+    return catalog, timings
+
+class StubEncoder:
+    # Stands in for the SentenceTransformer offline: the same text always maps to the same unit
+    # vector, so the embedding cache and dense search behave as with a real model.
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def encode(self, texts):
+        vectors = np.empty((len(texts), self.dim), dtype='float32')
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], 'little')
+            vectors[i] = np.random.default_rng(seed).standard_normal(self.dim)
+        faiss.normalize_L2(vectors)
+        return vectors
@@ -0,0 +1,14 @@
+import argparse
+from movie_similarity_search import load_or_build_index, precompute_neighbours, NEIGHBOUR_TABLE_K
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the top-K neighbour table for the saved catalogue.")
+    parser.add_argument('--k', type=int, default=NEIGHBOUR_TABLE_K)
+    args = parser.parse_args()
+
+    catalog = load_or_build_index(None, None)
+    precompute_neighbours(catalog, k=args.k)
+    print("Neighbour table saved successfully!")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import os
+import re
+import shutil
+import numpy as np
+from asset_store import write_asset_store, open_asset_store, has_asset_store
+
+REMOVED_IDS_FILE = 'removed_ids.npy'
+SEGMENT_RE = re.compile(r'^segment_(\d{6})$')
+
+def list_segments(delta_path):
+    if not os.path.isdir(delta_path):
+        return []
+    names = sorted(name for name in os.listdir(delta_path) if SEGMENT_RE.match(name))
+    return [os.path.join(delta_path, name) for name in names]
+
+def next_segment_path(delta_path):
+    segments = list_segments(delta_path)
+    sequence = int(SEGMENT_RE.match(os.path.basename(segments[-1])).group(1)) + 1 if segments else 1
+    return os.path.join(delta_path, f"segment_{sequence:06d}")
+
+def write_segment(delta_path, movie_df=None, facet_store=None, removed_ids=()):
+    # A segment is an asset store of the upserted rows plus the removed ids, applied in
+    # sequence order on top of the base catalog. It only becomes visible once renamed.
+    os.makedirs(delta_path, exist_ok=True)
+    path = next_segment_path(delta_path)
+    staging_path = f"{path}.tmp"
+    shutil.rmtree(staging_path, ignore_errors=True)
+
+    if movie_df is not None and len(movie_df):
+        write_asset_store(staging_path, movie_df, facet_store)
+    else:
+        os.makedirs(staging_path)
+    np.save(os.path.join(staging_path, REMOVED_IDS_FILE), np.asarray(removed_ids, dtype='int64'))
+
+    os.replace(staging_path, path)
+    return path
+
+def read_segment(path):
+    movie_df, facet_store = open_asset_store(path, mmap_mode=None) if has_asset_store(path) else (None, None)
+    removed_ids = np.load(os.path.join(path, REMOVED_IDS_FILE))
+    return movie_df, facet_store, removed_ids
+
+def clear_segments(delta_path):
+    for path in list_segments(delta_path):
+        shutil.rmtree(path)
@@ -0,0 +1,20 @@
+import argparse
+import pandas as pd
+from asset_store import write_asset_store
+from movie_similarity_search import DF_PATH, ASSET_STORE_PATH, build_facet_store, metadata_frame
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the pickled movie DataFrame into the memory-mapped asset store.")
+    parser.add_argument('--df', default=DF_PATH)
+    parser.add_argument('--out', default=ASSET_STORE_PATH)
+    args = parser.parse_args()
+
+    # Row order is kept, so the FAISS indexes and neighbour table built from the pickle stay valid.
+    movie_df = pd.read_pickle(args.df).reset_index(drop=True)
+    facet_store = build_facet_store(movie_df)
+    write_asset_store(args.out, metadata_frame(movie_df), facet_store)
+
+    print(f"Wrote {len(movie_df)} movies and {len(facet_store.names)} facets to {args.out}")
+
+if __name__ == '__main__':
+    main()
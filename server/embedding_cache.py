@@ -0,0 +1,77 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+def normalize_query(text):
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+class EmbeddingCache:
+    def __init__(self, max_size=1024, ttl=None):
+        if max_size < 1:
+            raise ValueError("Embedding cache size must be at least 1.")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text):
+        key = normalize_query(text)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, text, embedding):
+        key = normalize_query(text)
+        embedding.setflags(write=False)
+
+        with self._lock:
+            self._entries[key] = (embedding, time.monotonic())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, text, compute):
+        embedding = self.get(text)
+
+        # The forward pass runs outside the lock; two threads missing on the same text
+        # both compute it, which is cheaper than serialising every encode behind one lock.
+        # The model sees the text as written; only the key is normalised, so variants that differ
+        # in case or spacing share the embedding of whichever was computed first.
+        if embedding is None:
+            embedding = compute(text)
+            self.put(text, embedding)
+
+        return embedding
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,136 @@
+import numpy as np
+
+FACET_PRECISIONS = ('float32', 'float16', 'int8')
+DECODE_CHUNK_SIZE = 4096
+# Spare rows reserved when an append outgrows the store, as a fraction of its new size.
+APPEND_HEADROOM = 0.25
+
+def encode_facet(matrix, precision, scale=None):
+    if precision == 'float16':
+        return matrix.astype(np.float16), None
+    if precision == 'int8':
+        # Symmetric per-dimension scale: each dimension's largest magnitude maps to 127. Rows
+        # added later reuse the existing scale and saturate instead of rescaling everything.
+        if scale is None:
+            scale = np.abs(matrix).max(axis=0, initial=0).astype(np.float32) / 127
+            scale[scale == 0] = 1
+        return np.clip(np.round(matrix / scale), -127, 127).astype(np.int8), scale
+    return matrix.astype(np.float32), None
+
+class FacetStore:
+    def __init__(self, facets, sq_norms=None, scales=None):
+        self.facets = facets
+        self.names = list(facets)
+        # Per-dimension dequantisation factors of int8 facets.
+        self.scales = scales or {}
+        # Squared row norms per facet, so any weighting of the composite can be normalised
+        # without touching the embeddings again. Stored copies are passed in, so opening a
+        # memory-mapped store does not page every facet in.
+        if sq_norms is None:
+            sq_norms = np.stack([self.squared_norms(name) for name in self.names], axis=1)
+        self.sq_norms = sq_norms
+        # Arrays with spare rows past len(self) that the facets and sq_norms are views of, set
+        # on stores made by appended.
+        self.buffers = None
+
+    def __len__(self):
+        return len(self.sq_norms)
+
+    @property
+    def precision(self):
+        if self.scales:
+            return 'int8'
+        if any(matrix.dtype == np.float16 for matrix in self.facets.values()):
+            return 'float16'
+        return 'float32'
+
+    @property
+    def nbytes(self):
+        return sum(matrix.nbytes for matrix in self.facets.values()) + sum(scale.nbytes for scale in self.scales.values())
+
+    def squared_norms(self, name):
+        n = len(self.facets[name])
+        sq_norms = np.empty(n, dtype=np.float64)
+        for start in range(0, n, DECODE_CHUNK_SIZE):
+            matrix = self.facet_rows(name, slice(start, start + DECODE_CHUNK_SIZE))
+            sq_norms[start:start + DECODE_CHUNK_SIZE] = np.einsum('ij,ij->i', matrix, matrix, dtype=np.float64)
+        return sq_norms
+
+    def facet_rows(self, name, rows):
+        # Always float32 (or the facet's own wider dtype), whatever the storage precision.
+        matrix = self.facets[name][rows]
+        scale = self.scales.get(name)
+        if scale is not None:
+            return matrix.astype(np.float32) * scale
+        if matrix.dtype == np.float16:
+            return matrix.astype(np.float32)
+        return matrix
+
+    def encoded(self, precision, exact=()):
+        # Facets named in exact keep their dtype; they are tiny and rounding them buys nothing.
+        if precision not in FACET_PRECISIONS:
+            raise ValueError(f"Unknown facet precision '{precision}'. Expected one of {FACET_PRECISIONS}.")
+
+        facets = {}
+        scales = {}
+        for name in self.names:
+            if name in exact:
+                facets[name] = self.facets[name]
+                continue
+            facets[name], scale = encode_facet(self.facet_rows(name, slice(None)), precision)
+            if scale is not None:
+                scales[name] = scale
+
+        return FacetStore(facets, scales=scales)
+
+    def appended(self, other):
+        # other holds unencoded facets of new rows; they are encoded like the existing ones.
+        added = {}
+        for name in self.names:
+            dtype = self.facets[name].dtype
+            if dtype in (np.int8, np.float16):
+                added[name], _ = encode_facet(other.facet_rows(name, slice(None)), self.precision, self.scales.get(name))
+            else:
+                added[name] = other.facet_rows(name, slice(None)).astype(dtype)
+
+        added['sq_norms'] = FacetStore(added, scales=self.scales).sq_norms
+
+        # Rows are written into spare capacity, so a stream of small updates does not copy every
+        # facet each time. The buffers pass to the new store: appending to this one again copies.
+        n, end = len(self), len(self) + len(added['sq_norms'])
+        buffers, self.buffers = self.buffers, None
+        if buffers is None or len(buffers['sq_norms']) < end:
+            capacity = end + int(end * APPEND_HEADROOM)
+            current = dict(self.facets, sq_norms=self.sq_norms)
+            buffers = {}
+            for name, matrix in current.items():
+                buffers[name] = np.empty((capacity,) + matrix.shape[1:], dtype=matrix.dtype)
+                buffers[name][:n] = matrix
+        for name, matrix in added.items():
+            buffers[name][n:end] = matrix
+
+        store = FacetStore({name: buffers[name][:end] for name in self.names}, buffers['sq_norms'][:end], self.scales)
+        store.buffers = buffers
+        return store
+
+    def take(self, rows):
+        facets = {name: np.ascontiguousarray(self.facets[name][rows]) for name in self.names}
+        return FacetStore(facets, self.sq_norms[rows], self.scales)
+
+    def facet_dots(self, query_row, rows):
+        # (len(rows), n_facets) inner products between the query's facets and each row's facets.
+        dots = np.empty((len(rows), len(self.names)), dtype=np.float64)
+        for i, name in enumerate(self.names):
+            dots[:, i] = self.facet_rows(name, rows) @ self.facet_rows(name, query_row)
+        return dots
+
+    def weighted_contributions(self, query_row, rows, weights):
+        # The cosine of the composite vectors that these weights would have built, split into one
+        # term per facet: w^2 * dot / sqrt(sum(w^2 * |q|^2) * sum(w^2 * |c|^2)). Rows sum to the cosine.
+        squared_weights = np.array([weights[name] ** 2 for name in self.names], dtype=np.float64)
+        terms = self.facet_dots(query_row, rows) * squared_weights
+        denominator = np.sqrt((self.sq_norms[query_row] @ squared_weights) * (self.sq_norms[rows] @ squared_weights))[:, None]
+        return np.divide(terms, denominator, out=np.zeros_like(terms), where=denominator > 0)
+
+    def weighted_similarity(self, query_row, rows, weights):
+        return self.weighted_contributions(query_row, rows, weights).sum(axis=1)
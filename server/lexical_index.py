@@ -0,0 +1,158 @@
+import re
+import numpy as np
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_BOOST = 2
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his in into is it its of on or she so
+than that the their them they this to was were which while who will with
+""".split())
+
+def tokenize(text):
+    if not isinstance(text, str):
+        return []
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+def movie_tokens(title, overview, keywords):
+    return tokenize(title) * TITLE_BOOST + tokenize(overview) + tokenize(keywords)
+
+def term_weight(term_freq, length_norm):
+    return term_freq * (BM25_K1 + 1) / (term_freq + BM25_K1 * length_norm)
+
+def term_counts(tokens):
+    counts = {}
+    for token in tokens:
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+class BM25Index:
+    def __init__(self, terms, offsets, postings, weights, idf, movie_ids, average_length=None):
+        self.terms = terms
+        self.vocab = {term: term_id for term_id, term in enumerate(terms.tolist())}
+        self.offsets = offsets
+        self.postings = postings
+        self.weights = weights
+        self.idf = idf
+        self.movie_ids = movie_ids
+        self.average_length = average_length
+        self.built_rows = len(movie_ids)
+        # Postings of documents appended since the build, as term -> ([rows], [weights]).
+        self.appended = {}
+
+    @classmethod
+    def build(cls, documents, movie_ids):
+        vocab = {}
+        term_ids = []
+        doc_rows = []
+        term_freqs = []
+        doc_lengths = np.zeros(len(documents), dtype='float32')
+
+        for row, tokens in enumerate(documents):
+            doc_lengths[row] = len(tokens)
+            for token, count in term_counts(tokens).items():
+                term_ids.append(vocab.setdefault(token, len(vocab)))
+                doc_rows.append(row)
+                term_freqs.append(count)
+
+        term_ids = np.array(term_ids, dtype='int32')
+        order = np.argsort(term_ids, kind='stable')
+        postings = np.array(doc_rows, dtype='int32')[order]
+        term_freqs = np.array(term_freqs, dtype='float32')[order]
+
+        document_freqs = np.bincount(term_ids, minlength=len(vocab))
+        offsets = np.zeros(len(vocab) + 1, dtype='int64')
+        np.cumsum(document_freqs, out=offsets[1:])
+
+        # Everything but the idf is query independent, so the per-posting BM25 term weight is
+        # folded in at build time and a query only multiplies by idf and sums.
+        average_length = max(float(doc_lengths.mean()), 1.0) if len(documents) else 1.0
+        length_norm = 1 - BM25_B + BM25_B * doc_lengths[postings] / average_length
+        weights = term_weight(term_freqs, length_norm).astype('float32')
+
+        n = len(documents)
+        idf = np.log(1 + (n - document_freqs + 0.5) / (document_freqs + 0.5)).astype('float32')
+
+        terms = np.array(sorted(vocab, key=vocab.get)) if vocab else np.array([], dtype='<U1')
+        return cls(terms, offsets, postings, weights, idf, np.asarray(movie_ids, dtype='int64'), average_length)
+
+    def extend(self, documents, movie_ids):
+        # Appended documents are weighted with the build's average length and share its idf, as a
+        # new segment is scored until the next merge; rebuilding the postings per update would be
+        # O(catalogue). Compaction rebuilds the index with exact statistics.
+        start = len(self.movie_ids)
+        self.movie_ids = np.concatenate([self.movie_ids, np.asarray(movie_ids, dtype='int64')])
+        for row, tokens in enumerate(documents, start):
+            length_norm = 1 - BM25_B + BM25_B * len(tokens) / self.average_length
+            for token, count in term_counts(tokens).items():
+                rows, weights = self.appended.setdefault(token, ([], []))
+                rows.append(row)
+                weights.append(term_weight(count, length_norm))
+
+    def term_idf(self, token):
+        if token in self.vocab:
+            return self.idf[self.vocab[token]]
+        document_freq = len(self.appended[token][0])
+        return np.log(1 + (len(self.movie_ids) - document_freq + 0.5) / (document_freq + 0.5))
+
+    def search(self, query, k, allowed_rows=None):
+        # allowed_rows must be sorted, as searchable rows are.
+        tokens = {token for token in tokenize(query) if token in self.vocab or token in self.appended}
+        if not tokens:
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='float32')
+
+        rows = []
+        contributions = []
+        for token in tokens:
+            idf = self.term_idf(token)
+            if token in self.vocab:
+                term_id = self.vocab[token]
+                start, end = self.offsets[term_id], self.offsets[term_id + 1]
+                rows.append(self.postings[start:end])
+                contributions.append(self.weights[start:end] * idf)
+            if token in self.appended:
+                appended_rows, weights = self.appended[token]
+                rows.append(np.array(appended_rows, dtype='int32'))
+                contributions.append(np.array(weights, dtype='float32') * idf)
+
+        unique_rows, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions)).astype('float32')
+
+        if allowed_rows is not None:
+            # A binary search per hit rather than np.isin, which sorts all of allowed_rows.
+            positions = np.searchsorted(allowed_rows, unique_rows)
+            keep = positions < len(allowed_rows)
+            keep[keep] = allowed_rows[positions[keep]] == unique_rows[keep]
+            unique_rows, scores = unique_rows[keep], scores[keep]
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        return unique_rows[top].astype('int64'), scores[top]
+
+    def is_fresh(self, movie_df):
+        # Indexes saved before the average length was stored cannot take appended documents.
+        movie_ids = movie_df['id'].to_numpy()
+        return (
+            self.average_length is not None
+            and len(movie_ids) == len(self.movie_ids) and np.array_equal(movie_ids, self.movie_ids)
+        )
+
+    def save(self, path):
+        # Only the built documents are saved; a loaded copy of an extended index is stale.
+        np.savez(path, terms=self.terms, offsets=self.offsets, postings=self.postings, weights=self.weights,
+                 idf=self.idf, movie_ids=self.movie_ids[:self.built_rows], average_length=self.average_length or 0.0)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            average_length = float(data['average_length']) if 'average_length' in data.files else 0.0
+            return cls(
+                data['terms'], data['offsets'], data['postings'], data['weights'], data['idf'], data['movie_ids'],
+                average_length or None
+            )
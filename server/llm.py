@@ -1,6 +1,7 @@
 import sys
 import os
 import re
+import json
 import time
 import numpy as np
 import datetime
@@ -11,7 +12,10 @@ from langchain.agents import AgentType, initialize_agent, Tool
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph, END
 from langchain_core.runnables import RunnableLambda
-from movie_similarity_search import find_similar_movies, find_id_by_title, find_movies_by_id, find_movies_by_description
+from movie_similarity_search import SET_MODES, WEIGHT_PROFILES, DEFAULT_WEIGHTS, find_id_by_title, find_title_candidates, find_movies_by_id
+from search_backend import FaissBackend
+from search_results import format_movies, format_movie_matches, format_similar_movies
+from embedding_cache import EmbeddingCache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -24,66 +28,269 @@ model = ChatGoogleGenerativeAI(
     temperature=1.0,
 )
 
+# Raised for malformed tool options, so the tools report it as is rather than as a bad movie ID.
+class ToolInputError(ValueError):
+    pass
+
+FILTER_OPTIONS = ('min_rating', 'max_rating', 'genre', 'from_year', 'to_year')
+WEIGHT_OPTIONS = ('profile', *DEFAULT_WEIGHTS)
+DIVERSITY_OPTIONS = ('diversity',)
+
+def check_options(options, allowed):
+    unknown = set(options) - set(allowed)
+    if unknown:
+        raise ToolInputError(f"Unknown options {sorted(unknown)}. Expected some of {sorted(allowed)}.")
+
+def option_value(options, key, parse):
+    try:
+        return parse(options[key])
+    except ValueError:
+        raise ToolInputError(f"Option {key} must be a number, got '{options[key]}'.")
+
+SEED_ID_PREFIX = 'id:'
+OPTION_PART = re.compile(r'^\s*\w+\s*=')
+
+def option_part(keys):
+    # Matches only the given option keys, for free text where other "x=y" parts are not options.
+    return re.compile(r'^\s*(' + '|'.join(re.escape(key) for key in keys) + r')\s*=', re.IGNORECASE)
+
+DESCRIPTION_OPTION_PART = option_part(FILTER_OPTIONS)
+
+def parse_tool_input(tool_input, option_pattern=None):
+    # "27205, profile=mood, atmosphere=3" -> (['27205'], {'profile': 'mood', 'atmosphere': '3'})
+    # Without option_pattern every part with an '=' is an option, and the tool checks its key.
+    positional = []
+    options = {}
+    for part in str(tool_input).split(','):
+        part = part.strip().strip('"\'')
+        if not part:
+            continue
+        if ('=' in part) if option_pattern is None else option_pattern.match(part):
+            key, value = part.split('=', 1)
+            options[key.strip().lower()] = value.strip().strip('"\'')
+        else:
+            positional.append(part)
+    return positional, options
+
+def parse_seed_list(tool_input):
+    # Seeds are separated by '|' or given as a JSON list, since titles may contain commas:
+    # "Crouching Tiger, Hidden Dragon | id:603, mode=fusion" or '["1917", "Alien"], mode=fusion'.
+    # Trailing comma-separated key=value parts are options, as in parse_tool_input.
+    text = str(tool_input).strip()
+    if text.startswith('['):
+        end = text.rindex(']') + 1
+        seeds = [str(seed).strip() for seed in json.loads(text[:end])]
+        _, options = parse_tool_input(text[end:])
+        return [seed for seed in seeds if seed], options
+
+    seeds = []
+    options = {}
+    for segment in text.split('|'):
+        parts = segment.split(',')
+        while parts and OPTION_PART.match(parts[-1]):
+            options.update(parse_tool_input(parts.pop())[1])
+        seed = ','.join(parts).strip().strip('"\'')
+        if seed:
+            seeds.append(seed)
+    return seeds, options
+
+def weights_from_options(options):
+    profile = options.get('profile', 'default').lower()
+    if profile not in WEIGHT_PROFILES:
+        raise ToolInputError(f"Unknown profile '{profile}'. Expected one of {list(WEIGHT_PROFILES)}.")
+
+    weights = dict(WEIGHT_PROFILES[profile])
+
+    for name in DEFAULT_WEIGHTS:
+        if name in options:
+            weights[name] = option_value(options, name, float)
+
+    return weights or None
+
+def filters_from_options(options, known_genres=None):
+    # "min_rating=7, genre=Horror/Thriller, from_year=1990, to_year=1999"
+    filters = {}
+    if 'min_rating' in options:
+        filters['min_rating'] = option_value(options, 'min_rating', float)
+    if 'max_rating' in options:
+        filters['max_rating'] = option_value(options, 'max_rating', float)
+    if 'genre' in options:
+        filters['genres'] = [genre.strip() for genre in options['genre'].split('/') if genre.strip()]
+        if known_genres is not None:
+            known = {genre.lower() for genre in known_genres}
+            unknown = [genre for genre in filters['genres'] if genre.lower() not in known]
+            if unknown:
+                raise ToolInputError(f"Unknown genre {unknown}. Expected some of {sorted(known_genres)}.")
+    if 'from_year' in options:
+        filters['from_year'] = option_value(options, 'from_year', int)
+    if 'to_year' in options:
+        filters['to_year'] = option_value(options, 'to_year', int)
+    return filters or None
+
+def diversity_from_options(options):
+    # "diversity=0.3": 0 keeps the plain similarity ranking, 1 favours variety over closeness.
+    return option_value(options, 'diversity', float) if 'diversity' in options else None
+
 class DateTool:    
     def get_current_date(self, _=""):
         return datetime.datetime.now().strftime("%Y-%m-%d")
     
 class MovieSearchTool:
-    def __init__(self, faiss_index, movie_df, model):
-        self.faiss_index = faiss_index
-        self.movie_df = movie_df
+    def __init__(self, catalog, model, embedding_cache_size=1024, embedding_cache_ttl=None, backend=None):
+        self.catalog = catalog
         self.model = model
+        # Similarity and description searches go through the backend; lookups by id or title
+        # always use the in-process catalog.
+        self.backend = backend or FaissBackend()
+        self.embedding_cache = EmbeddingCache(max_size=embedding_cache_size, ttl=embedding_cache_ttl)
+
+    def embedding_cache_stats(self):
+        return self.embedding_cache.stats()
+
+    def known_genres(self, catalog):
+        return list(catalog.filter_index.genre_labels.values()) if catalog.filter_index is not None else None
+
+    def swap_catalog(self, catalog):
+        # Each tool call reads self.catalog once, so calls already running finish on the
+        # catalog they started with and the next ones see the new one.
+        previous, self.catalog = self.catalog, catalog
+        return previous
     
     def find_by_similarity(self, query_movie_id):
         try:
-            query_movie_id = int(query_movie_id)
-            result_df, error = find_similar_movies(
+            catalog = self.catalog
+            positional, options = parse_tool_input(query_movie_id)
+            check_options(options, WEIGHT_OPTIONS + FILTER_OPTIONS + DIVERSITY_OPTIONS)
+            query_movie_id = int(positional[0]) if positional else int(query_movie_id)
+            results, error = self.backend.find_similar_movies(
+                catalog,
                 query_movie_id=query_movie_id,
-                faiss_index=self.faiss_index,
-                movie_df=self.movie_df
+                weights=weights_from_options(options),
+                filters=filters_from_options(options, self.known_genres(catalog)),
+                diversity=diversity_from_options(options)
             )
             
             if error:
                 return f"Error: {error}"
             
-            if result_df.empty:
+            if not results:
                 return "No similar movies found."
             
-            output = f"Found {len(result_df)} similar movies to movie ID {query_movie_id}:\n\n"
-            for idx, row in result_df.iterrows():
-                output += f"{idx+1}. {row['title']} (ID: {row['id']})\n"
-                output += f"   Rating: {row['vote_average']}/10\n"
-                output += f"   Similarity: {row['similarity_score']:.3f}\n"
-                output += f"   Overview: {row['overview'][:100]}...\n\n"
+            output = f"Found {len(results)} similar movies to movie ID {query_movie_id}:\n\n"
+            output += format_similar_movies(results)
             
             return output.strip()
             
+        except ToolInputError as e:
+            return f"Error: {e}"
         except ValueError as e:
             return f"Error: Please provide a valid movie ID number. {str(e)}"
         except Exception as e:
             return f"Error occurred: {str(e)}"
-        
+
+    def find_by_similarity_batch(self, query_movie_ids):
+        try:
+            catalog = self.catalog
+            positional, options = parse_tool_input(query_movie_ids)
+            check_options(options, WEIGHT_OPTIONS + FILTER_OPTIONS + DIVERSITY_OPTIONS)
+            query_movie_ids = [int(movie_id) for movie_id in re.findall(r'\d+', ' '.join(positional))]
+
+            if not query_movie_ids:
+                return "Error: Please provide one or more movie ID numbers separated by commas."
+
+            results = self.backend.find_similar_movies_batch(
+                catalog,
+                query_movie_ids=query_movie_ids,
+                k=5,
+                weights=weights_from_options(options),
+                filters=filters_from_options(options, self.known_genres(catalog)),
+                diversity=diversity_from_options(options)
+            )
+
+            sections = []
+            for query_movie_id, (similar, error) in results.items():
+                if error:
+                    sections.append(f"Movie ID {query_movie_id}: Error: {error}")
+                    continue
+
+                sections.append(f"Similar movies to movie ID {query_movie_id}:\n\n{format_similar_movies(similar)}")
+
+            return '\n\n'.join(sections).strip()
+
+        except ToolInputError as e:
+            return f"Error: {e}"
+        except Exception as e:
+            return f"Error occurred: {str(e)}"
+
+    def find_like_set(self, query_movies):
+        try:
+            catalog = self.catalog
+            seeds, options = parse_seed_list(query_movies)
+            check_options(options, ('mode',) + WEIGHT_OPTIONS + FILTER_OPTIONS)
+            mode = options.get('mode', 'centroid').lower()
+            if mode not in SET_MODES:
+                raise ToolInputError(f"Unknown mode '{mode}'. Expected one of {list(SET_MODES)}.")
+
+            # Seeds may be IDs or titles, so one call covers "I liked Alien, Blade Runner and Arrival".
+            # IDs need the id: prefix; a bare number is a title first ("1917", "300"), an ID second.
+            query_movie_ids = []
+            for seed in seeds:
+                if seed.lower().startswith(SEED_ID_PREFIX):
+                    query_movie_ids.append(int(seed[len(SEED_ID_PREFIX):]))
+                    continue
+                movie_id, error = find_id_by_title(query_title=seed, catalog=catalog)
+                if error and seed.isdigit() and catalog.row_for_id(int(seed)) is not None:
+                    movie_id, error = int(seed), None
+                if error:
+                    return f"Error: {error}"
+                query_movie_ids.append(movie_id)
+
+            if not query_movie_ids:
+                return "Error: Please provide movie titles or id:<ID> entries separated by '|'."
+
+            results, error = self.backend.find_movies_like_set(
+                catalog,
+                query_movie_ids=query_movie_ids,
+                weights=weights_from_options(options),
+                filters=filters_from_options(options, self.known_genres(catalog)),
+                mode=mode
+            )
+
+            if error:
+                return f"Error: {error}"
+
+            if not results:
+                return "No similar movies found."
+
+            output = f"Found {len(results)} movies similar to movie IDs {', '.join(str(movie_id) for movie_id in query_movie_ids)}:\n\n"
+            output += format_similar_movies(results)
+
+            return output.strip()
+
+        except ToolInputError as e:
+            return f"Error: {e}"
+        except ValueError as e:
+            return f"Error: Please provide valid movie IDs or titles. {str(e)}"
+        except Exception as e:
+            return f"Error occurred: {str(e)}"
+
     def find_by_id(self, query_movie_id):
         try:
             query_movie_id = int(query_movie_id)
 
-            result_df, error = find_movies_by_id(
+            results, error = find_movies_by_id(
                 query_movie_id=query_movie_id,
-                movie_df=self.movie_df
+                catalog=self.catalog
             )
 
             if error:
                 return f"Error: {error}"
             
-            if result_df.empty:
+            if not results:
                 return "No similar movies found."
                         
             output = f"Found movie with movie ID {query_movie_id}:\n\n"
-
-            for idx, row in result_df.iterrows():
-                output += f"{idx+1}. {row['title']} (ID: {row['id']})\n"
-                output += f"   Rating: {row['vote_average']}/10\n"
-                output += f"   Overview: {row['overview'][:100]}...\n\n"
+            output += format_movies(results)
 
             return output.strip()
             
@@ -94,28 +301,31 @@ class MovieSearchTool:
         
     def find_by_description(self, query_description):
         try:
-            query_description = str(query_description)
-            result_df, error = find_movies_by_description(
+            catalog = self.catalog
+            # Only filter keys are options; any other "x=y" part is part of the description.
+            positional, options = parse_tool_input(query_description, DESCRIPTION_OPTION_PART)
+            query_description = ', '.join(positional)
+            results, error = self.backend.find_movies_by_description(
+                catalog,
                 query_description=query_description,
-                movie_df=self.movie_df,
-                model=self.model
+                model=self.model,
+                embedding_cache=self.embedding_cache,
+                filters=filters_from_options(options, self.known_genres(catalog))
             )
             
             if error:
                 return f"Error: {error}"
             
-            if result_df.empty:
+            if not results:
                 return "No similar movies found."
             
-            output = f"Found {len(result_df)} movies matching your description:\n\n"
-            for idx, row in result_df.iterrows():
-                output += f"{idx+1}. {row['title']} (ID: {row['id']})\n"
-                output += f"   Rating: {row['vote_average']}/10\n"
-                output += f"   Similarity: {row['similarity_score']:.3f}\n"
-                output += f"   Overview: {row['overview'][:100]}...\n\n"
+            output = f"Found {len(results)} movies matching your description:\n\n"
+            output += format_movie_matches(results)
             
             return output.strip()
             
+        except ToolInputError as e:
+            return f"Error: {e}"
         except ValueError as e:
             return f"Error: Please provide a valid movie description. {str(e)}"
         except Exception as e:
@@ -123,19 +333,26 @@ class MovieSearchTool:
         
     def find_id(self, query_title):
         try:
+            catalog = self.catalog
             query_title= str(query_title)
-            result, error = find_id_by_title(
-                query_title=query_title,
-                movie_df=self.movie_df,
-            )
+            candidates, error = find_title_candidates(query_title=query_title, catalog=catalog)
             
             if error:
                 return f"Error: {error}"
             
-            if result is None:
+            if not candidates:
                 return "No such movies found."
+
+            best_matches = [candidate for candidate in candidates if candidate['score'] == candidates[0]['score']]
+
+            if len(best_matches) > 1:
+                output = f"Several movies match '{query_title}' equally well:\n"
+                for candidate in best_matches:
+                    output += f"- {candidate['title']} ({candidate['year'] or 'unknown year'}) (ID: {candidate['id']})\n"
+                output += "Pick the ID of the release the user means."
+                return output
                         
-            return result
+            return candidates[0]['id']
             
         except ValueError as e:
             return f"Error: Please provide a valid movie description. {str(e)}"
@@ -211,7 +428,17 @@ def create_tools(movie_search_tool):
         Tool(
             name="FindMoviesBySimilarity",
             func=movie_search_tool.find_by_similarity,
-            description="Used to find similar movies to a specific movie. Input should be a movie ID number."
+            description="Used to find similar movies to a specific movie. Input should be a movie ID number, optionally followed by a weight profile (e.g. '27205, profile=mood') or facet weights (e.g. '27205, atmosphere=4, genres=1'). Filters such as 'min_rating=7', 'genre=Horror', 'from_year=1990' and 'to_year=1999' restrict the results. Add 'diversity=0.3' (0 to 1) to avoid sequels and near-duplicates crowding the list."
+        ),
+        Tool(
+            name="FindMoviesBySimilarityBatch",
+            func=movie_search_tool.find_by_similarity_batch,
+            description="Used to find similar movies for several movies at once. Input should be movie ID numbers separated by commas, optionally followed by a weight profile such as 'profile=mood', facet weights such as 'atmosphere=4', filters such as 'min_rating=7', or 'diversity=0.3'."
+        ),
+        Tool(
+            name="FindMoviesLikeSet",
+            func=movie_search_tool.find_like_set,
+            description="Used to recommend movies for someone who liked several movies, in one call. Input should be movie titles or IDs written as 'id:603', separated by '|' (e.g. 'Alien | Blade Runner | id:329865'), optionally followed by comma-separated options: 'mode=fusion' to match any one of them closely instead of all of them on average, a weight profile such as 'profile=mood', or filters such as 'min_rating=7'."
         ),
         Tool(
             name="FindMoviesByID",
@@ -221,12 +448,12 @@ def create_tools(movie_search_tool):
         Tool(
             name="FindMoviesByDescription",
             func=movie_search_tool.find_by_description,
-            description="Used to find movies by description. Input should be a string description of a movie."
+            description="Used to find movies by description. Input should be a string description of a movie, optionally followed by filters such as 'min_rating=7, genre=Horror, from_year=1990, to_year=1999'."
         ),
         Tool(
             name="FindMovieIDByTitle",
             func=movie_search_tool.find_id,
-            description="Used to find IDs of movies by their title. Input should be a string movie title."
+            description="Used to find IDs of movies by their title. Input should be a string movie title. If several releases share the title, lists each one with its release year and ID."
         ),
     ]
     return tools
@@ -336,11 +563,21 @@ def create_agent(movie_search_tool):
         - **Critical:** Requires movie ID number (not title) as input
         - **Input:** Single integer movie ID
         - **When to use:** After getting ID from `FindMovieIDByTitle`
+        - **Emphasis (optional):** If the user cares about a particular aspect ("same vibe", "similar story"), append a profile: `profile=mood`, `profile=story`, `profile=plot` or `profile=genre`, or explicit facet weights such as `atmosphere=4, genres=1` (facets: overview, genres, keywords, vote, atmosphere, narrative, themes)
+        - **Filters (optional):** If the user restricts rating, genre or release year, append filters instead of discarding results yourself: `min_rating=7`, `max_rating=9`, `genre=Horror` (several genres as `genre=Horror/Comedy`), `from_year=1990`, `to_year=1999`. These work for `FindMoviesByDescription` and `FindMoviesBySimilarityBatch` too
         - **Example:**
         ```
         Action: FindMoviesBySimilarity
         Action Input: 27205
         ```
+        ```
+        Action: FindMoviesBySimilarity
+        Action Input: 27205, profile=mood
+        ```
+        ```
+        Action: FindMoviesBySimilarity
+        Action Input: 27205, min_rating=7, from_year=1990, to_year=1999
+        ```
 
         **3. `FindMoviesByDescription`**
         - **Purpose:** Search movies by plot, theme, genre, or concept
@@ -362,7 +599,27 @@ def create_agent(movie_search_tool):
         Action Input: 155
         ```
 
-        **5. `CheckCurrentDate`**
+        **5. `FindMoviesBySimilarityBatch`**
+        - **Purpose:** Find similar movies for several movies in a single call
+        - **Input:** Movie ID numbers separated by commas
+        - **When to use:** The user wants recommendations for each of several movies, e.g. a watchlist. Prefer it over calling `FindMoviesBySimilarity` once per movie
+        - **Example:**
+        ```
+        Action: FindMoviesBySimilarityBatch
+        Action Input: 27205, 603, 155
+        ```
+
+        **6. `FindMoviesLikeSet`**
+        - **Purpose:** Recommend movies that match the combined taste of several movies in a single call
+        - **Input:** Movie titles, or IDs written as `id:603`, separated by `|`; titles are looked up for you, so `FindMovieIDByTitle` is not needed first. Options follow after a comma
+        - **When to use:** The user lists several movies they liked and wants what to watch next, one list for all of them. Prefer it over separate similarity searches per movie. Append `mode=fusion` if the results should closely match any one of the movies rather than all of them on average. Profiles and filters work as for `FindMoviesBySimilarity`
+        - **Example:**
+        ```
+        Action: FindMoviesLikeSet
+        Action Input: Alien | Blade Runner | Crouching Tiger, Hidden Dragon, mode=fusion
+        ```
+
+        **7. `CheckCurrentDate`**
         - **Purpose:** Get today's real-world date
         - **Input:** Empty string
         - **When to use:** Only when user explicitly asks for current date
@@ -401,6 +658,11 @@ def create_agent(movie_search_tool):
         Final Answer: [Present the similar movies in a friendly, readable format]
         ```
 
+        **Workflow 1b: "I Liked [Title], [Title] and [Title]" Requests**
+        Single step process:
+        - Use `FindMoviesLikeSet` with all the titles at once, separated by `|`
+        - Present the one combined list in your Final Answer
+
         **Workflow 2: Description-Based Searches**
         Single step process:
         - User describes movie concept, plot, or theme
@@ -427,6 +689,7 @@ def create_agent(movie_search_tool):
         - **Be Complete:** Provide comprehensive answers that fully address the user's request
         - **Be Contextual:** Reference previous parts of the conversation when relevant
         - **Be Helpful:** Offer additional relevant information or suggestions when appropriate
+        - **Be Grounded:** When explaining why a movie is similar, base it on its "Matches on" line (the facets that contribute most to its similarity, highest first) and its overview, not on your own knowledge of the movies
 
         **Error Handling:**
         - If tools don't provide the needed information, clearly explain this limitation
@@ -665,11 +928,11 @@ def init_llm(movie_search_tool):
 
 # def run_llm(user_input):
 #     print("Loading index and movie dataframe...")
-#     movie_df, faiss_index = load_or_build_index(conn, cursor)
+#     catalog = load_or_build_index(conn, cursor)
 #     print("Loading model...")
 #     sbert_model = SentenceTransformer('paraphrase-MiniLM-L3-v2', device='cpu')
 #     print("Initializing movie search tool...")
-#     movie_search_tool = MovieSearchTool(faiss_index=faiss_index, movie_df=movie_df, model=sbert_model)
+#     movie_search_tool = MovieSearchTool(catalog=catalog, model=sbert_model)
 
 #     agent, graph = init_llm(movie_search_tool)
     
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, fields
+
+@dataclass
+class MovieFilter:
+    min_rating: float = None
+    max_rating: float = None
+    genres: tuple = ()
+    from_year: int = None
+    to_year: int = None
+
+    def is_empty(self):
+        return all(getattr(self, f.name) in (None, ()) for f in fields(self))
+
+    def describe(self):
+        parts = []
+        if self.min_rating is not None:
+            parts.append(f"rating >= {self.min_rating}")
+        if self.max_rating is not None:
+            parts.append(f"rating <= {self.max_rating}")
+        if self.genres:
+            parts.append(f"genres {' & '.join(self.genres)}")
+        if self.from_year is not None:
+            parts.append(f"from {self.from_year}")
+        if self.to_year is not None:
+            parts.append(f"until {self.to_year}")
+        return ', '.join(parts)
+
+def resolve_filters(filters):
+    if filters is None:
+        return None
+
+    if isinstance(filters, dict):
+        known = {f.name for f in fields(MovieFilter)}
+        unknown = set(filters) - known
+        if unknown:
+            raise ValueError(f"Unknown filters {sorted(unknown)}. Expected some of {sorted(known)}.")
+        filters = MovieFilter(**filters)
+
+    genres = filters.genres
+    if isinstance(genres, str):
+        genres = [genres]
+
+    resolved = MovieFilter(
+        min_rating=None if filters.min_rating is None else float(filters.min_rating),
+        max_rating=None if filters.max_rating is None else float(filters.max_rating),
+        genres=tuple(genre.strip() for genre in genres if genre.strip()),
+        from_year=None if filters.from_year is None else int(filters.from_year),
+        to_year=None if filters.to_year is None else int(filters.to_year),
+    )
+    return None if resolved.is_empty() else resolved
+
+def genre_names(value):
+    if value is None or isinstance(value, float):
+        return []
+    if isinstance(value, str):
+        return [name.strip() for name in value.split(',') if name.strip()]
+    return list(value)
+
+class FilterIndex:
+    def __init__(self, ratings, years, genres):
+        # Ratings and years are kept as argsort orders over sorted values, so a range filter is
+        # two searchsorted calls and a slice; missing values sort last and never match a range.
+        self.rating_order = np.empty(0, dtype='int64')
+        self.sorted_ratings = np.empty(0, dtype='float64')
+        self.year_order = np.empty(0, dtype='int64')
+        self.sorted_years = np.empty(0, dtype='float64')
+        self.genre_rows = {}
+        self.genre_labels = {}
+        self.extend(ratings, years, genres)
+
+    def __len__(self):
+        return len(self.rating_order)
+
+    @classmethod
+    def from_frame(cls, movie_df, years):
+        return cls(*frame_filter_columns(movie_df, years))
+
+    def extend(self, ratings, years, genres):
+        # New rows are merged into the sorted columns, so catalogue updates do not re-sort them.
+        start = len(self)
+        ratings = np.asarray(ratings, dtype='float64')
+        self.rating_order, self.sorted_ratings = merge_sorted(self.rating_order, self.sorted_ratings, ratings, start)
+
+        years = np.array([np.nan if year is None else year for year in years], dtype='float64')
+        self.year_order, self.sorted_years = merge_sorted(self.year_order, self.sorted_years, years, start)
+
+        genre_rows = {}
+        for row, names in enumerate(genres, start):
+            for name in genre_names(names):
+                name = str(name)
+                genre_rows.setdefault(name.lower(), []).append(row)
+                self.genre_labels.setdefault(name.lower(), name)
+        for name, rows in genre_rows.items():
+            rows = np.array(rows, dtype='int64')
+            self.genre_rows[name] = np.concatenate([self.genre_rows[name], rows]) if name in self.genre_rows else rows
+
+    def range_rows(self, order, sorted_values, low, high):
+        start = 0 if low is None else np.searchsorted(sorted_values, low, side='left')
+        if high is None:
+            end = len(sorted_values) - np.count_nonzero(np.isnan(sorted_values[start:]))
+        else:
+            end = np.searchsorted(sorted_values, high, side='right')
+        return np.sort(order[start:max(start, end)]).astype('int64')
+
+    def matching_rows(self, movie_filter):
+        candidate_sets = []
+
+        if movie_filter.min_rating is not None or movie_filter.max_rating is not None:
+            candidate_sets.append(self.range_rows(
+                self.rating_order, self.sorted_ratings, movie_filter.min_rating, movie_filter.max_rating
+            ))
+        if movie_filter.from_year is not None or movie_filter.to_year is not None:
+            candidate_sets.append(self.range_rows(
+                self.year_order, self.sorted_years, movie_filter.from_year, movie_filter.to_year
+            ))
+        for genre in movie_filter.genres:
+            if genre.lower() not in self.genre_rows:
+                raise ValueError(f"Unknown genre '{genre}'. Expected one of {sorted(self.genre_labels.values())}.")
+            candidate_sets.append(self.genre_rows[genre.lower()])
+
+        if not candidate_sets:
+            return np.arange(len(self), dtype='int64')
+
+        # Intersect smallest first so each step only touches rows that are still in play.
+        candidate_sets.sort(key=len)
+        rows = candidate_sets[0]
+        for other in candidate_sets[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+def frame_filter_columns(movie_df, years):
+    genres = movie_df['genres'] if 'genres' in movie_df.columns else [None] * len(movie_df)
+    return pd.to_numeric(movie_df['vote_average'], errors='coerce').to_numpy(), years, genres
+
+def merge_sorted(order, sorted_values, values, start):
+    # Stable like the argsort it extends: new rows go after existing rows with equal values.
+    new_order = np.argsort(values, kind='stable')
+    new_values = values[new_order]
+    positions = np.searchsorted(sorted_values, new_values, side='right')
+    return np.insert(order, positions, new_order + start), np.insert(sorted_values, positions, new_values)
+
+def row_bitmap(rows, n):
+    mask = np.zeros(n, dtype=bool)
+    mask[rows] = True
+    return np.packbits(mask, bitorder='little')
@@ -3,9 +3,21 @@ import numpy as np
 import pandas as pd
 import faiss
 from sklearn.preprocessing import normalize
+from sklearn.utils.extmath import randomized_svd
 import os
-from thefuzz import process
+import json
+import time
 import traceback
+from dataclasses import dataclass, field
+from ann_index import create_index, empty_index, apply_search_params, search_subset, can_reconstruct, read_index_mapped, write_index, writable_copy, index_config_from_env, save_index_config, load_index_config
+from title_matcher import TitleMatcher
+from facet_store import FacetStore, FACET_PRECISIONS
+from asset_store import asset_store_checksum, content_checksum, has_asset_store, write_asset_store, open_asset_store
+from catalog_delta import list_segments, write_segment, read_segment, clear_segments
+from asset_snapshots import publish_snapshot, verify_snapshot, prune_snapshots, copy_assets
+from lexical_index import BM25Index, movie_tokens
+from movie_filters import FilterIndex, frame_filter_columns, resolve_filters, row_bitmap
+from search_results import RESULT_COLUMNS, format_similar_movies, movies, movie_matches, similar_movies
 
 OVERVIEW_WEIGHT = 1.0
 GENRE_WEIGHT = 2.0
@@ -16,8 +28,91 @@ NARRATIVE_WEIGHT = 2.0
 THEMES_WEIGHT = 2.0
 COMBINED_CLASSIFIED_WEIGHT = 2.5
 
+EMBEDDING_DIM = 384
+COMPOSITE_CHUNK_SIZE = 4096
+# Rows fetched from the database per round trip while building. Each row arrives as ~2.7k
+# Python floats (~85 KB), so this bounds the transient memory of a build to ~45 MB.
+INGEST_CHUNK_SIZE = 512
+# Composite indexes that need training (IVF, PQ, SQ8) are trained on at most this many rows.
+INDEX_TRAINING_ROWS = 100_000
+
+# Layout of the composite vector: (facet name, DataFrame column, weight), in hstack order.
+COMPOSITE_FACETS = [
+    ('overview', 'overview_emb', OVERVIEW_WEIGHT),
+    ('genres', 'genres_emb', GENRE_WEIGHT),
+    ('keywords', 'keywords_emb', KEYWORD_WEIGHT),
+    ('vote', 'vote_average_scaled', VOTE_WEIGHT),
+    ('atmosphere', 'atmosphere_emb', ATMOSPHERE_WEIGHT),
+    ('narrative', 'narrative_emb', NARRATIVE_WEIGHT),
+    ('themes', 'themes_emb', THEMES_WEIGHT),
+]
+
+DEFAULT_WEIGHTS = {name: weight for name, _, weight in COMPOSITE_FACETS}
+FACET_NAMES = [name for name, _, _ in COMPOSITE_FACETS]
+
+# Embedding columns live in the facet store once a catalog is built; the DataFrame keeps scalars.
+EMBEDDING_COLUMNS = [column for _, column, _ in COMPOSITE_FACETS if column != 'vote_average_scaled'] + ['classified_emb_combined']
+EMBEDDING_STORAGES = ('array', 'bytea')
+# bytea embeddings are float32 in network byte order, the layout Postgres' float4send produces,
+# so existing array columns can be converted inside the database.
+EMBEDDING_BLOB_DTYPE = np.dtype('>f4')
+BLOB_COLUMN_SUFFIX = '_f32'
+# Facets kept at full precision whatever FACET_PRECISION says.
+EXACT_FACETS = ('vote',)
+# Overview index layout per facet precision, so it does not keep a float32 copy of an int8 facet.
+OVERVIEW_INDEX_FACTORY = {'float32': 'Flat', 'float16': 'SQfp16', 'int8': 'SQ8'}
+
+# Named per-request reweightings of the composite; facets not listed keep their default weight.
+WEIGHT_PROFILES = {
+    'default': {},
+    'mood': {'atmosphere': 4.0, 'themes': 3.0, 'genres': 1.0},
+    'story': {'narrative': 4.0, 'themes': 3.0, 'genres': 1.0},
+    'plot': {'overview': 3.0, 'keywords': 4.0, 'atmosphere': 1.0},
+    'genre': {'genres': 4.0, 'keywords': 2.0, 'atmosphere': 1.0},
+}
+# Weighted searches rescore this many default-composite candidates per requested result.
+RESCORE_CANDIDATE_FACTOR = 10
+# Filters matching at most this many movies are scored exactly from the facet store; larger
+# subsets go through the FAISS index with an ID selector.
+FILTER_EXACT_ROWS = 2048
+
 FAISS_INDEX_PATH = 'assets/movie_similarity_index.bin'
+INDEX_CONFIG_PATH = 'assets/movie_similarity_index.json'
 DF_PATH = 'assets/movie_dataframe.pkl'
+ASSET_STORE_PATH = 'assets/movie_catalog'
+DELTA_PATH = 'assets/deltas'
+NEIGHBOURS_PATH = 'assets/movie_neighbours.npz'
+OVERVIEW_INDEX_PATH = 'assets/overview_index.bin'
+LEXICAL_INDEX_PATH = 'assets/lexical_index.npz'
+FINGERPRINT_PATH = 'assets/catalog_fingerprint.json'
+SNAPSHOT_ROOT = 'assets/snapshots'
+# Everything a serving process reads; deltas are folded in before these are snapshotted or cached.
+SERVING_ASSETS = (FAISS_INDEX_PATH, INDEX_CONFIG_PATH, ASSET_STORE_PATH, NEIGHBOURS_PATH, OVERVIEW_INDEX_PATH, LEXICAL_INDEX_PATH)
+SNAPSHOT_KEEP = 3
+
+# Loading compacts the catalog once this many delta segments have piled up on top of it.
+DELTA_COMPACT_SEGMENTS = 20
+
+# Deep enough that diversified searches up to k=50 keep twice k candidates to choose from.
+NEIGHBOUR_TABLE_K = 100
+NEIGHBOUR_BATCH_SIZE = 1024
+
+# Diversified searches re-rank this many candidates per requested result with MMR, up to the
+# neighbour table's depth.
+MMR_CANDIDATE_FACTOR = 5
+# The neighbour table also keeps each composite projected onto its top principal directions,
+# so re-ranking compares candidates in this many dimensions instead of the full composite.
+DIVERSITY_SKETCH_DIM = 128
+DIVERSITY_SKETCH_SAMPLE = 10_000
+
+# Ways find_movies_like_set combines its seeds: one search for their centroid, or one batched
+# search per seed with the per-seed rankings merged by reciprocal rank fusion.
+SET_MODES = ('centroid', 'fusion')
+DESCRIPTION_MODES = ('hybrid', 'dense')
+
+# Hybrid description search fuses this many hits from each retriever with reciprocal rank fusion.
+HYBRID_CANDIDATES = 50
+RRF_K = 60
 
 def get_movie_embeddings_from_db(cursor, movie_id):
     cursor.execute("""
@@ -85,206 +180,1095 @@ def create_composite_vector(movie_data):
     composite_vector = normalize(composite_vector.reshape(1, -1), norm='l2', axis=1).astype('float32')
     return composite_vector
 
-def find_similar_movies(query_movie_id, k=10, faiss_index=None, movie_df=None):
-    if faiss_index is None or movie_df is None:
-        raise ValueError("FAISS index and movie DataFrame must be provided.")
+def has_embedding(emb):
+    if emb is None or isinstance(emb, float):
+        return False
+    return len(emb) > 0
 
-    query_movie_data = movie_df[movie_df['id'] == query_movie_id]
-    
-    if query_movie_data.empty:
-        return pd.DataFrame(), f"Movie with ID {query_movie_id} not found"
+def decode_embedding_blobs(blobs, dim=EMBEDDING_DIM, dtype=np.float64):
+    # One join and one frombuffer for the whole column; no Python float is ever created.
+    return np.frombuffer(b''.join(blobs), dtype=EMBEDDING_BLOB_DTYPE).reshape(len(blobs), dim).astype(dtype)
+
+def stack_embedding_column(values, dim=EMBEDDING_DIM, dtype=np.float64):
+    values = list(values)
+    present = [i for i, emb in enumerate(values) if has_embedding(emb)]
+
+    if present and isinstance(values[present[0]], (bytes, memoryview)):
+        stacked = np.zeros((len(values), dim), dtype=dtype)
+        stacked[present] = decode_embedding_blobs([values[i] for i in present], dim, dtype)
+        return stacked
+
+    if len(present) == len(values):
+        return np.array(values, dtype=dtype).reshape(len(values), dim)
+
+    stacked = np.zeros((len(values), dim), dtype=dtype)
+    if present:
+        stacked[present] = np.array([values[i] for i in present], dtype=dtype)
+    return stacked
+
+def facet_dim(column):
+    return 1 if column == 'vote_average_scaled' else EMBEDDING_DIM
+
+def composite_dim():
+    return sum(facet_dim(column) for _, column, _ in COMPOSITE_FACETS)
+
+def weighted_composite(facets):
+    # Same arithmetic as create_composite_vector (float64 weighting and l2 normalisation, then
+    # a float32 cast), applied to whole chunks so the result is bit-identical to the per-row path.
+    weighted = np.empty((len(facets[0]), composite_dim()), dtype=np.float64)
+
+    offset = 0
+    for facet, (_, _, weight) in zip(facets, COMPOSITE_FACETS):
+        width = facet.shape[1]
+        np.multiply(facet, weight, out=weighted[:, offset:offset + width], dtype=np.float64)
+        offset += width
+
+    return normalize(weighted, norm='l2', axis=1, copy=False).astype('float32')
+
+def frame_facet(df, column, dtype=np.float64):
+    if column == 'vote_average_scaled':
+        return np.asarray(df[column].to_numpy(), dtype=np.float64).reshape(-1, 1)
+    return stack_embedding_column(df[column].to_numpy(), dtype=dtype)
+
+def composite_rows(facet_store, rows):
+    return weighted_composite([facet_store.facet_rows(name, rows) for name, _, _ in COMPOSITE_FACETS])
+
+def build_composite_from_store(facet_store, chunk_size=COMPOSITE_CHUNK_SIZE):
+    n = len(facet_store)
+    composite_vectors = np.empty((n, composite_dim()), dtype='float32')
+
+    for start in range(0, n, chunk_size):
+        composite_vectors[start:start + chunk_size] = composite_rows(facet_store, slice(start, start + chunk_size))
+
+    return composite_vectors
+
+def facet_precision_from_env():
+    precision = os.environ.get('FACET_PRECISION', 'float32').lower()
+    if precision not in FACET_PRECISIONS:
+        raise ValueError(f"Unknown facet precision '{precision}'. Expected one of {FACET_PRECISIONS}.")
+    return precision
+
+def build_facet_store(movie_df):
+    # Embeddings are float32 model outputs, so float32 storage is lossless; the vote scalar is
+    # not, and stays float64 so composites rebuilt from the store match the DataFrame path.
+    return FacetStore({name: frame_facet(movie_df, column, dtype='float32') for name, column, _ in COMPOSITE_FACETS})
+
+def encode_facet_store(facet_store, precision):
+    if precision is None or facet_store.precision == precision:
+        return facet_store
+
+    facet_store = facet_store.encoded(precision, exact=EXACT_FACETS)
+    print(f"Encoded facet store as {precision} ({facet_store.nbytes / 1e6:.1f} MB)")
+
+    return facet_store
+
+def metadata_frame(movie_df):
+    # Copied so the result does not share a block with the embedding lists and keep them alive.
+    return movie_df.drop(columns=[column for column in EMBEDDING_COLUMNS if column in movie_df.columns]).copy()
+
+def resolve_weights(weights):
+    if weights is None:
+        return None
+
+    if isinstance(weights, str):
+        if weights not in WEIGHT_PROFILES:
+            raise ValueError(f"Unknown weight profile '{weights}'. Expected one of {list(WEIGHT_PROFILES)}.")
+        weights = WEIGHT_PROFILES[weights]
 
-    query_movie = query_movie_data.iloc[0]
-    original_query_movie_df_index = query_movie_data.index[0]
+    unknown = set(weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown facets {sorted(unknown)}. Expected some of {list(DEFAULT_WEIGHTS)}.")
+    if any(weight < 0 for weight in weights.values()):
+        raise ValueError("Facet weights must not be negative.")
 
-    movie_dict = query_movie.to_dict()
-    query_composite_vector = create_composite_vector(movie_dict)
+    resolved = {**DEFAULT_WEIGHTS, **{name: float(weight) for name, weight in weights.items()}}
+    return None if resolved == DEFAULT_WEIGHTS else resolved
 
-    similarities, indices = faiss_index.search(query_composite_vector, k + 1)
+def resolve_diversity(diversity):
+    if diversity is None:
+        return None
+
+    diversity = float(diversity)
+    if not 0 <= diversity <= 1:
+        raise ValueError(f"Diversity must be between 0 and 1, got {diversity}.")
+    return diversity or None
+
+def build_faiss_index(composite_vectors, index_config=None):
+    index_config = index_config or index_config_from_env()
+    index = create_index(composite_vectors, index_config)
+
+    print(f"Built {index_config.describe()} FAISS index with {index.ntotal} vectors of dimension {index.d}")
+
+    return index
+
+@dataclass
+class NeighbourTable:
+    indices: np.ndarray
+    scores: np.ndarray
+    movie_ids: np.ndarray
+    sketch: np.ndarray = None
+    # content_checksum of the catalogue the table was computed from.
+    checksum: str = None
+
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    def is_fresh(self, movie_df, checksum):
+        # Matching ids are not enough: a rebuild keeps the ids of movies whose vectors changed.
+        movie_ids = movie_df['id'].to_numpy()
+        return (
+            self.checksum is not None and self.checksum == checksum
+            and len(movie_ids) == len(self.movie_ids) and np.array_equal(movie_ids, self.movie_ids)
+        )
+
+@dataclass
+class MovieCatalog:
+    movie_df: pd.DataFrame
+    faiss_index: object
+    id_to_row: dict = field(default_factory=dict)
+    title_to_rows: dict = field(default_factory=dict)
+    title_matcher: TitleMatcher = None
+    facet_store: FacetStore = None
+    overview_index: object = None
+    lexical_index: BM25Index = None
+    filter_index: FilterIndex = None
+    neighbours: NeighbourTable = None
+    # Rows are append-only between compactions: removed and replaced movies keep their row,
+    # flagged here, so FAISS labels and every row-indexed array stay valid.
+    tombstones: np.ndarray = None
+    # Indexes read from disk are memory-mapped and read-only until copied on the first update.
+    owns_indexes: bool = False
+    # RESULT_COLUMNS as arrays, so result records are built without going through pandas.
+    columns: dict = field(default_factory=dict)
+    # content_checksum of the asset store the catalog was saved to or loaded from.
+    checksum: str = None
+    # (rows, row_bitmap) of the rows not tombstoned, cached until the next update.
+    live: tuple = None
+
+    def row_for_id(self, movie_id):
+        return self.id_to_row.get(movie_id)
+
+    def live_rows(self):
+        if self.live is None:
+            n = len(self.movie_df)
+            rows = np.arange(n) if self.tombstones is None else np.flatnonzero(~self.tombstones)
+            self.live = rows, row_bitmap(rows, n)
+        return self.live[0]
+
+    def has_tombstones(self):
+        return self.tombstones is not None and len(self.live_rows()) < len(self.tombstones)
+
+def build_overview_index(facet_store):
+    # Labels are explicit DataFrame rows, so movies without an overview embedding are skipped
+    # without shifting the positions of the ones after them.
+    rows = np.flatnonzero(facet_store.sq_norms[:, facet_store.names.index('overview')] > 0).astype('int64')
+
+    inner = faiss.index_factory(EMBEDDING_DIM, OVERVIEW_INDEX_FACTORY[facet_store.precision], faiss.METRIC_INNER_PRODUCT)
+    overview_index = faiss.IndexIDMap(inner)
+    if len(rows):
+        vectors = np.asarray(facet_store.facet_rows('overview', rows), dtype='float32')
+        if not overview_index.is_trained:
+            overview_index.train(vectors)
+        overview_index.add_with_ids(vectors, rows)
+
+    print(f"Built overview index with {overview_index.ntotal} embeddings")
+
+    return overview_index
+
+def release_years(movie_df):
+    if 'release_date' not in movie_df.columns:
+        return [None] * len(movie_df)
 
-    similar_movie_indices = []
-    similar_movie_similarities = []
+    years = pd.to_datetime(movie_df['release_date'], errors='coerce').dt.year
+    return [None if pd.isna(year) else int(year) for year in years]
 
-    for i, idx in enumerate(indices[0]):
-        if idx != original_query_movie_df_index and len(similar_movie_indices) < k:
-            similar_movie_indices.append(idx)
-            similar_movie_similarities.append(similarities[0][i])
+def lexical_documents(movie_df):
+    keywords = movie_df['keywords'] if 'keywords' in movie_df.columns else [''] * len(movie_df)
+    return [
+        movie_tokens(title, overview, keyword_text)
+        for title, overview, keyword_text in zip(movie_df['title'], movie_df['overview'], keywords)
+    ]
 
-    if not similar_movie_indices:
-        return pd.DataFrame(), "No similar movies found"
+def build_lexical_index(movie_df, tombstones=None):
+    documents = lexical_documents(movie_df)
+    if tombstones is not None:
+        documents = [[] if dead else tokens for tokens, dead in zip(documents, tombstones)]
+    lexical_index = BM25Index.build(documents, movie_df['id'].to_numpy())
+
+    print(f"Built BM25 index with {len(lexical_index.terms)} terms over {len(documents)} movies")
+
+    return lexical_index
+
+def build_lookup_maps(movie_df, tombstones=None):
+    live = tombstones is None or not tombstones.any()
+
+    id_to_row = {}
+    for row, movie_id in enumerate(movie_df['id'].tolist()):
+        if live or not tombstones[row]:
+            id_to_row.setdefault(int(movie_id), row)
+
+    title_to_rows = {}
+    for row, title in enumerate(movie_df['title'].tolist()):
+        if live or not tombstones[row]:
+            title_to_rows.setdefault(title, []).append(row)
+
+    return id_to_row, title_to_rows
+
+def build_catalog(movie_df, faiss_index, overview_index=None, lexical_index=None, facet_store=None, precision=None):
+    # FAISS labels are positional, so the DataFrame must be in index order with a RangeIndex.
+    movie_df = movie_df.reset_index(drop=True)
+
+    if facet_store is None:
+        facet_store = build_facet_store(movie_df)
+    facet_store = encode_facet_store(facet_store, precision)
+    movie_df = metadata_frame(movie_df)
+
+    if faiss_index is not None and faiss_index.ntotal != len(movie_df):
+        raise ValueError(f"FAISS index has {faiss_index.ntotal} vectors but the DataFrame has {len(movie_df)} movies.")
+
+    if overview_index is None:
+        overview_index = build_overview_index(facet_store)
+
+    catalog = MovieCatalog(
+        movie_df=movie_df,
+        faiss_index=faiss_index,
+        facet_store=facet_store,
+        overview_index=overview_index,
+        tombstones=np.zeros(len(movie_df), dtype=bool)
+    )
+    return index_catalog_metadata(catalog, lexical_index)
+
+def build_metadata_catalog(movie_df):
+    # For backends that search the vectors elsewhere: only the lookups by id and title, the result
+    # columns and the filter index, without the ANN indexes, facet store, BM25 index or neighbour table.
+    movie_df = movie_df.reset_index(drop=True)
+    years = release_years(movie_df)
+    catalog = MovieCatalog(movie_df=movie_df, faiss_index=None)
+    catalog.id_to_row, catalog.title_to_rows = build_lookup_maps(movie_df)
+    catalog.columns = result_columns(movie_df)
+    catalog.title_matcher = TitleMatcher(movie_df['title'].tolist(), years)
+    catalog.filter_index = FilterIndex.from_frame(movie_df, years)
+    print(f"Loaded metadata for {len(movie_df)} movies")
+    return catalog
+
+def result_columns(movie_df):
+    return {name: movie_df[name].to_numpy() for name in RESULT_COLUMNS}
+
+def index_catalog_metadata(catalog, lexical_index=None):
+    # The full build; updates patch these structures for the changed rows in refresh_catalog.
+    movie_df = catalog.movie_df
+    tombstones = catalog.tombstones if catalog.has_tombstones() else None
+
+    catalog.id_to_row, catalog.title_to_rows = build_lookup_maps(movie_df, tombstones)
+    catalog.columns = result_columns(movie_df)
+
+    titles = movie_df['title'].tolist()
+    if tombstones is not None:
+        titles = ['' if dead else title for title, dead in zip(titles, tombstones)]
 
-    similar_movies_df = movie_df.iloc[similar_movie_indices].copy()
-    similar_movies_df['similarity_score'] = similar_movie_similarities
+    if tombstones is not None or lexical_index is None or not lexical_index.is_fresh(movie_df):
+        lexical_index = build_lexical_index(movie_df, tombstones)
 
-    similar_movies_df = similar_movies_df.sort_values(by='similarity_score', ascending=False).reset_index(drop=True)
+    years = release_years(movie_df)
+    catalog.title_matcher = TitleMatcher(titles, years)
+    catalog.lexical_index = lexical_index
+    catalog.filter_index = FilterIndex.from_frame(movie_df, years)
+    catalog.live = None
 
-    result_columns = ['id', 'title', 'overview', 'vote_average', 'atmosphere', 'narrative', 'themes', 'similarity_score']
-    return similar_movies_df[result_columns], None
+    return catalog
 
-def find_movies_by_id(query_movie_id, movie_df):
-    if movie_df is None:
-        raise ValueError("FAISS index and movie DataFrame must be provided.")
+def drop_query_rows(similarities, indices, query_rows, k):
+    # Drop each movie from its own hits, or the surplus last hit when it was not returned.
+    keep = indices != query_rows[:, None]
+    keep[keep.all(axis=1), -1] = False
+    return similarities[keep].reshape(-1, k), indices[keep].reshape(-1, k)
 
-    query_movie_data = movie_df[movie_df['id'] == query_movie_id]
+def sketch_projection(facet_store, dim=DIVERSITY_SKETCH_DIM, sample=DIVERSITY_SKETCH_SAMPLE, seed=0):
+    # Uncentred, so inner products between projected composites approximate the originals.
+    n = len(facet_store)
+    rows = np.sort(np.random.default_rng(seed).choice(n, size=min(n, sample), replace=False))
+    _, _, components = randomized_svd(composite_rows(facet_store, rows), min(dim, len(rows)), random_state=seed)
+    return components.T.astype('float32')
 
-    if query_movie_data.empty:
-        return pd.DataFrame(), f"Movie with ID {query_movie_id} not found"
+def compute_neighbour_table(catalog, k=NEIGHBOUR_TABLE_K, batch_size=NEIGHBOUR_BATCH_SIZE):
+    movie_df = catalog.movie_df
+    n = len(movie_df)
+    indices = np.empty((n, k), dtype='int32')
+    scores = np.empty((n, k), dtype='float16')
+    projection = sketch_projection(catalog.facet_store)
+    sketch = np.empty((n, projection.shape[1]), dtype='float32')
 
-    return query_movie_data, None
+    for start in range(0, n, batch_size):
+        rows = np.arange(start, min(start + batch_size, n))
+        queries = composite_rows(catalog.facet_store, rows)
+        similarities, neighbours = catalog.faiss_index.search(queries, k + 1)
+        scores[rows], indices[rows] = drop_query_rows(similarities, neighbours, rows, k)
+        sketch[rows] = queries @ projection
 
-def find_id_by_title(query_title, movie_df, score_cutoff=75):
-    if movie_df is None:
-        raise ValueError("Movie DataFrame must be provided.")
+    print(f"Computed top-{k} neighbour table for {n} movies")
+
+    return NeighbourTable(
+        indices=indices, scores=scores, movie_ids=movie_df['id'].to_numpy().astype('int64'), sketch=sketch,
+        checksum=catalog_checksum(catalog)
+    )
+
+def catalog_checksum(catalog):
+    # Catalogs saved or loaded through the asset store already know it; anything else is hashed once.
+    if catalog.checksum is None:
+        catalog.checksum = content_checksum(catalog.movie_df, catalog.facet_store)
+    return catalog.checksum
+
+def save_neighbour_table(table, path=NEIGHBOURS_PATH):
+    sketch = {'sketch': table.sketch} if table.sketch is not None else {}
+    np.savez(path, indices=table.indices, scores=table.scores, movie_ids=table.movie_ids, checksum=table.checksum or '', **sketch)
+
+def load_neighbour_table(catalog, path=NEIGHBOURS_PATH):
+    if not os.path.exists(path):
+        print("No neighbour table found, similarity searches will run live.")
+        return None
+
+    with np.load(path) as data:
+        table = NeighbourTable(
+            indices=data['indices'], scores=data['scores'], movie_ids=data['movie_ids'],
+            sketch=data['sketch'] if 'sketch' in data.files else None,
+            checksum=str(data['checksum']) if 'checksum' in data.files else None
+        )
+
+    if not table.is_fresh(catalog.movie_df, catalog_checksum(catalog)):
+        print("Neighbour table does not match the loaded catalogue, similarity searches will run live.")
+        return None
+
+    print(f"Loaded top-{table.k} neighbour table for {len(table.movie_ids)} movies")
+    return table
+
+def precompute_neighbours(catalog, k=NEIGHBOUR_TABLE_K, path=NEIGHBOURS_PATH):
+    catalog.neighbours = compute_neighbour_table(catalog, k)
+    save_neighbour_table(catalog.neighbours, path)
+    return catalog
+
+def facet_scores(catalog, query_rows, rows, weights=None):
+    # Exact per-facet terms of each result's weighted cosine to the query rows (averaged over
+    # several seeds), so callers can say why a movie matched instead of guessing.
+    return np.mean([
+        catalog.facet_store.weighted_contributions(query_row, rows, weights or DEFAULT_WEIGHTS) for query_row in query_rows
+    ], axis=0)
+
+def similar_movie_results(catalog, rows, similarities, query_rows, weights=None, ranked=False, fusion_scores=None):
+    # ranked results are already in their final order, which need not be by score.
+    found = rows != -1
+    if not found.any():
+        return [], "No similar movies found"
+
+    rows, similarities = rows[found].astype('int64'), similarities[found].astype('float32')
+    if not ranked:
+        order = np.argsort(-similarities, kind='stable')
+        rows, similarities = rows[order], similarities[order]
+
+    scores = facet_scores(catalog, query_rows, rows, weights)
+    return similar_movies(catalog.columns, rows, similarities, FACET_NAMES, scores, fusion_scores), None
+
+def rescore_candidates(catalog, query_rows, candidates, k, weights):
+    similarities = np.full((len(query_rows), k), -np.inf, dtype='float32')
+    indices = np.full((len(query_rows), k), -1, dtype='int64')
+
+    for i, query_row in enumerate(query_rows):
+        rows = candidates[i][candidates[i] != -1]
+        scores = catalog.facet_store.weighted_similarity(query_row, rows, weights)
+        top = np.argsort(-scores, kind='stable')[:k]
+        similarities[i, :len(top)] = scores[top]
+        indices[i, :len(top)] = rows[top]
+
+    return similarities, indices
+
+def mmr_order(relevance, vectors, k, diversity):
+    # Greedy maximal marginal relevance: each pick maximises
+    # (1 - diversity) * relevance - diversity * (its highest similarity to an earlier pick).
+    k = min(k, len(relevance))
+    order = np.empty(k, dtype='int64')
+    if not k:
+        return order
+
+    relevance = np.asarray(relevance, dtype='float32')
+    similarity = vectors @ vectors.T
+    picked = np.zeros(len(relevance), dtype=bool)
+
+    order[0] = np.argmax(relevance)
+    picked[order[0]] = True
+    redundancy = similarity[order[0]].copy()
+    for i in range(1, k):
+        scores = (1 - diversity) * relevance - diversity * redundancy
+        scores[picked] = -np.inf
+        order[i] = np.argmax(scores)
+        picked[order[i]] = True
+        np.maximum(redundancy, similarity[order[i]], out=redundancy)
+
+    return order
+
+def mmr_pool_size(k, limit=NEIGHBOUR_TABLE_K):
+    # Capped at the table's depth so diversified searches are answered from it like plain ones,
+    # and live searches use the same pool so results do not depend on whether a table is loaded.
+    return max(k, min(k * MMR_CANDIDATE_FACTOR, limit))
+
+def candidate_vectors(catalog, rows):
+    # Rows appended since the table was computed have no sketch.
+    sketch = None if catalog.neighbours is None else catalog.neighbours.sketch
+    if sketch is not None and np.all(rows < len(sketch)):
+        return sketch[rows]
+    return indexed_composites(catalog, rows)
+
+def indexed_composites(catalog, rows):
+    # Reading vectors back from the index is a copy; composite_rows redoes the weighting.
+    if can_reconstruct(catalog.faiss_index):
+        return catalog.faiss_index.reconstruct_batch(rows.astype('int64'))
+    return composite_rows(catalog.facet_store, rows)
+
+def diversified_results(catalog, rows, similarities, k, diversity, query_row, weights=None):
+    if diversity is None:
+        return similar_movie_results(catalog, rows, similarities, [query_row], weights)
+
+    found = rows != -1
+    rows, similarities = rows[found], similarities[found]
+    order = mmr_order(similarities, candidate_vectors(catalog, rows), k, diversity)
+    return similar_movie_results(catalog, rows[order], similarities[order], [query_row], weights, ranked=True)
+
+def searchable_rows(catalog, filters):
+    # None means every row is searchable, so the caller can skip the ID selector entirely.
+    if filters is None:
+        return catalog.live_rows() if catalog.has_tombstones() else None
+
+    rows = catalog.filter_index.matching_rows(filters)
+    if catalog.has_tombstones():
+        rows = rows[~catalog.tombstones[rows]]
+    return rows
+
+def searchable_bitmap(catalog, rows):
+    if rows is None:
+        return None
+    # Unfiltered searches of a catalogue with tombstones share the cached live-row bitmap.
+    if catalog.live is not None and rows is catalog.live[0]:
+        return catalog.live[1]
+    return row_bitmap(rows, len(catalog.movie_df))
+
+def table_neighbours(catalog, query_row, pool_k):
+    # The table outlives updates: hits on removed or replaced movies are dropped and rows appended
+    # since it was computed are scored exactly, which is the live search's answer as long as
+    # pool_k hits survive. None means the search has to run live.
+    neighbours = catalog.neighbours
+    table_rows = len(neighbours.indices)
+    if query_row >= table_rows:
+        return None
+
+    rows = neighbours.indices[query_row].astype('int64')
+    keep = rows != -1
+    if catalog.has_tombstones():
+        keep &= ~catalog.tombstones[rows]
+    if np.count_nonzero(keep) < pool_k:
+        return None
+    rows, scores = rows[keep][:pool_k], neighbours.scores[query_row][keep][:pool_k].astype('float32')
+
+    appended = np.arange(table_rows, len(catalog.movie_df))
+    if catalog.tombstones is not None:
+        appended = appended[~catalog.tombstones[appended]]
+    if len(appended):
+        query = composite_rows(catalog.facet_store, np.array([query_row]))[0]
+        rows = np.concatenate([rows, appended])
+        scores = np.concatenate([scores, indexed_composites(catalog, appended) @ query])
+        top = np.argsort(-scores, kind='stable')[:pool_k]
+        rows, scores = rows[top], scores[top]
+
+    return rows, scores
+
+def no_match_error(filters):
+    return f"No movies match {filters.describe()}" if filters is not None else "No movies in the catalogue"
+
+def search_composite(catalog, queries, k, bitmap=None):
+    if bitmap is None:
+        return catalog.faiss_index.search(queries, k)
+    return search_subset(catalog.faiss_index, queries, k, bitmap, catalog.faiss_index.ntotal)
+
+def find_similar_movies_batch(query_movie_ids, k=10, catalog=None, weights=None, filters=None, diversity=None):
+    if catalog is None:
+        raise ValueError("Movie catalog must be provided.")
+
+    weights = resolve_weights(weights)
+    filters = resolve_filters(filters)
+    diversity = resolve_diversity(diversity)
+    neighbours = catalog.neighbours
+    # Diversified searches over-fetch and let MMR pick k of the candidates.
+    pool_k = k if diversity is None else mmr_pool_size(k, NEIGHBOUR_TABLE_K if neighbours is None else neighbours.k)
+    use_table = weights is None and filters is None and neighbours is not None and pool_k <= neighbours.k
+    allowed_rows = searchable_rows(catalog, filters)
+    results = {}
+    live_ids = []
+    live_rows = []
+
+    for query_movie_id in query_movie_ids:
+        query_row = catalog.row_for_id(query_movie_id)
+        hits = table_neighbours(catalog, query_row, pool_k) if use_table and query_row is not None else None
+
+        if query_row is None:
+            results[query_movie_id] = ([], f"Movie with ID {query_movie_id} not found")
+        elif allowed_rows is not None and len(allowed_rows) <= 1 and not len(allowed_rows[allowed_rows != query_row]):
+            results[query_movie_id] = ([], no_match_error(filters))
+        elif hits is not None:
+            results[query_movie_id] = diversified_results(catalog, *hits, k, diversity, query_row)
+        else:
+            live_ids.append(query_movie_id)
+            live_rows.append(query_row)
+
+    if live_rows:
+        # One search for every seed the neighbour table cannot answer, so FAISS can spread the
+        # queries over its threads instead of paying Python overhead per seed.
+        live_rows = np.array(live_rows, dtype='int64')
+        queries = composite_rows(catalog.facet_store, live_rows)
+
+        bitmap = searchable_bitmap(catalog, allowed_rows)
+
+        if allowed_rows is not None and len(allowed_rows) <= FILTER_EXACT_ROWS:
+            # A selective filter leaves few enough rows to score them all exactly, which also
+            # avoids graph indexes losing recall when most of their neighbours are filtered out.
+            candidates = [allowed_rows[allowed_rows != query_row] for query_row in live_rows]
+            similarities, indices = rescore_candidates(catalog, live_rows, candidates, pool_k, weights or DEFAULT_WEIGHTS)
+        elif weights is None:
+            similarities, indices = search_composite(catalog, queries, pool_k + 1, bitmap)
+            similarities, indices = drop_query_rows(similarities, indices, live_rows, pool_k)
+        else:
+            # Candidates come from the default composite, then get the exact weighted score.
+            pool = min(pool_k * RESCORE_CANDIDATE_FACTOR, catalog.faiss_index.ntotal - 1)
+            candidate_scores, candidates = search_composite(catalog, queries, pool + 1, bitmap)
+            _, candidates = drop_query_rows(candidate_scores, candidates, live_rows, pool)
+            similarities, indices = rescore_candidates(catalog, live_rows, candidates, pool_k, weights)
+
+        for i, query_movie_id in enumerate(live_ids):
+            results[query_movie_id] = diversified_results(
+                catalog, indices[i], similarities[i], k, diversity, live_rows[i], weights
+            )
+
+    return {query_movie_id: results[query_movie_id] for query_movie_id in query_movie_ids}
+
+def find_similar_movies(query_movie_id, k=10, catalog=None, weights=None, filters=None, diversity=None):
+    return find_similar_movies_batch(
+        [query_movie_id], k=k, catalog=catalog, weights=weights, filters=filters, diversity=diversity
+    )[query_movie_id]
+
+def find_movies_like_set(query_movie_ids, k=10, catalog=None, weights=None, filters=None, mode='centroid'):
+    if catalog is None:
+        raise ValueError("Movie catalog must be provided.")
+    if mode not in SET_MODES:
+        raise ValueError(f"Unknown mode '{mode}'. Expected one of {SET_MODES}.")
+
+    weights = resolve_weights(weights)
+    filters = resolve_filters(filters)
+
+    if not query_movie_ids:
+        return [], "At least one movie ID must be provided."
+    missing = [movie_id for movie_id in query_movie_ids if catalog.row_for_id(movie_id) is None]
+    if missing:
+        return [], f"Movies with IDs {missing} not found"
+    seed_rows = np.unique([catalog.row_for_id(movie_id) for movie_id in query_movie_ids]).astype('int64')
+
+    allowed_rows = searchable_rows(catalog, filters)
+
+    if allowed_rows is not None and len(allowed_rows) <= FILTER_EXACT_ROWS + len(seed_rows):
+        candidates = allowed_rows[~np.isin(allowed_rows, seed_rows)]
+        if not len(candidates):
+            return [], no_match_error(filters)
+    else:
+        queries = composite_rows(catalog.facet_store, seed_rows)
+        if mode == 'centroid':
+            # Composites are unit length, so the centroid ranks movies by their mean cosine to the seeds.
+            queries = normalize(queries.mean(axis=0, keepdims=True)).astype('float32')
+
+        pool = k if weights is None else k * RESCORE_CANDIDATE_FACTOR
+        pool = min(pool + len(seed_rows), catalog.faiss_index.ntotal)
+        # Seeds are left in the bitmap and dropped from the hits, so it can be the cached one.
+        _, hits = search_composite(catalog, queries, pool, searchable_bitmap(catalog, allowed_rows))
+        candidates = np.unique(hits[hits != -1])
+        candidates = candidates[~np.isin(candidates, seed_rows)]
+
+    if not len(candidates):
+        return [], "No similar movies found"
+
+    # Every candidate gets its exact (weighted) cosine to every seed, whichever search found it.
+    scores = np.stack([
+        catalog.facet_store.weighted_similarity(seed_row, candidates, weights or DEFAULT_WEIGHTS) for seed_row in seed_rows
+    ])
+    mean_scores = scores.mean(axis=0)
+    if mode == 'centroid':
+        top = np.argsort(-mean_scores, kind='stable')[:k]
+        return similar_movie_results(catalog, candidates[top], mean_scores[top], seed_rows, weights)
+
+    # Each seed contributes its own top k, as if it had been searched alone. Results are ranked by
+    # the fused score but report the mean cosine to the seeds, which the facet scores sum to.
+    rankings = [np.argsort(-seed_scores, kind='stable')[:k] for seed_scores in scores]
+    top, fusion_scores = fuse_rankings(rankings, k)
+    return similar_movie_results(
+        catalog, candidates[top], mean_scores[top], seed_rows, weights, ranked=True, fusion_scores=fusion_scores
+    )
+
+def find_movies_by_id(query_movie_id, catalog):
+    if catalog is None:
+        raise ValueError("Movie catalog must be provided.")
+
+    query_row = catalog.row_for_id(query_movie_id)
+
+    if query_row is None:
+        return [], f"Movie with ID {query_movie_id} not found"
+
+    return movies(catalog.columns, [query_row]), None
+
+def find_id_by_title(query_title, catalog, score_cutoff=75):
+    if catalog is None:
+        raise ValueError("Movie catalog must be provided.")
         
     if not query_title or not isinstance(query_title, str):
         return None, "A valid query title must be provided."
 
-    titles = movie_df['title'].tolist()
-
-    best_match = process.extractOne(query_title, titles)
+    best_match = catalog.title_matcher.match(query_title, limit=1)
     
-    if best_match is None:
-        return None, "No titles available for matching."
+    if not best_match:
+        return None, f"No close match found for '{query_title}'."
 
-    matched_title, score = best_match
+    movie_row, score = best_match[0]
+    matched_title = catalog.title_matcher.titles[movie_row]
 
     if score >= score_cutoff:
-        movie_index = movie_df[movie_df['title'] == matched_title].index[0]
-        
-        movie_id = movie_df.at[movie_index, 'id']
+        movie_id = catalog.movie_df.at[movie_row, 'id']
         
         return int(movie_id), None
     else:
         error_message = f"No close match found for '{query_title}'. Best match was '{matched_title}' with a score of {score}, which is below the cutoff of {score_cutoff}."
         return None, error_message
 
-def find_movies_by_description(query_description, k=5, model=None, movie_df=None):
-    if model is None or movie_df is None:
-        return pd.DataFrame(), "A SentenceTransformer model and a movie DataFrame must be provided."
-    if 'overview_emb' not in movie_df.columns:
-        return pd.DataFrame(), "DataFrame is missing the required 'overview_emb' column."
-    if not query_description or not isinstance(query_description, str):
-        return pd.DataFrame(), "A valid string for query_description must be provided."
+def encode_query(model, text):
+    return np.asarray(model.encode([text]), dtype='float32')
 
-    try:
-        overview_embeddings = np.vstack(movie_df['overview_emb'].dropna().values)
+def find_title_candidates(query_title, catalog, limit=5, score_cutoff=75):
+    if catalog is None:
+        raise ValueError("Movie catalog must be provided.")
 
-        query_embedding = model.encode([query_description])
+    if not query_title or not isinstance(query_title, str):
+        return [], "A valid query title must be provided."
 
-        cosine_scores = np.dot(overview_embeddings, query_embedding.T).flatten()
+    # One fuzzy match gives both the best hit and its alternatives.
+    matcher = catalog.title_matcher
+    matches = matcher.match(query_title, limit=limit)
+    candidates = [
+        {
+            'id': int(catalog.movie_df.at[row, 'id']),
+            'title': matcher.titles[row],
+            'year': matcher.years[row],
+            'score': score
+        }
+        for row, score in matches
+        if score >= score_cutoff
+    ]
 
-        top_k_indices = np.argpartition(cosine_scores, -k)[-k:]
+    if not candidates:
+        if not matches:
+            return [], f"No close match found for '{query_title}'."
+        best_row, best_score = matches[0]
+        return [], f"No close match found for '{query_title}'. Best match was '{matcher.titles[best_row]}' with a score of {best_score}, which is below the cutoff of {score_cutoff}."
 
-        similar_movies_df = movie_df.iloc[top_k_indices].copy()
-        similar_movies_df['similarity_score'] = cosine_scores[top_k_indices]
+    return candidates, None
 
-        similar_movies_df = similar_movies_df.sort_values(by='similarity_score', ascending=False).reset_index(drop=True)
+def fuse_rankings(rankings, k):
+    fused = {}
+    for rows in rankings:
+        for rank, row in enumerate(rows.tolist(), start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (RRF_K + rank)
 
-        result_columns = ['id', 'title', 'overview', 'vote_average', 'similarity_score']
-        return_columns = [col for col in result_columns if col in similar_movies_df.columns]
-        
-        return similar_movies_df[return_columns], None
+    top = sorted(fused.items(), key=lambda item: -item[1])[:k]
+
+    # Scaled so that a movie ranked first by every retriever scores 1.0.
+    best = len(rankings) / (RRF_K + 1)
+    rows = np.array([row for row, _ in top], dtype='int64')
+    scores = np.array([score / best for _, score in top], dtype='float32')
+    return rows, scores
+
+def search_overview(catalog, query_embedding, k, bitmap=None):
+    if bitmap is None:
+        return catalog.overview_index.search(query_embedding, k)
+    return search_subset(catalog.overview_index, query_embedding, k, bitmap, len(catalog.movie_df))
+
+def find_movies_by_description(query_description, k=5, model=None, catalog=None, embedding_cache=None, mode='hybrid', filters=None):
+    if mode not in DESCRIPTION_MODES:
+        raise ValueError(f"Unknown mode '{mode}'. Expected one of {DESCRIPTION_MODES}.")
+    if model is None or catalog is None:
+        return [], "A SentenceTransformer model and a movie catalog must be provided."
+
+    if catalog.overview_index is None or catalog.overview_index.ntotal == 0:
+        return [], "The movie catalog has no overview embeddings to search."
+    if not query_description or not isinstance(query_description, str):
+        return [], "A valid string for query_description must be provided."
+
+    filters = resolve_filters(filters)
+    allowed_rows = searchable_rows(catalog, filters)
+    if allowed_rows is not None and not len(allowed_rows):
+        return [], no_match_error(filters)
+    bitmap = searchable_bitmap(catalog, allowed_rows)
+
+    try:
+        if embedding_cache is not None:
+            query_embedding = embedding_cache.get_or_compute(query_description, lambda text: encode_query(model, text))
+        else:
+            query_embedding = encode_query(model, query_description)
+
+        if mode == 'dense' or catalog.lexical_index is None:
+            cosine_scores, top_k_rows = search_overview(catalog, query_embedding, k, bitmap)
+            found = top_k_rows[0] != -1
+            rows, scores = top_k_rows[0][found], cosine_scores[0][found]
+            order = np.argsort(-scores, kind='stable')
+            return movie_matches(catalog.columns, rows[order], scores[order]), None
+
+        pool = max(k, HYBRID_CANDIDATES)
+        _, dense_rows = search_overview(catalog, query_embedding, pool, bitmap)
+        lexical_rows, _ = catalog.lexical_index.search(query_description, pool, allowed_rows)
+        rows, fusion_scores = fuse_rankings([dense_rows[0][dense_rows[0] != -1], lexical_rows], k)
+        # Lexical-only hits have no dense score from the search, so every cosine is computed here;
+        # movies without an overview embedding score 0.
+        cosine_scores = np.asarray(catalog.facet_store.facet_rows('overview', rows), dtype='float32') @ query_embedding[0]
+        return movie_matches(catalog.columns, rows, cosine_scores, fusion_scores), None
 
     except ValueError as ve:
-        return pd.DataFrame(), f"Error processing embeddings. Check if all 'overview_emb' entries have the same dimension. Details: {ve}"
+        return [], f"Error processing embeddings. Check if all 'overview_emb' entries have the same dimension. Details: {ve}"
     except Exception as e:
-        return pd.DataFrame(), f"An unexpected error occurred in find_movies_by_description: {e}"
+        return [], f"An unexpected error occurred in find_movies_by_description: {e}"
 
-def load_all_movies_and_build_index(connect, cursor):
-    
-    try:
-        cursor.execute("""
+MOVIE_QUERY = """
             SELECT 
-                id, title, overview, vote_average, vote_average_scaled,
-                overview_emb, genres_emb, keywords_emb, 
+                id, title, overview, vote_average, vote_average_scaled, release_date,
+                (
+                    SELECT string_agg(k.name, ' ')
+                    FROM movie_keyword mk JOIN keyword k ON k.id = mk.keyword_id
+                    WHERE mk.movie_id = movie.id
+                ) AS keywords,
+                (
+                    SELECT array_agg(g.name ORDER BY g.name)
+                    FROM movie_genre mg JOIN genre g ON g.id = mg.genre_id
+                    WHERE mg.movie_id = movie.id
+                ) AS genres,
+                {overview_emb} AS overview_emb, {genres_emb} AS genres_emb, {keywords_emb} AS keywords_emb, 
                 atmosphere, narrative, themes,
-                atmosphere_emb, narrative_emb, themes_emb, classified_emb_combined
+                {atmosphere_emb} AS atmosphere_emb, {narrative_emb} AS narrative_emb, {themes_emb} AS themes_emb,
+                {classified_emb_combined} AS classified_emb_combined
             FROM movie 
-            WHERE classified_emb_combined IS NOT NULL
+            WHERE {classified_emb_combined} IS NOT NULL {conditions}
             ORDER BY id
-        """)
-        
-        rows = cursor.fetchall()
-        columns = ['id', 'title', 'overview', 'vote_average', 'vote_average_scaled',
-                  'overview_emb', 'genres_emb', 'keywords_emb', 
-                  'atmosphere', 'narrative', 'themes',
-                  'atmosphere_emb', 'narrative_emb', 'themes_emb', 'classified_emb_combined']
-        
-        df = pd.DataFrame(rows, columns=columns)
-        print(f"Loaded {len(df)} movies with embeddings")
-        
-        composite_vectors = []
-        for _, movie in df.iterrows():
-            movie_dict = movie.to_dict()
-            composite_vector = create_composite_vector(movie_dict)
-            composite_vectors.append(composite_vector[0])
-        
-        composite_vectors = np.array(composite_vectors).astype('float32')
-        
-        d = composite_vectors.shape[1]
-        index = faiss.IndexFlatIP(d)
-        index.add(composite_vectors)
-        
-        print(f"Built FAISS index with {index.ntotal} vectors of dimension {d}")
-        
-        return df, index
+        """
+MOVIE_COLUMNS = ['id', 'title', 'overview', 'vote_average', 'vote_average_scaled', 'release_date', 'keywords', 'genres',
+                 'overview_emb', 'genres_emb', 'keywords_emb', 
+                 'atmosphere', 'narrative', 'themes',
+                 'atmosphere_emb', 'narrative_emb', 'themes_emb', 'classified_emb_combined']
+
+# The tables MOVIE_QUERY reads. Every statement that writes to one bumps catalog_version in the
+# same transaction, so a startup reads one row to tell whether the catalogue changed. Concurrent
+# writers queue on that row until they commit, which the pipeline's batch loads can afford.
+CATALOG_TABLES = ('movie', 'movie_keyword', 'keyword', 'movie_genre', 'genre')
+CATALOG_VERSION_DDL = """
+            CREATE TABLE IF NOT EXISTS catalog_version (
+                id boolean PRIMARY KEY DEFAULT true CHECK (id),
+                -- Tells a recreated database apart from the one the saved assets came from.
+                epoch text NOT NULL DEFAULT md5(random()::text || clock_timestamp()::text),
+                version bigint NOT NULL DEFAULT 0
+            );
+            INSERT INTO catalog_version DEFAULT VALUES ON CONFLICT DO NOTHING;
+            CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+            BEGIN
+                UPDATE catalog_version SET version = version + 1;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """
+CATALOG_VERSION_TRIGGER = """
+            DROP TRIGGER IF EXISTS bump_catalog_version ON {table};
+            CREATE TRIGGER bump_catalog_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+        """
+
+# Databases without catalog_version are hashed inside Postgres instead, which reads every row.
+FINGERPRINT_QUERY = """
+            SELECT
+                count(*),
+                coalesce(max(id), 0),
+                md5(string_agg(md5(ROW(
+                    id, title, overview, vote_average, vote_average_scaled, release_date,
+                    {overview_emb}, {genres_emb}, {keywords_emb}, {atmosphere_emb}, {narrative_emb}, {themes_emb}
+                )::text), '' ORDER BY id)),
+                (SELECT coalesce(sum(hashtext(movie_id || ':' || keyword_id)), 0) FROM movie_keyword),
+                (SELECT coalesce(sum(hashtext(movie_id || ':' || genre_id)), 0) FROM movie_genre)
+            FROM movie
+            WHERE {classified_emb_combined} IS NOT NULL {conditions}
+        """
+
+def embedding_storage_from_env():
+    storage = os.environ.get('EMBEDDING_STORAGE', 'array').lower()
+    if storage not in EMBEDDING_STORAGES:
+        raise ValueError(f"Unknown embedding storage '{storage}'. Expected one of {EMBEDDING_STORAGES}.")
+    return storage
+
+def movie_query(template, storage=None, conditions=''):
+    # Fills the embedding column placeholders of a query with the columns the storage mode reads.
+    storage = storage or embedding_storage_from_env()
+    suffix = BLOB_COLUMN_SUFFIX if storage == 'bytea' else ''
+    return template.format(conditions=conditions, **{column: column + suffix for column in EMBEDDING_COLUMNS})
+
+def install_catalog_version(cursor):
+    cursor.execute(CATALOG_VERSION_DDL)
+    for table in CATALOG_TABLES:
+        cursor.execute(CATALOG_VERSION_TRIGGER.format(table=table))
+
+def catalog_fingerprint(cursor, storage=None):
+    cursor.execute("SELECT to_regclass('catalog_version') IS NOT NULL")
+    if cursor.fetchone()[0]:
+        cursor.execute("SELECT epoch, version FROM catalog_version")
+        epoch, version = cursor.fetchone()
+        return {'epoch': epoch, 'version': int(version)}
+
+    print("No catalog_version table; run update_catalog.py install-version-triggers to skip hashing the catalogue.")
+    cursor.execute(movie_query(FINGERPRINT_QUERY, storage))
+    rows, max_id, checksum, keyword_links, genre_links = cursor.fetchone()
+    return {
+        'rows': int(rows),
+        'max_id': int(max_id),
+        'checksum': checksum or '',
+        'keyword_links': int(keyword_links),
+        'genre_links': int(genre_links),
+    }
+
+def load_fingerprint(path=FINGERPRINT_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_fingerprint(fingerprint, path=FINGERPRINT_PATH):
+    staging_path = f"{path}.tmp"
+    with open(staging_path, 'w') as f:
+        json.dump(fingerprint, f, indent=2)
+    os.replace(staging_path, path)
+
+def fetch_movie_rows(cursor, movie_ids=None, storage=None):
+    if movie_ids is None:
+        cursor.execute(movie_query(MOVIE_QUERY, storage))
+    else:
+        cursor.execute(movie_query(MOVIE_QUERY, storage, 'AND id = ANY(%s)'), ([int(movie_id) for movie_id in movie_ids],))
+
+    return pd.DataFrame(cursor.fetchall(), columns=MOVIE_COLUMNS)
+
+MOVIE_COUNT_QUERY = "SELECT count(*) FROM movie WHERE {classified_emb_combined} IS NOT NULL {conditions}"
+
+def stream_movie_rows(connect, chunk_size=INGEST_CHUNK_SIZE, storage=None):
+    # A named cursor keeps the result set on the server, so only chunk_size rows of Python
+    # lists exist at any time instead of the whole catalogue.
+    stream = connect.cursor(name='movie_ingest')
+    stream.itersize = chunk_size
+    try:
+        stream.execute(movie_query(MOVIE_QUERY, storage))
+        while True:
+            rows = stream.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield pd.DataFrame(rows, columns=MOVIE_COLUMNS)
+    finally:
+        stream.close()
+
+def index_from_store(index, facet_store, chunk_size=COMPOSITE_CHUNK_SIZE, training_rows=INDEX_TRAINING_ROWS):
+    n = len(facet_store)
+    if not index.is_trained:
+        rows = np.arange(n) if n <= training_rows else np.sort(np.random.default_rng(0).choice(n, training_rows, replace=False))
+        index.train(composite_rows(facet_store, rows))
+
+    for start in range(0, n, chunk_size):
+        index.add(composite_rows(facet_store, slice(start, start + chunk_size)))
+
+    return index
+
+def load_all_movies_and_build_index(connect, cursor, index_config=None, chunk_size=INGEST_CHUNK_SIZE, storage=None):
+    index_config = index_config or index_config_from_env()
+    
+    try:
+        # The count and the stream share one snapshot, so the preallocated matrices fit exactly.
+        connect.rollback()
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        cursor.execute(movie_query(MOVIE_COUNT_QUERY, storage))
+        n = cursor.fetchone()[0]
+
+        facets = {
+            name: np.empty((n, facet_dim(column)), dtype=np.float64 if name in EXACT_FACETS else np.float32)
+            for name, column, _ in COMPOSITE_FACETS
+        }
+        # Indexes that need no training take each chunk as it arrives; the rest are filled from
+        # the facet store afterwards, since they must see the data before anything is added.
+        index = empty_index(composite_dim(), n, index_config)
+        stream_to_index = index.is_trained
+
+        metadata = []
+        loaded = 0
+        for chunk in stream_movie_rows(connect, chunk_size, storage):
+            end = loaded + len(chunk)
+            if end > n:
+                raise ValueError(f"Expected {n} movies but the database returned more.")
+
+            for name, column, _ in COMPOSITE_FACETS:
+                facets[name][loaded:end] = frame_facet(chunk, column, facets[name].dtype)
+            if stream_to_index:
+                index.add(weighted_composite([facets[name][loaded:end] for name, _, _ in COMPOSITE_FACETS]))
+
+            metadata.append(metadata_frame(chunk))
+            loaded = end
+
+        if loaded != n:
+            raise ValueError(f"Expected {n} movies but the database returned {loaded}.")
+        print(f"Loaded {n} movies with embeddings")
+
+        facet_store = FacetStore(facets)
+        if not stream_to_index:
+            index_from_store(index, facet_store)
+        apply_search_params(index, index_config)
+        print(f"Built {index_config.describe()} FAISS index with {index.ntotal} vectors of dimension {index.d}")
+
+        movie_df = pd.concat(metadata, ignore_index=True) if metadata else metadata_frame(pd.DataFrame(columns=MOVIE_COLUMNS))
+        return movie_df, facet_store, index
         
     finally:
         cursor.close()
         connect.close()
 
-def build_index():
-    movie_df = pd.read_pickle(DF_PATH)
-    
+def load_movie_assets():
+    if has_asset_store(ASSET_STORE_PATH):
+        movie_df, facet_store = open_asset_store(ASSET_STORE_PATH)
+    else:
+        # Deployments from before the asset store only ship the pickled DataFrame.
+        legacy_df = pd.read_pickle(DF_PATH)
+        movie_df, facet_store = metadata_frame(legacy_df), build_facet_store(legacy_df)
+
     print(f"Loaded {len(movie_df)} movies with embeddings")
-        
-    composite_vectors = []
-    for _, movie in movie_df.iterrows():
-        movie_dict = movie.to_dict()
-        composite_vector = create_composite_vector(movie_dict)
-        composite_vectors.append(composite_vector[0])
-    
-    composite_vectors = np.array(composite_vectors).astype('float32')
-    
-    d = composite_vectors.shape[1]
-    index = faiss.IndexFlatIP(d)
-    index.add(composite_vectors)
-    
-    print(f"Built FAISS index with {index.ntotal} vectors of dimension {d}")
+
+    return movie_df, facet_store
+
+def build_index(index_config=None):
+    movie_df, facet_store = load_movie_assets()
+
+    composite_vectors = build_composite_from_store(facet_store)
+    index = build_faiss_index(composite_vectors, index_config)
     
-    return movie_df, index
+    return movie_df, facet_store, index
 
-def load_or_build_index(connect, cursor):
-    print("v1:Current working directory:", os.getcwd())
-    print("faiss index path exists: ", os.path.exists(FAISS_INDEX_PATH))
+def save_assets(catalog, index_config):
+    print("Saving index and dataframe for future use...")
+    os.makedirs('assets', exist_ok=True)
+    write_index(catalog.faiss_index, FAISS_INDEX_PATH)
+    write_index(catalog.overview_index, OVERVIEW_INDEX_PATH)
+    catalog.lexical_index.save(LEXICAL_INDEX_PATH)
+    save_index_config(index_config, INDEX_CONFIG_PATH)
+    catalog.checksum = write_asset_store(ASSET_STORE_PATH, catalog.movie_df, catalog.facet_store)
+    print("Assets saved successfully!")
+
+def load_overview_index(path=OVERVIEW_INDEX_PATH):
+    if not os.path.exists(path):
+        return None
+    return faiss.read_index(path)
+
+def load_lexical_index(path=LEXICAL_INDEX_PATH):
+    if not os.path.exists(path):
+        return None
+    return BM25Index.load(path)
+
+def serving_assets(directory='assets'):
+    paths = [os.path.join(directory, os.path.basename(path)) for path in SERVING_ASSETS]
+    return [path for path in paths if os.path.exists(path)]
+
+def snapshot_catalog(catalog, index_config=None, root=SNAPSHOT_ROOT, keep=SNAPSHOT_KEEP):
+    if catalog.has_tombstones() or list_segments(DELTA_PATH):
+        catalog = compact_catalog(catalog, index_config)
+    elif catalog.neighbours is None:
+        catalog = precompute_neighbours(catalog)
+
+    version = publish_snapshot(root, serving_assets())
+    removed = prune_snapshots(root, keep)
+    print(f"Published snapshot {version}" + (f", pruned {len(removed)} old snapshots" if removed else ""))
+
+    return version
+
+def snapshot_asset(path, asset):
+    return os.path.join(path, os.path.basename(asset))
+
+def load_snapshot_catalog(path, precision=None):
+    # A snapshot carries its own index config; it is served as built, whatever the env asks for.
+    manifest = verify_snapshot(path)
+
+    index_config = load_index_config(snapshot_asset(path, INDEX_CONFIG_PATH))
+    movie_df, facet_store = open_asset_store(snapshot_asset(path, ASSET_STORE_PATH))
+    faiss_index = apply_search_params(read_index_mapped(snapshot_asset(path, FAISS_INDEX_PATH)), index_config)
+
+    catalog = build_catalog(
+        movie_df, faiss_index, load_overview_index(snapshot_asset(path, OVERVIEW_INDEX_PATH)),
+        load_lexical_index(snapshot_asset(path, LEXICAL_INDEX_PATH)), facet_store, precision
+    )
+    catalog.checksum = asset_store_checksum(snapshot_asset(path, ASSET_STORE_PATH))
+    catalog.neighbours = load_neighbour_table(catalog, snapshot_asset(path, NEIGHBOURS_PATH))
+    print(f"Loaded snapshot {manifest['version']} with {len(catalog.movie_df)} movies")
 
-    if os.path.exists(FAISS_INDEX_PATH) and os.path.exists(DF_PATH):
-        print("Loading existing FAISS index and dataframe...")
+    return catalog
+
+def load_saved_catalog(index_config, precision=None):
+    if not (os.path.exists(FAISS_INDEX_PATH) and has_asset_store(ASSET_STORE_PATH)):
+        return None
+
+    stored_config = load_index_config(INDEX_CONFIG_PATH)
+
+    if stored_config.build_key() != index_config.build_key():
+        print(f"Stored index is {stored_config.describe()} but {index_config.describe()} was requested.")
+    else:
+        print("Loading existing FAISS index and asset store...")
         try:
-            movie_df = pd.read_pickle(DF_PATH)
-            faiss_index = faiss.read_index(FAISS_INDEX_PATH)
-            print(f"Loaded existing index with {faiss_index.ntotal} movies")
-            return movie_df, faiss_index
+            movie_df, facet_store = open_asset_store(ASSET_STORE_PATH)
+            faiss_index = apply_search_params(read_index_mapped(FAISS_INDEX_PATH), index_config)
+            print(f"Loaded existing {index_config.describe()} index with {faiss_index.ntotal} movies")
+            catalog = build_catalog(movie_df, faiss_index, load_overview_index(), load_lexical_index(), facet_store, precision)
+            catalog.checksum = asset_store_checksum(ASSET_STORE_PATH)
+            catalog.neighbours = load_neighbour_table(catalog)
+            if apply_delta_segments(catalog) >= DELTA_COMPACT_SEGMENTS:
+                return compact_catalog(catalog, index_config)
+            return catalog
         except Exception as e:
             print(f"Error loading existing files: {e}")
             traceback.print_exc()  # <== this prints the full stack trace of the error
-            print("Rebuilding index...")
+    print("Rebuilding index...")
+    return None
+
+def load_or_build_index(connect, cursor, index_config=None, precision=None):
+    index_config = index_config or index_config_from_env()
+    precision = precision or facet_precision_from_env()
+
+    print("v1:Current working directory:", os.getcwd())
+    print("faiss index path exists: ", os.path.exists(FAISS_INDEX_PATH))
 
-    if (os.path.exists(DF_PATH)):
-        print("Building new FAISS index and dataframe...")
-        movie_df, faiss_index = build_index()
+    catalog = load_saved_catalog(index_config, precision)
+    if catalog is not None:
+        return catalog
+
+    if has_asset_store(ASSET_STORE_PATH) or os.path.exists(DF_PATH):
+        print("Building new FAISS index from saved assets...")
+        movie_df, facet_store, faiss_index = build_index(index_config)
     else:
-        movie_df, faiss_index = load_all_movies_and_build_index(connect, cursor)
+        # The database already reflects every update, so older deltas must not be replayed.
+        movie_df, facet_store, faiss_index = load_all_movies_and_build_index(connect, cursor, index_config)
+        clear_segments(DELTA_PATH)
     
-    print("Saving index and dataframe for future use...")
-    os.makedirs('assets', exist_ok=True)
-    faiss.write_index(faiss_index, FAISS_INDEX_PATH)
-    movie_df.to_pickle(DF_PATH)
-    print("Assets saved successfully!")
+    catalog = build_catalog(movie_df, faiss_index, facet_store=facet_store, precision=precision)
+    if apply_delta_segments(catalog):
+        return compact_catalog(catalog, index_config)
+    save_assets(catalog, index_config)
     
-    return movie_df, faiss_index
+    return precompute_neighbours(catalog)
+
+def cloud_load_or_build(connect, cursor, index_config=None, precision=None):
+    index_config = index_config or index_config_from_env()
+    precision = precision or facet_precision_from_env()
 
-def cloud_load_or_build(connect, cursor):
     print("v1:Current working directory:", os.getcwd())
     print("faiss index path exists: ", os.path.exists(FAISS_INDEX_PATH))
 
@@ -300,21 +1284,184 @@ def cloud_load_or_build(connect, cursor):
     #         traceback.print_exc()
     #         print("Rebuilding index...")
     
+    start = time.perf_counter()
+    fingerprint = catalog_fingerprint(cursor)
+    print(f"Catalog fingerprint {fingerprint} took {time.perf_counter() - start:.2f}s")
+
+    if load_fingerprint() == fingerprint:
+        catalog = load_saved_catalog(index_config, precision)
+        if catalog is not None:
+            print(f"Startup path: local assets match the database, ready in {time.perf_counter() - start:.1f}s")
+            return catalog
+
+    # A directory shared between instances, e.g. a mounted bucket, holding the last build's assets.
+    cache_dir = os.environ.get('ASSET_CACHE_DIR')
+    cache_fingerprint_path = os.path.join(cache_dir, os.path.basename(FINGERPRINT_PATH)) if cache_dir else None
+    if cache_dir and load_fingerprint(cache_fingerprint_path) == fingerprint:
+        print(f"Fetching prebuilt assets from {cache_dir}...")
+        copy_assets(serving_assets(cache_dir), 'assets')
+        clear_segments(DELTA_PATH)
+        catalog = load_saved_catalog(index_config, precision)
+        if catalog is not None:
+            save_fingerprint(fingerprint)
+            print(f"Startup path: cached assets match the database, ready in {time.perf_counter() - start:.1f}s")
+            return catalog
+
     print("Building new FAISS index and dataframe...")
-    movie_df, faiss_index = load_all_movies_and_build_index(connect, cursor)
+    movie_df, facet_store, faiss_index = load_all_movies_and_build_index(connect, cursor, index_config)
+    clear_segments(DELTA_PATH)
     
-    print("Saving index and dataframe for future use...")
-    os.makedirs('assets', exist_ok=True)
-    faiss.write_index(faiss_index, FAISS_INDEX_PATH)
-    movie_df.to_pickle(DF_PATH)
-    print("Assets saved successfully!")
+    # The self-join is too slow for every cold start; reuse a shipped table when it still matches.
+    # A table from other data is deleted, so it is neither served nor copied to the cache.
+    catalog = build_catalog(movie_df, faiss_index, facet_store=facet_store, precision=precision)
+    save_assets(catalog, index_config)
+    catalog.neighbours = load_neighbour_table(catalog)
+    if catalog.neighbours is None and os.path.exists(NEIGHBOURS_PATH):
+        os.remove(NEIGHBOURS_PATH)
+        print("Removed the stale neighbour table; run build_neighbours.py to precompute a new one.")
+    save_fingerprint(fingerprint)
+
+    if cache_dir:
+        # The fingerprint goes last, so a half-finished upload is never taken for a match.
+        copy_assets(serving_assets(), cache_dir)
+        save_fingerprint(fingerprint, cache_fingerprint_path)
+    print(f"Startup path: rebuilt from the database in {time.perf_counter() - start:.1f}s")
     
-    return movie_df, faiss_index
+    return catalog
+
+def make_indexes_writable(catalog):
+    if not catalog.owns_indexes:
+        catalog.faiss_index = writable_copy(catalog.faiss_index)
+        catalog.overview_index = writable_copy(catalog.overview_index)
+        catalog.owns_indexes = True
+
+def apply_upserts(catalog, movie_df, facet_store):
+    make_indexes_writable(catalog)
+
+    replaced = [row for row in map(catalog.row_for_id, movie_df['id'].tolist()) if row is not None]
+    start = len(catalog.movie_df)
+    rows = np.arange(start, start + len(movie_df))
+
+    catalog.movie_df = pd.concat([catalog.movie_df, movie_df], ignore_index=True)
+    catalog.facet_store = catalog.facet_store.appended(facet_store)
+    catalog.tombstones = np.concatenate([catalog.tombstones, np.zeros(len(movie_df), dtype=bool)])
+    catalog.tombstones[replaced] = True
+
+    # New rows are appended, so their FAISS labels are their row positions like everyone else's.
+    catalog.faiss_index.add(composite_rows(catalog.facet_store, rows))
+    catalog.live = None
+
+    overview_rows = rows[catalog.facet_store.sq_norms[rows, catalog.facet_store.names.index('overview')] > 0]
+    if len(overview_rows):
+        catalog.overview_index.add_with_ids(np.asarray(catalog.facet_store.facet_rows('overview', overview_rows), dtype='float32'), overview_rows)
+
+    # Kept current here so the next segment of a replay resolves ids to their newest row.
+    catalog.id_to_row.update(zip(movie_df['id'].astype(int).tolist(), rows.tolist()))
+    return replaced
+
+def apply_removals(catalog, movie_ids):
+    rows = [row for row in (catalog.id_to_row.pop(movie_id, None) for movie_id in movie_ids) if row is not None]
+    catalog.tombstones[rows] = True
+    catalog.live = None
+    return rows
+
+def refresh_catalog(catalog, start, dead_rows):
+    # Indexes the rows appended from start on and drops dead_rows, the rows tombstoned since the
+    # last refresh, so an update costs O(changed rows) rather than a rebuild of the metadata.
+    # The neighbour table stays (see table_neighbours); the catalog no longer matches its asset store.
+    catalog.checksum = None
+    movie_df = catalog.movie_df.iloc[start:]
+    rows = range(start, len(catalog.movie_df))
+
+    for name, column in result_columns(movie_df).items():
+        catalog.columns[name] = np.concatenate([catalog.columns[name], column])
+
+    titles = movie_df['title'].tolist()
+    for row, title in zip(rows, titles):
+        catalog.title_to_rows.setdefault(title, []).append(row)
+    for row in dead_rows:
+        title = catalog.movie_df.at[row, 'title']
+        catalog.title_to_rows[title].remove(row)
+        if not catalog.title_to_rows[title]:
+            del catalog.title_to_rows[title]
+
+    years = release_years(movie_df)
+    catalog.title_matcher.extend(titles, years)
+    catalog.title_matcher.remove(dead_rows)
+    catalog.filter_index.extend(*frame_filter_columns(movie_df, years))
+    # Tombstoned rows stay in the BM25 postings; searches with tombstones pass the live rows.
+    catalog.lexical_index.extend(lexical_documents(movie_df), movie_df['id'].to_numpy())
+
+    return catalog
+
+def upsert_movies(catalog, rows, delta_path=DELTA_PATH):
+    movie_df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+    movie_df = movie_df.drop_duplicates('id', keep='last').reset_index(drop=True)
+    if movie_df.empty:
+        return catalog
+
+    facet_store = build_facet_store(movie_df)
+    movie_df = metadata_frame(movie_df)
+
+    start = len(catalog.movie_df)
+    replaced = apply_upserts(catalog, movie_df, facet_store)
+    refresh_catalog(catalog, start, replaced)
+    if delta_path:
+        write_segment(delta_path, movie_df, facet_store)
+
+    print(f"Upserted {len(movie_df)} movies")
+    return catalog
+
+def remove_movies(catalog, movie_ids, delta_path=DELTA_PATH):
+    movie_ids = [int(movie_id) for movie_id in movie_ids]
+    removed = apply_removals(catalog, movie_ids)
+    if not removed:
+        return catalog
+
+    refresh_catalog(catalog, len(catalog.movie_df), removed)
+    if delta_path:
+        write_segment(delta_path, removed_ids=movie_ids)
+
+    print(f"Removed {len(removed)} movies")
+    return catalog
+
+def apply_delta_segments(catalog, delta_path=DELTA_PATH):
+    segments = list_segments(delta_path)
+    start = len(catalog.movie_df)
+    dead_rows = []
+
+    for path in segments:
+        movie_df, facet_store, removed_ids = read_segment(path)
+        if movie_df is not None:
+            dead_rows += apply_upserts(catalog, movie_df, facet_store)
+        dead_rows += apply_removals(catalog, removed_ids.tolist())
+
+    if segments:
+        # Rows both added and removed during the replay are indexed and then dropped again.
+        refresh_catalog(catalog, start, dead_rows)
+        print(f"Applied {len(segments)} delta segments")
+
+    return len(segments)
+
+def compact_catalog(catalog, index_config=None, delta_path=DELTA_PATH):
+    index_config = index_config or load_index_config(INDEX_CONFIG_PATH)
+    live_rows = np.flatnonzero(~catalog.tombstones)
+
+    movie_df = catalog.movie_df.iloc[live_rows]
+    facet_store = catalog.facet_store.take(live_rows)
+    faiss_index = build_faiss_index(build_composite_from_store(facet_store), index_config)
+
+    compacted = build_catalog(movie_df, faiss_index, facet_store=facet_store)
+    save_assets(compacted, index_config)
+    clear_segments(delta_path)
+
+    print(f"Compacted catalog to {len(live_rows)} movies")
+    return precompute_neighbours(compacted)
 
 def test():
     try:
         print("Loading movies and building FAISS index...")
-        movie_df, faiss_index = load_or_build_index()
+        catalog = load_or_build_index(None, None)
 
         while True:
             query_movie_id = int(input("\nEnter movie id: "))
@@ -324,15 +1471,14 @@ def test():
             results, error = find_similar_movies(
                 query_movie_id=query_movie_id,
                 k=10,
-                faiss_index=faiss_index,
-                movie_df=movie_df
+                catalog=catalog
             )
             
             if error:
                 print(f"Error: {error}")
             else:
                 print("\nSimilar movies found:")
-                print(results[['title', 'atmosphere', 'themes', 'narrative', 'similarity_score']].to_string())
+                print(format_similar_movies(results))
         
     except Exception as e:
         print(f"Error: {e}")
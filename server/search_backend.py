@@ -0,0 +1,335 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_values
+from movie_similarity_search import (
+    DESCRIPTION_MODES, EMBEDDING_DIM, HYBRID_CANDIDATES, SET_MODES, build_metadata_catalog, composite_dim, composite_rows,
+    encode_query, find_movies_by_description, find_movies_like_set, find_similar_movies_batch, fuse_rankings, mmr_order,
+    mmr_pool_size, resolve_diversity, resolve_filters, resolve_weights
+)
+from lexical_index import TITLE_BOOST
+from search_results import MovieMatch, SimilarMovie
+
+SEARCH_BACKENDS = ('faiss', 'pgvector')
+
+PGVECTOR_SYNC_BATCH_SIZE = 500
+PGVECTOR_EF_SEARCH = 100
+PGVECTOR_MAX_CONNECTIONS = 8
+# ts_rank_cd weights for the D, C, B and A labels: the title is labelled A and counts TITLE_BOOST
+# times the overview and keywords, as in the in-process BM25 documents.
+LEXICAL_RANK_WEIGHTS = [1.0 / TITLE_BOOST] * 3 + [1.0]
+
+# The RESULT_COLUMNS, release date and genres of the synced movies, all a pgvector replica keeps in process.
+METADATA_QUERY = """
+    SELECT m.id, m.title, m.overview, m.vote_average, m.release_date, m.atmosphere, m.narrative, m.themes,
+           (
+               SELECT array_agg(g.name ORDER BY g.name)
+               FROM movie_genre mg JOIN genre g ON g.id = mg.genre_id
+               WHERE mg.movie_id = m.id
+           ) AS genres
+    FROM movie_vector v JOIN movie m ON m.id = v.movie_id
+    ORDER BY m.id
+"""
+METADATA_COLUMNS = ['id', 'title', 'overview', 'vote_average', 'release_date', 'atmosphere', 'narrative', 'themes', 'genres']
+
+class SearchBackend:
+    name = None
+    # Whether searches read the in-process FAISS catalog, or only its id and title lookups.
+    local_vectors = True
+
+    def find_similar_movies(self, catalog, query_movie_id, k=10, weights=None, filters=None, diversity=None):
+        return self.find_similar_movies_batch(
+            catalog, [query_movie_id], k=k, weights=weights, filters=filters, diversity=diversity
+        )[query_movie_id]
+
+    def close(self):
+        pass
+
+class FaissBackend(SearchBackend):
+    # Today's path: every replica searches its own in-process catalog.
+    name = 'faiss'
+
+    def find_similar_movies_batch(self, catalog, query_movie_ids, k=10, weights=None, filters=None, diversity=None):
+        return find_similar_movies_batch(
+            query_movie_ids, k=k, catalog=catalog, weights=weights, filters=filters, diversity=diversity
+        )
+
+    def find_movies_like_set(self, catalog, query_movie_ids, k=10, weights=None, filters=None, mode='centroid'):
+        return find_movies_like_set(query_movie_ids, k=k, catalog=catalog, weights=weights, filters=filters, mode=mode)
+
+    def find_movies_by_description(self, catalog, query_description, k=5, model=None, embedding_cache=None, mode='hybrid', filters=None):
+        return find_movies_by_description(
+            query_description, k=k, model=model, catalog=catalog, embedding_cache=embedding_cache, mode=mode, filters=filters
+        )
+
+def vector_literal(vector):
+    return '[' + ','.join(f"{value:.7g}" for value in np.asarray(vector, dtype=np.float32).ravel()) + ']'
+
+def document_texts(movie_df):
+    # (title, overview and keywords) per movie: the text of its BM25 document in lexical_documents.
+    keywords = movie_df['keywords'] if 'keywords' in movie_df.columns else [None] * len(movie_df)
+    return [
+        (title if isinstance(title, str) else '', ' '.join(text for text in (overview, keyword_text) if isinstance(text, str)))
+        for title, overview, keyword_text in zip(movie_df['title'], movie_df['overview'], keywords)
+    ]
+
+def filter_conditions(filters):
+    # The SQL counterpart of FilterIndex.matching_rows, over the movie table aliased as m.
+    conditions = []
+    params = {}
+    if filters is None:
+        return '', params
+
+    if filters.min_rating is not None:
+        conditions.append("m.vote_average >= %(min_rating)s")
+        params['min_rating'] = filters.min_rating
+    if filters.max_rating is not None:
+        conditions.append("m.vote_average <= %(max_rating)s")
+        params['max_rating'] = filters.max_rating
+    if filters.from_year is not None:
+        conditions.append("extract(year FROM m.release_date) >= %(from_year)s")
+        params['from_year'] = filters.from_year
+    if filters.to_year is not None:
+        conditions.append("extract(year FROM m.release_date) <= %(to_year)s")
+        params['to_year'] = filters.to_year
+    for i, genre in enumerate(filters.genres):
+        conditions.append(
+            "EXISTS (SELECT 1 FROM movie_genre mg JOIN genre g ON g.id = mg.genre_id "
+            f"WHERE mg.movie_id = m.id AND lower(g.name) = lower(%(genre_{i})s))"
+        )
+        params[f'genre_{i}'] = genre
+
+    return ''.join(f" AND {condition}" for condition in conditions), params
+
+class PgVectorBackend(SearchBackend):
+    # Vectors live in Postgres next to the metadata, so a replica only needs the metadata frame
+    # for title lookups; the composite and overview indexes are HNSW indexes in the database.
+    name = 'pgvector'
+    local_vectors = False
+
+    def __init__(self, dsn, ef_search=PGVECTOR_EF_SEARCH, max_connections=PGVECTOR_MAX_CONNECTIONS):
+        self.pool = ThreadedConnectionPool(1, max_connections, dsn)
+        self.ef_search = ef_search
+
+    def close(self):
+        self.pool.closeall()
+
+    def run(self, statements):
+        # statements: [(sql, params)], run in one transaction; returns the rows of the last one.
+        conn = self.pool.getconn()
+        try:
+            with conn, conn.cursor() as cursor:
+                # Filtered HNSW scans keep walking the graph until LIMIT rows pass (pgvector 0.8+).
+                cursor.execute("SET LOCAL hnsw.ef_search = %s", (self.ef_search,))
+                cursor.execute("SET LOCAL hnsw.iterative_scan = strict_order")
+                for sql, params in statements:
+                    cursor.execute(sql, params)
+                return cursor.fetchall()
+        finally:
+            self.pool.putconn(conn)
+
+    def sync(self, catalog, batch_size=PGVECTOR_SYNC_BATCH_SIZE):
+        # Copies the catalogue's live rows; the indexes are built after the load, which is much
+        # faster than maintaining them row by row. The full-text document is built from the same
+        # title, overview and keywords as the BM25 index, so both backends rank the same text.
+        live_rows = catalog.live_rows()
+        overview_column = catalog.facet_store.names.index('overview')
+
+        conn = self.pool.getconn()
+        try:
+            with conn, conn.cursor() as cursor:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+                cursor.execute("DROP TABLE IF EXISTS movie_vector")
+                cursor.execute(f"""
+                    CREATE TABLE movie_vector (
+                        movie_id integer PRIMARY KEY,
+                        composite halfvec({composite_dim()}) NOT NULL,
+                        overview vector({EMBEDDING_DIM}),
+                        document tsvector NOT NULL
+                    )
+                """)
+
+                for start in range(0, len(live_rows), batch_size):
+                    rows = live_rows[start:start + batch_size]
+                    composites = composite_rows(catalog.facet_store, rows)
+                    overviews = catalog.facet_store.facet_rows('overview', rows)
+                    has_overview = catalog.facet_store.sq_norms[rows, overview_column] > 0
+                    documents = document_texts(catalog.movie_df.iloc[rows])
+                    execute_values(cursor, "INSERT INTO movie_vector (movie_id, composite, overview, document) VALUES %s", [
+                        (int(movie_id), vector_literal(composite), vector_literal(overview) if present else None, *document)
+                        for movie_id, composite, overview, present, document
+                        in zip(catalog.movie_df['id'].to_numpy()[rows], composites, overviews, has_overview, documents)
+                    ], template="(%s, %s, %s, setweight(to_tsvector('english', %s), 'A') || to_tsvector('english', %s))")
+
+                cursor.execute("CREATE INDEX ON movie_vector USING hnsw (composite halfvec_ip_ops)")
+                cursor.execute("CREATE INDEX ON movie_vector USING hnsw (overview vector_ip_ops)")
+                cursor.execute("CREATE INDEX ON movie_vector USING gin (document)")
+                cursor.execute("ANALYZE movie_vector")
+        finally:
+            self.pool.putconn(conn)
+
+        print(f"Synced {len(live_rows)} movies to pgvector")
+
+    def load_catalog(self):
+        return build_metadata_catalog(pd.DataFrame(self.run([(METADATA_QUERY, None)]), columns=METADATA_COLUMNS))
+
+    def find_similar_movies_batch(self, catalog, query_movie_ids, k=10, weights=None, filters=None, diversity=None):
+        filters = resolve_filters(filters)
+        diversity = resolve_diversity(diversity)
+        if resolve_weights(weights) is not None:
+            error = "Per-request facet weights need the FAISS backend; pgvector stores only the default composite."
+            return {query_movie_id: ([], error) for query_movie_id in query_movie_ids}
+
+        # Diversified searches over-fetch and let MMR pick k of the candidates.
+        pool_k = k if diversity is None else mmr_pool_size(k)
+        results = {}
+        for query_movie_id in query_movie_ids:
+            query = self.run([("SELECT composite::text FROM movie_vector WHERE movie_id = %s", (int(query_movie_id),))])
+            if not query:
+                results[query_movie_id] = ([], f"Movie with ID {query_movie_id} not found")
+                continue
+
+            rows = self.nearest_composites(query[0][0], [int(query_movie_id)], filters, pool_k, with_composite=diversity is not None)
+
+            if rows and diversity is not None:
+                vectors = np.array([json.loads(row[-1]) for row in rows], dtype='float32')
+                order = mmr_order(np.array([row[-2] for row in rows]), vectors, k, diversity)
+                rows = [rows[i][:-1] for i in order]
+
+            if rows:
+                results[query_movie_id] = ([SimilarMovie(*row) for row in rows], None)
+            elif filters is not None:
+                results[query_movie_id] = ([], f"No movies match {filters.describe()}")
+            else:
+                results[query_movie_id] = ([], "No similar movies found")
+
+        return results
+
+    def nearest_composites(self, query, exclude_ids, filters, limit, with_composite=False):
+        # query is a halfvec literal; rows are SimilarMovie fields, plus the composite's text when asked.
+        conditions, params = filter_conditions(filters)
+        composite_column = ", v.composite::text" if with_composite else ""
+        return self.run([(f"""
+            SELECT m.id, m.title, m.overview, m.vote_average, m.atmosphere, m.narrative, m.themes,
+                   -(v.composite <#> %(query)s::halfvec) AS similarity_score{composite_column}
+            FROM movie_vector v JOIN movie m ON m.id = v.movie_id
+            WHERE v.movie_id <> ALL(%(exclude_ids)s) {conditions}
+            ORDER BY v.composite <#> %(query)s::halfvec
+            LIMIT %(k)s
+        """, {**params, 'query': query, 'exclude_ids': exclude_ids, 'k': limit})])
+
+    def find_movies_like_set(self, catalog, query_movie_ids, k=10, weights=None, filters=None, mode='centroid'):
+        if mode not in SET_MODES:
+            raise ValueError(f"Unknown mode '{mode}'. Expected one of {SET_MODES}.")
+        filters = resolve_filters(filters)
+        if resolve_weights(weights) is not None:
+            return [], "Per-request facet weights need the FAISS backend; pgvector stores only the default composite."
+        if not query_movie_ids:
+            return [], "At least one movie ID must be provided."
+
+        seed_ids = sorted({int(movie_id) for movie_id in query_movie_ids})
+        seeds = self.run([("SELECT movie_id, composite::text FROM movie_vector WHERE movie_id = ANY(%s)", (seed_ids,))])
+        missing = sorted(set(seed_ids) - {row[0] for row in seeds})
+        if missing:
+            return [], f"Movies with IDs {missing} not found"
+
+        vectors = np.array([json.loads(row[1]) for row in seeds], dtype='float32')
+        # Cosine to the centroid, scaled by its length, is the mean cosine to the seeds, which is
+        # what the FAISS backend reports in both modes.
+        centroid = vectors.mean(axis=0)
+        norm = float(np.linalg.norm(centroid))
+        if mode == 'centroid':
+            rows = self.nearest_composites(vector_literal(centroid / norm), seed_ids, filters, k)
+            rows = [(*row[:-1], row[-1] * norm) for row in rows]
+        else:
+            rankings = [self.nearest_composites(vector_literal(vector), seed_ids, filters, k) for vector in vectors]
+            movie_ids, fusion_scores = fuse_rankings([np.array([row[0] for row in ranking], dtype='int64') for ranking in rankings], k)
+            metadata = {row[0]: row[:-1] for ranking in rankings for row in ranking}
+            mean_scores = dict(self.run([(
+                "SELECT movie_id, -(composite <#> %s::halfvec) FROM movie_vector WHERE movie_id = ANY(%s)",
+                (vector_literal(centroid), movie_ids.tolist())
+            )]))
+            rows = [
+                (*metadata[movie_id], mean_scores[movie_id], None, fusion_score)
+                for movie_id, fusion_score in zip(movie_ids.tolist(), fusion_scores.tolist())
+            ]
+
+        if rows:
+            return [SimilarMovie(*row) for row in rows], None
+        if filters is not None:
+            return [], f"No movies match {filters.describe()}"
+        return [], "No similar movies found"
+
+    def find_movies_by_description(self, catalog, query_description, k=5, model=None, embedding_cache=None, mode='hybrid', filters=None):
+        if mode not in DESCRIPTION_MODES:
+            raise ValueError(f"Unknown mode '{mode}'. Expected one of {DESCRIPTION_MODES}.")
+        if model is None:
+            return [], "A SentenceTransformer model must be provided."
+        if not query_description or not isinstance(query_description, str):
+            return [], "A valid string for query_description must be provided."
+
+        filters = resolve_filters(filters)
+        conditions, params = filter_conditions(filters)
+
+        try:
+            if embedding_cache is not None:
+                query_embedding = embedding_cache.get_or_compute(query_description, lambda text: encode_query(model, text))
+            else:
+                query_embedding = encode_query(model, query_description)
+            params = {**params, 'query': vector_literal(query_embedding), 'text': query_description}
+
+            dense_sql = f"""
+                SELECT m.id, m.title, m.overview, m.vote_average, -(v.overview <#> %(query)s::vector) AS similarity_score
+                FROM movie_vector v JOIN movie m ON m.id = v.movie_id
+                WHERE v.overview IS NOT NULL {conditions}
+                ORDER BY v.overview <#> %(query)s::vector
+                LIMIT %(k)s
+            """
+            if mode == 'dense':
+                rows = self.run([(dense_sql, {**params, 'k': k})])
+                return [MovieMatch(*row) for row in rows], None
+
+            # Postgres full-text search stands in for the in-process BM25 index on the lexical side;
+            # normalisation 1 divides by the log of the document length, as BM25 damps long ones.
+            pool = max(k, HYBRID_CANDIDATES)
+            dense = self.run([(dense_sql, {**params, 'k': pool})])
+            lexical = self.run([(f"""
+                SELECT m.id
+                FROM movie_vector v JOIN movie m ON m.id = v.movie_id,
+                     plainto_tsquery('english', %(text)s) q
+                WHERE v.document @@ q {conditions}
+                ORDER BY ts_rank_cd(%(rank_weights)s::float4[], v.document, q, 1) DESC
+                LIMIT %(k)s
+            """, {**params, 'rank_weights': LEXICAL_RANK_WEIGHTS, 'k': pool})])
+
+            movie_ids, fusion_scores = fuse_rankings([
+                np.array([row[0] for row in dense], dtype='int64'),
+                np.array([row[0] for row in lexical], dtype='int64'),
+            ], k)
+            # Lexical-only hits get their cosine here; movies without an overview embedding score 0.
+            matches = {row[0]: row for row in dense}
+            missing = [int(movie_id) for movie_id in movie_ids if movie_id not in matches]
+            if missing:
+                for row in self.run([("""
+                    SELECT m.id, m.title, m.overview, m.vote_average, coalesce(-(v.overview <#> %(query)s::vector), 0)
+                    FROM movie_vector v JOIN movie m ON m.id = v.movie_id
+                    WHERE m.id = ANY(%(ids)s)
+                """, {'query': params['query'], 'ids': missing})]):
+                    matches[row[0]] = row
+
+            return [
+                MovieMatch(*matches[movie_id], fusion_score) for movie_id, fusion_score in zip(movie_ids.tolist(), fusion_scores.tolist())
+            ], None
+
+        except Exception as e:
+            return [], f"An unexpected error occurred in find_movies_by_description: {e}"
+
+def search_backend_from_env(dsn=None):
+    backend = os.environ.get('SEARCH_BACKEND', 'faiss').lower()
+    if backend not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown search backend '{backend}'. Expected one of {SEARCH_BACKENDS}.")
+    if backend == 'pgvector':
+        return PgVectorBackend(os.environ.get('PGVECTOR_DSN') or dsn)
+    return FaissBackend()
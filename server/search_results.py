@@ -0,0 +1,100 @@
+from typing import NamedTuple
+
+# Metadata columns the result records are built from, kept as arrays on the catalog.
+RESULT_COLUMNS = ('id', 'title', 'overview', 'vote_average', 'atmosphere', 'narrative', 'themes')
+
+# Tuples rather than dataclasses: python 3.9 dataclasses cannot take slots, and a search builds
+# a handful of these per call, straight from the catalog's column arrays.
+class Movie(NamedTuple):
+    id: int
+    title: str
+    overview: str
+    vote_average: float
+
+class MovieMatch(NamedTuple):
+    id: int
+    title: str
+    overview: str
+    vote_average: float
+    # Cosine between the description and the overview embedding, whatever the mode.
+    similarity_score: float
+    # The reciprocal rank fusion score hybrid results are ranked by; None for dense results.
+    fusion_score: float = None
+
+class SimilarMovie(NamedTuple):
+    id: int
+    title: str
+    overview: str
+    vote_average: float
+    atmosphere: str
+    narrative: str
+    themes: str
+    similarity_score: float
+    # Each facet's term of similarity_score, when the facets were at hand to compute it.
+    facet_scores: dict = None
+    # The reciprocal rank fusion score fusion-mode set results are ranked by; None otherwise.
+    fusion_score: float = None
+
+def column_values(columns, names, rows):
+    return [columns[name][rows].tolist() for name in names]
+
+def movies(columns, rows):
+    return [Movie(*values) for values in zip(*column_values(columns, Movie._fields, rows))]
+
+def movie_matches(columns, rows, scores, fusion_scores=None):
+    values = column_values(columns, MovieMatch._fields[:-2], rows)
+    if fusion_scores is None:
+        return [MovieMatch(*movie, score) for *movie, score in zip(*values, scores.tolist())]
+    return [MovieMatch(*movie, score, fused) for *movie, score, fused in zip(*values, scores.tolist(), fusion_scores.tolist())]
+
+def similar_movies(columns, rows, scores, facet_names=None, facet_scores=None, fusion_scores=None):
+    values = column_values(columns, SimilarMovie._fields[:-3], rows)
+    if facet_scores is None and fusion_scores is None:
+        return [SimilarMovie(*movie, score) for *movie, score in zip(*values, scores.tolist())]
+
+    facet_dicts = [None] * len(rows) if facet_scores is None else [dict(zip(facet_names, row)) for row in facet_scores.tolist()]
+    fusion_scores = [None] * len(rows) if fusion_scores is None else fusion_scores.tolist()
+    return [
+        SimilarMovie(*movie, score, facets, fused)
+        for *movie, score, facets, fused in zip(*values, scores.tolist(), facet_dicts, fusion_scores)
+    ]
+
+def overview_preview(movie):
+    return f"{(movie.overview or '')[:100]}..."
+
+def format_movies(results):
+    lines = []
+    for i, movie in enumerate(results, start=1):
+        lines.append(f"{i}. {movie.title} (ID: {movie.id})")
+        lines.append(f"   Rating: {movie.vote_average}/10")
+        lines.append(f"   Overview: {overview_preview(movie)}\n")
+    return '\n'.join(lines)
+
+def format_movie_matches(results):
+    lines = []
+    for i, movie in enumerate(results, start=1):
+        lines.append(f"{i}. {movie.title} (ID: {movie.id})")
+        lines.append(f"   Rating: {movie.vote_average}/10")
+        lines.append(f"   Similarity: {movie.similarity_score:.3f}")
+        if movie.fusion_score is not None:
+            lines.append(f"   Fused rank score: {movie.fusion_score:.3f}")
+        lines.append(f"   Overview: {overview_preview(movie)}\n")
+    return '\n'.join(lines)
+
+def format_facet_scores(facet_scores):
+    # Largest share of the similarity first, e.g. "themes 0.121, atmosphere 0.098, ...".
+    ranked = sorted(facet_scores.items(), key=lambda item: -item[1])
+    return ', '.join(f"{name} {score:.3f}" for name, score in ranked)
+
+def format_similar_movies(results):
+    lines = []
+    for i, movie in enumerate(results, start=1):
+        lines.append(f"{i}. {movie.title} (ID: {movie.id})")
+        lines.append(f"   Rating: {movie.vote_average}/10")
+        lines.append(f"   Similarity: {movie.similarity_score:.3f}")
+        if movie.fusion_score is not None:
+            lines.append(f"   Fused rank score: {movie.fusion_score:.3f}")
+        if movie.facet_scores:
+            lines.append(f"   Matches on: {format_facet_scores(movie.facet_scores)}")
+        lines.append(f"   Overview: {overview_preview(movie)}\n")
+    return '\n'.join(lines)
@@ -0,0 +1,57 @@
+import os
+import shutil
+import sys
+import uuid
+import pytest
+
+# Tests import the server's flat modules the way the app does, from the server directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Database tests run against PGVECTOR_TEST_DSN when set (any Postgres with pgvector 0.8+ the user
+# may create databases on), otherwise against a throwaway pgvector container when docker and
+# testcontainers are available. Each test module creates and drops its own database.
+PGVECTOR_IMAGE = 'pgvector/pgvector:pg16'
+
+def container_dsn():
+    if shutil.which('docker') is None:
+        return None, None
+    try:
+        from testcontainers.postgres import PostgresContainer
+    except ImportError:
+        return None, None
+
+    container = PostgresContainer(PGVECTOR_IMAGE, driver=None).start()
+    return container.get_connection_url(), container
+
+@pytest.fixture(scope='session')
+def server_dsn():
+    pytest.importorskip('psycopg2')
+    dsn = os.environ.get('PGVECTOR_TEST_DSN')
+    container = None
+    if not dsn:
+        dsn, container = container_dsn()
+    if not dsn:
+        pytest.skip("Set PGVECTOR_TEST_DSN or install docker and testcontainers to run the pgvector tests.")
+
+    yield dsn
+
+    if container is not None:
+        container.stop()
+
+def admin(dsn, sql):
+    import psycopg2
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql)
+    finally:
+        conn.close()
+
+@pytest.fixture(scope='module')
+def dsn(server_dsn):
+    from psycopg2.extensions import make_dsn
+    name = f"movie_finder_test_{uuid.uuid4().hex[:8]}"
+    admin(server_dsn, f"CREATE DATABASE {name}")
+    yield make_dsn(server_dsn, dbname=name)
+    admin(server_dsn, f"DROP DATABASE {name} WITH (FORCE)")
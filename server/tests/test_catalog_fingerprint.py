@@ -0,0 +1,83 @@
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+from movie_similarity_search import EMBEDDING_COLUMNS, catalog_fingerprint, install_catalog_version
+
+def execute(dsn, sql, params=None):
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else None
+    finally:
+        conn.close()
+
+def fingerprint(dsn):
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn, conn.cursor() as cursor:
+            return catalog_fingerprint(cursor, storage='array')
+    finally:
+        conn.close()
+
+@pytest.fixture(scope='module')
+def catalog_dsn(dsn):
+    # The columns MOVIE_QUERY reads, two movies and their keyword and genre links.
+    embeddings = ', '.join(f"{column} double precision[]" for column in EMBEDDING_COLUMNS)
+    execute(dsn, f"""
+        CREATE TABLE movie (
+            id integer PRIMARY KEY, title text, overview text, vote_average double precision,
+            vote_average_scaled double precision, release_date date, atmosphere text, narrative text, themes text,
+            {embeddings}
+        );
+        CREATE TABLE keyword (id integer PRIMARY KEY, name text);
+        CREATE TABLE movie_keyword (movie_id integer, keyword_id integer);
+        CREATE TABLE genre (id integer PRIMARY KEY, name text);
+        CREATE TABLE movie_genre (movie_id integer, genre_id integer);
+        INSERT INTO movie (id, title, classified_emb_combined) VALUES (1, 'Alien', '{{1, 0}}'), (2, 'Aliens', '{{0, 1}}');
+        INSERT INTO keyword VALUES (1, 'space'), (2, 'marine');
+        INSERT INTO movie_keyword VALUES (1, 1), (2, 2);
+        INSERT INTO genre VALUES (1, 'Horror'), (2, 'Action');
+        INSERT INTO movie_genre VALUES (1, 1), (2, 2);
+    """)
+    return dsn
+
+def swap_keywords(dsn):
+    # Same number of links, different movies.
+    execute(dsn, "UPDATE movie_keyword SET keyword_id = 3 - keyword_id")
+
+def test_fingerprint_without_version_table_hashes_link_tables(catalog_dsn):
+    before = fingerprint(catalog_dsn)
+    assert before['rows'] == 2
+    swap_keywords(catalog_dsn)
+    assert fingerprint(catalog_dsn) != before
+
+def test_fingerprint_follows_catalog_version(catalog_dsn):
+    conn = psycopg2.connect(catalog_dsn)
+    try:
+        with conn, conn.cursor() as cursor:
+            install_catalog_version(cursor)
+    finally:
+        conn.close()
+
+    before = fingerprint(catalog_dsn)
+    assert set(before) == {'epoch', 'version'}
+    assert fingerprint(catalog_dsn) == before
+
+    swap_keywords(catalog_dsn)
+    after_links = fingerprint(catalog_dsn)
+    assert after_links['epoch'] == before['epoch'] and after_links['version'] > before['version']
+
+    execute(catalog_dsn, "UPDATE genre SET name = 'Sci-Fi' WHERE id = 2")
+    assert fingerprint(catalog_dsn)['version'] > after_links['version']
+
+def test_rolled_back_writes_keep_the_version(catalog_dsn):
+    before = fingerprint(catalog_dsn)
+    conn = psycopg2.connect(catalog_dsn)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM movie WHERE id = 2")
+        conn.rollback()
+    finally:
+        conn.close()
+    assert fingerprint(catalog_dsn) == before
@@ -0,0 +1,212 @@
+import numpy as np
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+from psycopg2.extras import execute_values
+from movie_similarity_search import find_id_by_title, find_movies_by_id
+from search_backend import FaissBackend, PgVectorBackend
+from benchmarks.synthetic import GENRES, StubEncoder, synthetic_catalog
+
+CATALOG_SIZE = 600
+K = 10
+SEEDS = 20
+# The composite is stored as halfvec, so scores agree with FAISS to about 3 decimals.
+SCORE_TOLERANCE = 5e-3
+FILTERS = {'min_rating': 6.0, 'from_year': 1960, 'genres': ['Drama']}
+
+@pytest.fixture(scope='module')
+def catalog():
+    catalog, _ = synthetic_catalog(CATALOG_SIZE)
+    return catalog
+
+def load_movie_tables(dsn, movie_df):
+    # The columns of the pipeline's tables that the backend reads.
+    genre_ids = {name: i for i, name in enumerate(GENRES, start=1)}
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn, conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE movie (
+                    id integer PRIMARY KEY, title text, overview text, vote_average double precision,
+                    release_date date, atmosphere text, narrative text, themes text
+                )
+            """)
+            cursor.execute("CREATE TABLE genre (id integer PRIMARY KEY, name text)")
+            cursor.execute("CREATE TABLE movie_genre (movie_id integer, genre_id integer)")
+            execute_values(cursor, "INSERT INTO movie VALUES %s", list(zip(
+                movie_df['id'].astype(int).tolist(), movie_df['title'], movie_df['overview'], movie_df['vote_average'].tolist(),
+                movie_df['release_date'], movie_df['atmosphere'], movie_df['narrative'], movie_df['themes']
+            )))
+            execute_values(cursor, "INSERT INTO genre VALUES %s", [(i, name) for name, i in genre_ids.items()])
+            execute_values(cursor, "INSERT INTO movie_genre VALUES %s", [
+                (int(movie_id), genre_ids[name]) for movie_id, names in zip(movie_df['id'], movie_df['genres']) for name in names
+            ])
+    finally:
+        conn.close()
+
+@pytest.fixture(scope='module')
+def backend(dsn, catalog):
+    load_movie_tables(dsn, catalog.movie_df)
+    backend = PgVectorBackend(dsn)
+    backend.sync(catalog)
+    yield backend
+    backend.close()
+
+@pytest.fixture(scope='module')
+def seed_ids(catalog):
+    rows = np.random.default_rng(1).choice(CATALOG_SIZE, SEEDS, replace=False)
+    return catalog.movie_df['id'].to_numpy()[rows].astype(int).tolist()
+
+def overlap(expected, found):
+    return len({movie.id for movie in expected} & {movie.id for movie in found}) / max(len(expected), 1)
+
+def assert_matches_faiss(expected, found, min_overlap=0.9):
+    (expected, expected_error), (found, found_error) = expected, found
+    assert expected_error is None and found_error is None, (expected_error, found_error)
+    assert len(found) == len(expected)
+    assert overlap(expected, found) >= min_overlap
+
+    scores = {movie.id: movie.similarity_score for movie in expected}
+    for movie in found:
+        if movie.id in scores:
+            assert abs(movie.similarity_score - scores[movie.id]) < SCORE_TOLERANCE
+
+def test_sync_copies_every_live_movie(backend, catalog):
+    rows = backend.run([("SELECT count(*), count(overview) FROM movie_vector", None)])
+    assert rows == [(CATALOG_SIZE, CATALOG_SIZE)]
+
+    indexes = backend.run([("SELECT indexdef FROM pg_indexes WHERE tablename = 'movie_vector'", None)])
+    assert sum('USING hnsw' in row[0] for row in indexes) == 2
+    assert sum('USING gin (document)' in row[0] for row in indexes) == 1
+
+def test_metadata_catalog_serves_lookups(backend, catalog, seed_ids):
+    metadata = backend.load_catalog()
+    assert metadata.faiss_index is None and metadata.facet_store is None and metadata.lexical_index is None
+    assert sorted(metadata.filter_index.genre_labels.values()) == sorted(catalog.filter_index.genre_labels.values())
+    assert metadata.movie_df['id'].tolist() == sorted(catalog.movie_df['id'].astype(int).tolist())
+
+    movie_df = catalog.movie_df.set_index('id')
+    for movie_id in seed_ids:
+        assert find_movies_by_id(movie_id, metadata) == find_movies_by_id(movie_id, catalog)
+        assert find_id_by_title(movie_df.at[movie_id, 'title'], metadata) == find_id_by_title(movie_df.at[movie_id, 'title'], catalog)
+
+def test_similar_movies_match_faiss(backend, catalog, seed_ids):
+    faiss_backend = FaissBackend()
+    for movie_id in seed_ids:
+        found = backend.find_similar_movies(catalog, movie_id, k=K)
+        assert movie_id not in {movie.id for movie in found[0]}
+        assert_matches_faiss(faiss_backend.find_similar_movies(catalog, movie_id, k=K), found)
+
+def test_filtered_similar_movies_match_faiss(backend, catalog, seed_ids):
+    faiss_backend = FaissBackend()
+    movie_df = catalog.movie_df.set_index('id')
+    for movie_id in seed_ids:
+        found = backend.find_similar_movies(catalog, movie_id, k=K, filters=FILTERS)
+        for movie in found[0]:
+            assert movie.vote_average >= FILTERS['min_rating']
+            assert movie_df.at[movie.id, 'release_date'].year >= FILTERS['from_year']
+            assert 'Drama' in movie_df.at[movie.id, 'genres']
+        assert_matches_faiss(faiss_backend.find_similar_movies(catalog, movie_id, k=K, filters=FILTERS), found)
+
+def test_diversified_similar_movies_match_faiss(backend, catalog, seed_ids):
+    faiss_backend = FaissBackend()
+    for movie_id in seed_ids:
+        expected = faiss_backend.find_similar_movies(catalog, movie_id, k=K, diversity=0.5)
+        found = backend.find_similar_movies(catalog, movie_id, k=K, diversity=0.5)
+        assert_matches_faiss(expected, found, min_overlap=0.7)
+
+def test_weighted_similar_movies_need_faiss(backend, catalog, seed_ids):
+    results, error = backend.find_similar_movies(catalog, seed_ids[0], k=K, weights='mood')
+    assert results == [] and 'FAISS' in error
+
+def test_missing_movie(backend, catalog):
+    results, error = backend.find_similar_movies(catalog, -1, k=K)
+    assert results == [] and 'not found' in error
+
+@pytest.mark.parametrize('mode', ['centroid', 'fusion'])
+def test_set_queries_match_faiss(backend, catalog, seed_ids, mode):
+    faiss_backend = FaissBackend()
+    for start in range(0, SEEDS, 4):
+        seeds = seed_ids[start:start + 4]
+        found = backend.find_movies_like_set(catalog, seeds, k=K, mode=mode)
+        assert not set(seeds) & {movie.id for movie in found[0]}
+        # Both modes report the mean cosine to the seeds; fusion only changes the ranking.
+        assert_matches_faiss(faiss_backend.find_movies_like_set(catalog, seeds, k=K, mode=mode), found, min_overlap=0.8)
+
+def test_fusion_set_query_scores_add_up(catalog, seed_ids):
+    results, error = FaissBackend().find_movies_like_set(catalog, seed_ids[:4], k=K, mode='fusion')
+    assert error is None and results
+    fusion_scores = [movie.fusion_score for movie in results]
+    assert fusion_scores == sorted(fusion_scores, reverse=True)
+    for movie in results:
+        assert abs(sum(movie.facet_scores.values()) - movie.similarity_score) < 1e-5
+
+def test_filtered_set_query(backend, catalog, seed_ids):
+    results, error = backend.find_movies_like_set(catalog, seed_ids[:3], k=K, filters=FILTERS)
+    assert error is None and results
+    assert all(movie.vote_average >= FILTERS['min_rating'] for movie in results)
+
+def test_dense_description_search_matches_faiss(backend, catalog):
+    model = StubEncoder()
+    faiss_backend = FaissBackend()
+    for text in catalog.movie_df['overview'].tolist()[:SEEDS]:
+        assert_matches_faiss(
+            faiss_backend.find_movies_by_description(catalog, text, k=K, model=model, mode='dense'),
+            backend.find_movies_by_description(catalog, text, k=K, model=model, mode='dense'),
+        )
+
+def test_hybrid_description_search_finds_the_described_movie(backend, catalog, seed_ids):
+    # The lexical sides differ (BM25 in process, Postgres full text here), so parity is
+    # checked on a known-item query both should answer: a movie's own title and overview.
+    model = StubEncoder()
+    movie_df = catalog.movie_df.set_index('id')
+    for movie_id in seed_ids:
+        text = f"{movie_df.at[movie_id, 'title']} {movie_df.at[movie_id, 'overview']}"
+        for search_backend in (backend, FaissBackend()):
+            results, error = search_backend.find_movies_by_description(catalog, text, k=K, model=model)
+            assert error is None
+            assert movie_id in [movie.id for movie in results]
+
+def test_hybrid_description_search_matches_keywords(backend, catalog, seed_ids):
+    # Keywords are only in the lexical documents, on both sides.
+    model = StubEncoder()
+    movie_df = catalog.movie_df.set_index('id')
+    for movie_id in seed_ids:
+        for search_backend in (backend, FaissBackend()):
+            results, error = search_backend.find_movies_by_description(catalog, movie_df.at[movie_id, 'keywords'], k=K, model=model)
+            assert error is None
+            assert movie_id in [movie.id for movie in results]
+
+def test_filtered_description_search(backend, catalog):
+    model = StubEncoder()
+    text = catalog.movie_df.at[0, 'overview']
+    for mode in ('dense', 'hybrid'):
+        results, error = backend.find_movies_by_description(catalog, text, k=K, model=model, mode=mode, filters=FILTERS)
+        assert error is None and results
+        assert all(movie.vote_average >= FILTERS['min_rating'] for movie in results)
+
+def test_hybrid_description_search_reports_overview_cosine(backend, catalog):
+    # Hybrid results are ranked by their fused score, but similarity_score stays the overview's
+    # cosine to the description, lexical-only hits included.
+    model = StubEncoder()
+    text = catalog.movie_df.at[1, 'overview']
+    query = model.encode([text])[0]
+    for search_backend in (backend, FaissBackend()):
+        results, error = search_backend.find_movies_by_description(catalog, text, k=K, model=model)
+        assert error is None and results
+        fusion_scores = [movie.fusion_score for movie in results]
+        assert fusion_scores == sorted(fusion_scores, reverse=True)
+
+        rows = np.array([catalog.row_for_id(movie.id) for movie in results])
+        cosines = catalog.facet_store.facet_rows('overview', rows) @ query
+        for movie, cosine in zip(results, cosines.tolist()):
+            assert abs(movie.similarity_score - cosine) < SCORE_TOLERANCE
+
+def test_dense_description_search_has_no_fusion_score(backend, catalog):
+    results, _ = backend.find_movies_by_description(catalog, catalog.movie_df.at[1, 'overview'], k=K, model=StubEncoder(), mode='dense')
+    assert results and all(movie.fusion_score is None for movie in results)
+
+def test_description_search_rejects_unknown_mode(backend, catalog):
+    for search_backend in (backend, FaissBackend()):
+        with pytest.raises(ValueError):
+            search_backend.find_movies_by_description(catalog, 'a heist', k=K, model=StubEncoder(), mode='lexical')
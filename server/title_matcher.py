@@ -0,0 +1,105 @@
+import re
+import unicodedata
+import numpy as np
+from thefuzz import process
+
+SHORTLIST_SIZE = 200
+# Posting entries gathered per query; the rarest trigrams are used first, so very common
+# ones ("the", " th") are only read when the rarer ones did not fill the budget.
+MAX_POSTINGS = 200_000
+
+def normalize_title(title):
+    title = unicodedata.normalize('NFKD', str(title))
+    title = ''.join(ch for ch in title if not unicodedata.combining(ch))
+    title = re.sub(r'[^\w\s]', ' ', title.lower())
+    return re.sub(r'\s+', ' ', title).strip()
+
+def title_trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TitleMatcher:
+    def __init__(self, titles, years=None):
+        self.titles = list(titles)
+        self.normalized = [normalize_title(title) for title in self.titles]
+        self.years = list(years) if years is not None else [None] * len(self.titles)
+
+        vocab = {}
+        gram_ids = []
+        gram_rows = []
+        for row, normalized in enumerate(self.normalized):
+            for gram in title_trigrams(normalized):
+                gram_ids.append(vocab.setdefault(gram, len(vocab)))
+                gram_rows.append(row)
+
+        gram_ids = np.array(gram_ids, dtype='int32')
+        order = np.argsort(gram_ids, kind='stable')
+
+        self.vocab = vocab
+        self.postings = np.array(gram_rows, dtype='int32')[order]
+        self.offsets = np.zeros(len(vocab) + 1, dtype='int64')
+        np.cumsum(np.bincount(gram_ids, minlength=len(vocab)), out=self.offsets[1:])
+
+        # Titles added after the build keep their postings in a dict, and removed rows are masked,
+        # so catalogue updates do not rebuild the CSR arrays.
+        self.appended = {}
+        self.removed = np.zeros(len(self.titles), dtype=bool)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def extend(self, titles, years):
+        start = len(self.titles)
+        self.titles.extend(titles)
+        self.years.extend(years)
+        self.removed = np.concatenate([self.removed, np.zeros(len(titles), dtype=bool)])
+        for row, title in enumerate(titles, start):
+            normalized = normalize_title(title)
+            self.normalized.append(normalized)
+            for gram in title_trigrams(normalized):
+                self.appended.setdefault(gram, []).append(row)
+
+    def remove(self, rows):
+        self.removed[rows] = True
+
+    def gram_postings(self, gram):
+        postings = []
+        if gram in self.vocab:
+            gram_id = self.vocab[gram]
+            postings.append(self.postings[self.offsets[gram_id]:self.offsets[gram_id + 1]])
+        if gram in self.appended:
+            postings.append(np.array(self.appended[gram], dtype='int32'))
+        return postings[0] if len(postings) == 1 else np.concatenate(postings)
+
+    def shortlist(self, normalized_query, size=SHORTLIST_SIZE):
+        grams = [gram for gram in title_trigrams(normalized_query) if gram in self.vocab or gram in self.appended]
+        if not grams:
+            return np.empty(0, dtype='int32')
+
+        chunks = []
+        gathered = 0
+        for postings in sorted(map(self.gram_postings, grams), key=len):
+            if chunks and gathered + len(postings) > MAX_POSTINGS:
+                break
+            chunks.append(postings)
+            gathered += len(postings)
+
+        rows, shared = np.unique(np.concatenate(chunks), return_counts=True)
+        live = ~self.removed[rows]
+        rows, shared = rows[live], shared[live]
+        if len(rows) > size:
+            rows = rows[np.argpartition(-shared, size - 1)[:size]]
+
+        return np.sort(rows)
+
+    def match(self, query, limit=5):
+        rows = self.shortlist(normalize_title(query))
+        if len(rows) == 0:
+            return []
+
+        # Same scorer and processing as the old linear extractOne, so score_cutoff keeps its meaning;
+        # ties go to the earlier catalogue row, as extractOne would pick.
+        scored = process.extract(query, {int(row): self.titles[row] for row in rows}, limit=None)
+        candidates = sorted(((row, score) for _, score, row in scored), key=lambda candidate: (-candidate[1], candidate[0]))
+
+        return candidates[:limit]
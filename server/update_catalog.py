@@ -0,0 +1,78 @@
+import os
+import argparse
+import psycopg2
+from dotenv import load_dotenv
+from movie_similarity_search import (
+    load_or_build_index, fetch_movie_rows, upsert_movies, remove_movies, compact_catalog, snapshot_catalog, install_catalog_version
+)
+from search_backend import PgVectorBackend
+
+def database_url():
+    load_dotenv()
+    if os.environ.get('APP_ENV') == 'debug':
+        return os.environ.get('DATABASE_URL_DEBUG')
+    return os.environ.get('DATABASE_URL')
+
+def fetch_movies(movie_ids):
+    conn = psycopg2.connect(database_url())
+    cursor = conn.cursor()
+    try:
+        return fetch_movie_rows(cursor, movie_ids)
+    finally:
+        cursor.close()
+        conn.close()
+
+def install_version_triggers():
+    conn = psycopg2.connect(database_url())
+    try:
+        with conn, conn.cursor() as cursor:
+            install_catalog_version(cursor)
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply movie additions, updates and removals to the saved catalogue without a full rebuild.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    upsert = commands.add_parser('upsert', help="Add or refresh movies from the database.")
+    upsert.add_argument('--ids', type=int, nargs='+', required=True)
+
+    remove = commands.add_parser('remove', help="Drop movies from the catalogue.")
+    remove.add_argument('--ids', type=int, nargs='+', required=True)
+
+    commands.add_parser('compact', help="Fold pending delta segments into the base assets and neighbour table.")
+    commands.add_parser('snapshot', help="Compact and publish the catalogue as a new snapshot for running servers to reload.")
+    commands.add_parser('sync-pgvector', help="Copy the catalogue's vectors into the movie_vector table used by SEARCH_BACKEND=pgvector.")
+    commands.add_parser('install-version-triggers', help="Create the catalog_version row and the triggers that bump it, so startups can tell the database changed without hashing it.")
+    args = parser.parse_args()
+
+    if args.command == 'install-version-triggers':
+        install_version_triggers()
+        print("Catalog version triggers installed.")
+        return
+
+    catalog = load_or_build_index(None, None)
+
+    if args.command == 'upsert':
+        movie_df = fetch_movies(args.ids)
+        missing = sorted(set(args.ids) - set(movie_df['id'].astype(int)))
+        if missing:
+            print(f"Skipping movies without embeddings: {missing}")
+        upsert_movies(catalog, movie_df)
+    elif args.command == 'remove':
+        remove_movies(catalog, args.ids)
+    elif args.command == 'compact':
+        compact_catalog(catalog)
+    elif args.command == 'snapshot':
+        snapshot_catalog(catalog)
+    else:
+        backend = PgVectorBackend(os.environ.get('PGVECTOR_DSN') or database_url())
+        try:
+            backend.sync(catalog)
+        finally:
+            backend.close()
+
+    print("Catalogue updated successfully!")
+
+if __name__ == '__main__':
+    main()